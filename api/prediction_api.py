@@ -0,0 +1,334 @@
+"""
+Headless delivery time prediction service.
+
+Serves the same encoding and model as the Streamlit app over HTTP, without
+any UI. Run it with several worker processes:
+
+    python -m api.prediction_api --workers 4 --port 8000
+
+Endpoints:
+    GET  /health         Liveness check and model name
+    GET  /stats          Micro-batching, prediction cache and route lookup metrics of this worker
+    GET  /metrics        Stage latency histograms of this worker, Prometheus text format
+    POST /predict        One raw order (JSON object) -> {"prediction": minutes, "route_estimated": bool}
+    POST /predict/batch  {"orders": [...]} -> {"predictions": [minutes, ...], "route_estimated": [bool, ...]}
+
+Orders use the raw columns of `batch_preparation.REQUIRED_COLUMNS`. Orders
+without 'duration_osrm'/'speed_osrm' must carry 'Restaurant_latitude'
+and 'Restaurant_longitude'; the route features are then looked up
+through the route cache/OSRM like in the app, for a batch all at once with
+concurrent requests; when routing is unavailable they come from the
+calibrated straight-line estimator and the response flags the order with
+"route_estimated".
+
+Orders that cannot be encoded get HTTP 400; for a batch the error names
+the index of the first bad order.
+
+Single-order requests are grouped by a `MicroBatcher`, so concurrent
+requests share one model call. SMARTDELIVERY_MICRO_BATCH_MS sets the
+batching window (0 predicts every request on its own). Predictions of
+identical encoded orders are served from `prep_support`'s result cache,
+shared between workers when SMARTDELIVERY_PREDICTION_CACHE names a SQLite file.
+Stage latencies are recorded for /metrics when SMARTDELIVERY_METRICS=1.
+"""
+import os
+import asyncio
+import numbers
+import argparse
+import contextlib
+import numpy as np
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+from utils import batch_preparation, feature_schema, latency_metrics, prep_support
+from utils.micro_batcher import MAX_BATCH_SIZE, MicroBatcher
+
+# Largest batch accepted by /predict/batch
+MAX_BATCH_ORDERS = 10_000
+
+# Batching window for /predict in milliseconds, 0 to disable micro-batching
+MICRO_BATCH_MS = float(os.environ.get('SMARTDELIVERY_MICRO_BATCH_MS', 2.0))
+
+ROUTE_FEATURES = ('duration_osrm', 'speed_osrm')
+RESTAURANT_COLUMNS = ('Restaurant_latitude', 'Restaurant_longitude')
+DELIVERY_COLUMNS = ('Delivery_location_latitude', 'Delivery_location_longitude')
+
+# Order fields that must be finite numbers, and the labels accepted by the name-valued fields
+NUMBER_FIELDS = batch_preparation.NUMERIC_COLUMNS + ['Time_Orderd_Hour', 'Time_Order_picked_Hour']
+LABEL_FIELDS = {
+    **prep_support.ONE_HOT_CATEGORIES,
+    'Order_DayOfWeek': list(prep_support.DAY_OF_WEEK_MAP),
+    'Order_Month': list(prep_support.MONTH_MAP)
+}
+
+
+class OrderError(ValueError):
+    """Raised when an order cannot be encoded"""
+
+
+def validate_order(order):
+    """
+    Check the raw fields of an order; route features may be missing if they are looked up.
+
+    Raises:
+        OrderError: If a field is missing or null, a number is not finite (or is a
+            boolean), or a label is not one the model was trained on.
+    """
+    fields = NUMBER_FIELDS + list(LABEL_FIELDS)
+    missing = [
+        column for column in fields
+        if column not in order and not (column in ROUTE_FEATURES and needs_route(order))
+    ]
+    if missing:
+        raise OrderError(f"Missing values: {missing}")
+    nulls = [column for column in fields if column in order and order[column] is None]
+    if nulls:
+        raise OrderError(f"Null values: {nulls}")
+
+    for column in NUMBER_FIELDS:
+        value = order.get(column, 0.0)
+        if isinstance(value, (bool, np.bool_)) or not isinstance(value, numbers.Real) or not np.isfinite(value):
+            raise OrderError(f"{column} must be a finite number, got {value!r}")
+    for column, labels in LABEL_FIELDS.items():
+        if order[column] not in labels:
+            raise OrderError(f"Unknown {column} {order[column]!r}, expected one of {labels}")
+
+
+def needs_route(order):
+    """Return True if the order lacks route features and they must be looked up"""
+    return not all(column in order for column in ROUTE_FEATURES)
+
+
+def route_pair(order):
+    """
+    Restaurant and delivery coordinates of an order as (start_lon, start_lat, end_lon, end_lat).
+
+    Raises:
+        OrderError: If a coordinate is missing or not a number.
+    """
+    if not all(column in order for column in RESTAURANT_COLUMNS + DELIVERY_COLUMNS):
+        raise OrderError(f"Orders need either {list(ROUTE_FEATURES)} or {list(RESTAURANT_COLUMNS + DELIVERY_COLUMNS)}")
+    try:
+        return (
+            float(order['Restaurant_longitude']), float(order['Restaurant_latitude']),
+            float(order['Delivery_location_longitude']), float(order['Delivery_location_latitude'])
+        )
+    except (ValueError, TypeError) as e:
+        raise OrderError(f"Invalid coordinates: {e}")
+
+
+def with_route_data(order, route_data):
+    """
+    Return the order with the route features of `route_data`.
+
+    Adds 'route_estimated', True if the route comes from the straight-line
+    route estimator because routing was unavailable.
+
+    Raises:
+        OrderError: If there is no route.
+    """
+    if route_data is None:
+        raise OrderError("Failed to get route data. Please check your locations.")
+
+    route_features = batch_preparation.osrm_features(route_data['duration'], route_data['distance'])
+    return {
+        **order,
+        **{column: float(route_features[column]) for column in ROUTE_FEATURES},
+        'route_estimated': bool(route_data.get('estimated'))
+    }
+
+
+def with_route_features(order):
+    """
+    Return the order with its route features, looking the route up if they are missing.
+
+    Raises:
+        OrderError: If the route features are missing and cannot be looked up.
+    """
+    if not needs_route(order):
+        return order
+
+    route_data = prep_support.get_osrm_route_data(
+        *route_pair(order), city=order.get('City'), road_traffic_density=order.get('Road_traffic_density')
+    )
+    return with_route_data(order, route_data)
+
+
+def encode_order(order, out=None):
+    """
+    Encode one raw order with route features into a feature row.
+
+    Args:
+        order (dict): Raw order with route features
+        out (np.ndarray): Row to write into, a new one by default
+
+    Raises:
+        OrderError: If the order fails `validate_order`.
+    """
+    validate_order(order)
+
+    schema = feature_schema.get_feature_schema()
+    if out is None:
+        out = np.empty(schema.n_features, dtype=np.float32)
+    try:
+        with latency_metrics.timer('encode_order'):
+            return schema.encode(order, out=out)
+    except KeyError as e:
+        raise OrderError(f"Missing or unknown value: {e}")
+    except (ValueError, TypeError) as e:
+        raise OrderError(f"Invalid value: {e}")
+
+
+def predict_orders(orders):
+    """
+    Encode and predict a batch of raw orders (blocking).
+
+    Every order is validated before any route lookup, so a bad batch fails
+    without querying OSRM. Missing route features
+    are then resolved for the whole batch at once through
+    `prep_support.get_route_data_many`, and every order is encoded into one
+    feature matrix for a single model call.
+
+    Returns:
+        tuple: (predictions, 'route_estimated' flag of each order)
+
+    Raises:
+        OrderError: For the first order that cannot be encoded, naming its index.
+    """
+    lookups, pairs = [], []
+    for i, order in enumerate(orders):
+        try:
+            validate_order(order)
+            if needs_route(order):
+                pairs.append(route_pair(order))
+                lookups.append(i)
+        except OrderError as e:
+            raise OrderError(f"Order {i}: {e}")
+
+    orders = list(orders)
+    if lookups:
+        routes = prep_support.get_route_data_many(
+            pairs,
+            cities=[orders[i].get('City') for i in lookups],
+            road_traffic_densities=[orders[i].get('Road_traffic_density') for i in lookups]
+        )
+        for i, route_data in zip(lookups, routes):
+            try:
+                orders[i] = with_route_data(orders[i], route_data)
+            except OrderError as e:
+                raise OrderError(f"Order {i}: {e}")
+
+    features = np.empty((len(orders), feature_schema.get_feature_schema().n_features), dtype=np.float32)
+    for i, order in enumerate(orders):
+        try:
+            encode_order(order, out=features[i])
+        except OrderError as e:
+            raise OrderError(f"Order {i}: {e}")
+
+    estimated = [order.get('route_estimated', False) for order in orders]
+    return prep_support.make_batch_prediction(features).tolist(), estimated
+
+
+async def health(request):
+    return JSONResponse({'status': 'ok', 'model': prep_support.MODEL_FILENAME})
+
+
+async def predict(request):
+    try:
+        order = await request.json()
+    except ValueError:
+        return JSONResponse({'error': 'Body must be a JSON object'}, status_code=400)
+    if not isinstance(order, dict):
+        return JSONResponse({'error': 'Body must be a JSON object'}, status_code=400)
+
+    try:
+        validate_order(order)
+        if needs_route(order):
+            order = await run_in_threadpool(with_route_features, order)
+        features = encode_order(order)
+    except OrderError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+    batcher = request.app.state.batcher
+    if batcher is None:
+        prediction = float(prep_support.make_prediction(features)[0])
+    else:
+        cache = prep_support.get_prediction_cache()
+        key = prep_support.prediction_cache_key(features)
+        prediction = cache.get(key)
+        if prediction is None:
+            prediction = await asyncio.wrap_future(batcher.submit(features))
+            cache.set(key, prediction)
+    return JSONResponse({'prediction': prediction, 'route_estimated': order.get('route_estimated', False)})
+
+
+async def stats(request):
+    batcher = request.app.state.batcher
+    return JSONResponse({
+        'micro_batching': batcher.metrics() if batcher is not None else None,
+        'prediction_cache': prep_support.get_prediction_cache().stats(),
+        'route_lookups': prep_support.get_route_guard().stats()
+    })
+
+
+async def metrics(request):
+    return PlainTextResponse(latency_metrics.export_prometheus(), media_type='text/plain; version=0.0.4')
+
+
+async def predict_batch(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        return JSONResponse({'error': 'Body must be a JSON object'}, status_code=400)
+    orders = body.get('orders') if isinstance(body, dict) else None
+    if not isinstance(orders, list) or not all(isinstance(order, dict) for order in orders):
+        return JSONResponse({'error': "Body must be {\"orders\": [order, ...]}"}, status_code=400)
+    if len(orders) > MAX_BATCH_ORDERS:
+        return JSONResponse({'error': f"At most {MAX_BATCH_ORDERS} orders per batch"}, status_code=413)
+    if not orders:
+        return JSONResponse({'predictions': [], 'route_estimated': []})
+
+    try:
+        predictions, estimated = await run_in_threadpool(predict_orders, orders)
+    except OrderError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    return JSONResponse({'predictions': predictions, 'route_estimated': estimated})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Load the schema, model and its version before the first request, in every worker
+    feature_schema.get_feature_schema()
+    prep_support.get_model_version()
+    prep_support.make_prediction(np.zeros(feature_schema.get_feature_schema().n_features, dtype=np.float32))
+
+    app.state.batcher = None
+    if MICRO_BATCH_MS > 0:
+        app.state.batcher = MicroBatcher(prep_support.get_predictor(), MAX_BATCH_SIZE, MICRO_BATCH_MS)
+    yield
+    if app.state.batcher is not None:
+        app.state.batcher.close()
+
+
+app = Starlette(
+    routes=[
+        Route('/health', health, methods=['GET']),
+        Route('/stats', stats, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+        Route('/predict', predict, methods=['POST']),
+        Route('/predict/batch', predict_batch, methods=['POST'])
+    ],
+    lifespan=lifespan
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Delivery time prediction service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    uvicorn.run('api.prediction_api:app', host=args.host, port=args.port, workers=args.workers, log_level='warning')
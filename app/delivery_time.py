@@ -13,29 +13,32 @@ def delivery_time_page():
                 It's quick, easy, and designed to help you plan better. Just fill in the form below, and let the tool do the rest!
                  """)
 
-        # Data preparation and initialization
+        # Order form; the route and features are only prepared when it is submitted
         try:
-            data = dt_support.initialize_data()
-            current_input_key = dt_support.generate_input_key(data)
+            data, submitted = dt_support.initialize_data()
         except Exception as e:
             st.error("Failed to initialize data")
             st.stop()
         
-        # Session state management
-        dt_support.handle_session_state(current_input_key)
-        
-        # Map initialization
-        try:
-            dt_support.initialize_map(data, current_input_key)
-        except Exception as e:
-            st.warning("Could not initialize map")
-        
-        # Prediction handling
-        dt_support.handle_prediction(data)
+        if submitted:
+            current_input_key = dt_support.generate_input_key(data)
+
+            # Session state management
+            dt_support.handle_session_state(current_input_key)
+            
+            # Map initialization
+            try:
+                dt_support.initialize_map(data, current_input_key)
+            except Exception as e:
+                st.warning("Could not initialize map")
+            
+            # Prediction handling
+            dt_support.handle_prediction(data)
         
-        # UI components
-        dt_support.display_prediction_results()
-        dt_support.handle_map_buttons(data)
+        # UI components, each rerunning on its own when its widgets change
+        if data is not None:
+            dt_support.display_prediction_results()
+            dt_support.handle_map_buttons(data)
         dt_support.display_sample_data_table()
 
     except Exception as e:
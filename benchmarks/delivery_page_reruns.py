@@ -0,0 +1,110 @@
+"""
+Rerun cost of the Delivery Time page.
+
+Drives the page with Streamlit's AppTest: types a new delivery latitude
+digit by digit, as a user would, then asks for a prediction. Route lookups
+are answered by a fake OSRM route, so only the page's own work is timed.
+Reports the number of script reruns, route lookups and feature encodings
+and the mean/max rerun time. Exits with 1 if the page showed no
+prediction or encoded no order, so a broken page cannot pass as fast.
+
+Usage: python -m benchmarks.delivery_page_reruns
+"""
+import os
+import sys
+import time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from utils import feature_schema, prep_support  # noqa: E402
+
+# Delivery latitude typed one digit at a time (the widget default is 19.074049)
+TYPED_LATITUDE = '19.0812'
+
+# ~10 km drive between the page's default locations
+FAKE_ROUTE = {
+    'duration': 1050.0,
+    'distance': 10200.0,
+    'coordinates': [[72.825203, 18.994049], [72.86, 19.03], [72.905203, 19.074049]]
+}
+
+
+def page():
+    from app.delivery_time import delivery_time_page
+    delivery_time_page()
+
+
+def count_calls(module, name, counter):
+    """Wrap module.name so every call increments counter[name]"""
+    function = getattr(module, name)
+
+    def wrapper(*args, **kwargs):
+        counter[name] += 1
+        return function(*args, **kwargs)
+
+    setattr(module, name, wrapper)
+
+
+def typed_values(text):
+    """Values a number input holds while `text` is typed: '1', '19', '19.', '19.0', ..."""
+    prefixes = [text[:i] for i in range(1, len(text) + 1)]
+    return [float(prefix) for prefix in prefixes if not prefix.endswith('.')]
+
+
+def submit(at):
+    """Press the prediction button, whether it is a form submit or a plain button"""
+    for button in at.button:
+        if 'Predict' in str(button.label):
+            button.click()
+            return at.run()
+    raise RuntimeError("No prediction button on the page")
+
+
+def main():
+    counter = {'get_osrm_route_data': 0, 'encode': 0}
+    prep_support.get_osrm_route_data = lambda *args, **kwargs: FAKE_ROUTE
+    count_calls(prep_support, 'get_osrm_route_data', counter)
+    count_calls(feature_schema.FeatureSchema, 'encode', counter)
+
+    os.chdir(ROOT)
+    at = AppTest.from_function(page, default_timeout=60)
+    at.run()
+    counter.update({key: 0 for key in counter})
+
+    latitude = next(widget for widget in at.number_input if widget.label == 'Delivery Location Latitude')
+    # Like a browser, edits to a widget inside a form only rerun the script on submit
+    in_form = bool(latitude.proto.form_id)
+    timings = []
+    edits = typed_values(TYPED_LATITUDE)
+    for value in edits:
+        latitude.set_value(value)
+        if not in_form:
+            start = time.perf_counter()
+            at.run()
+            timings.append(time.perf_counter() - start)
+    while_typing = dict(counter)
+
+    start = time.perf_counter()
+    submit(at)
+    timings.append(time.perf_counter() - start)
+
+    timings_ms = np.array(timings) * 1e3
+    print(f"{len(edits)} edits + 1 prediction = {len(timings)} reruns")
+    print(f"route lookups: {while_typing['get_osrm_route_data']} while typing, {counter['get_osrm_route_data']} in total")
+    print(f"feature encodings: {while_typing['encode']} while typing, {counter['encode']} in total")
+    print(f"rerun time: mean {timings_ms.mean():.1f} ms, max {timings_ms.max():.1f} ms")
+    prediction_shown = any('minutes' in str(block.value) for block in at.success)
+    print(f"prediction shown: {prediction_shown}")
+
+    if not prediction_shown or counter['encode'] == 0:
+        for block in at.error:
+            print(f"page error: {block.value}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Fake OSRM `route` server that injects latency and failures.
+
+Answers /route/v1/<profile>/<lon,lat;lon,lat> with a straight two-point
+route, after `--delay-ms` of latency. A `--error-rate` share of requests
+gets HTTP 503 and a `--stall-rate` share hangs for `--stall-seconds`, to
+exercise timeouts, retries, hedging and the circuit breaker of
+`utils.route_guard`.
+
+Usage: python -m benchmarks.fake_osrm [--port 5001] [--delay-ms 20]
+           [--error-rate 0.1] [--stall-rate 0.05] [--stall-seconds 30]
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.offline_router import haversine_m
+
+
+class FakeOSRMHandler(BaseHTTPRequestHandler):
+    """Request handler; behaviour is set through the server's `faults` dict"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up waiting, as timeouts and hedging intend
+
+    def do_GET(self):
+        faults = self.server.faults
+        with self.server.lock:
+            self.server.requests += 1
+
+        draw = random.random()
+        if draw < faults['stall_rate']:
+            time.sleep(faults['stall_seconds'])
+        time.sleep(faults['delay_ms'] / 1000)
+        if faults['stall_rate'] <= draw < faults['stall_rate'] + faults['error_rate']:
+            return self.send_body(503, {'code': 'Unavailable'})
+
+        try:
+            points = self.path.split('?')[0].rsplit('/', 1)[1]
+            (start_lon, start_lat), (end_lon, end_lat) = (
+                [float(value) for value in point.split(',')] for point in points.split(';')
+            )
+        except ValueError:
+            return self.send_body(400, {'code': 'InvalidQuery'})
+
+        distance = float(haversine_m(start_lat, start_lon, end_lat, end_lon)) * 1.3
+        self.send_body(200, {'code': 'Ok', 'routes': [{
+            'duration': distance / (25 / 3.6),
+            'distance': distance,
+            'geometry': {'coordinates': [[start_lon, start_lat], [end_lon, end_lat]]}
+        }]})
+
+
+def start_server(port=0, delay_ms=20.0, error_rate=0.0, stall_rate=0.0, stall_seconds=30.0):
+    """
+    Start a fake OSRM server in a background thread.
+
+    Returns:
+        ThreadingHTTPServer: The server; change `server.faults` to alter its behaviour,
+            read `server.requests` for the request count and `server.server_port` for its port
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeOSRMHandler)
+    server.daemon_threads = True
+    server.faults = {
+        'delay_ms': delay_ms,
+        'error_rate': error_rate,
+        'stall_rate': stall_rate,
+        'stall_seconds': stall_seconds
+    }
+    server.requests = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--delay-ms', type=float, default=20.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--stall-rate', type=float, default=0.0)
+    parser.add_argument('--stall-seconds', type=float, default=30.0)
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.delay_ms, args.error_rate, args.stall_rate, args.stall_seconds)
+    print(f"Fake OSRM listening on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,121 @@
+"""
+Load test for the prediction service (api/prediction_api.py).
+
+Keeps `--concurrency` requests in flight for `--duration` seconds and reports
+requests per second and latency percentiles.
+
+Usage: python -m benchmarks.load_test [--url http://127.0.0.1:8000] [--concurrency 32]
+           [--duration 10] [--batch-size 0]
+
+--batch-size 0 posts single orders to /predict, N > 0 posts N orders per
+request to /predict/batch.
+"""
+import time
+import argparse
+import threading
+import numpy as np
+import requests
+
+# "Driver 1" of the sample table on the Delivery Time page
+SAMPLE_ORDER = {
+    'Delivery_person_Age': 39.0,
+    'Delivery_person_Ratings': 4.9,
+    'Delivery_location_latitude': 19.074049,
+    'Delivery_location_longitude': 72.905203,
+    'Vehicle_condition': 0,
+    'multiple_deliveries': 1.0,
+    'duration_osrm': 17.5,
+    'speed_osrm': 24.3,
+    'Weather_conditions': 'Stormy',
+    'Road_traffic_density': 'Jam',
+    'Type_of_order': 'Snack',
+    'Type_of_vehicle': 'motorcycle',
+    'Festival': 'No',
+    'City': 'Metropolitian',
+    'Order_DayOfWeek': 'Monday',
+    'Order_Month': 'April',
+    'Time_Orderd_Hour': 21,
+    'Time_Order_picked_Hour': 21
+}
+
+
+def worker(url, payload, deadline, latencies, errors, lock):
+    """Send requests back to back until the deadline, recording latencies"""
+    session = requests.Session()
+    local_latencies, local_errors = [], 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = session.post(url, json=payload, timeout=10)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        if ok:
+            local_latencies.append(time.perf_counter() - start)
+        else:
+            local_errors += 1
+    with lock:
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+
+def run(url, concurrency, duration, batch_size):
+    """
+    Run the load test.
+
+    Returns:
+        dict: 'requests', 'errors', 'rps', 'orders_per_second' and latency
+            percentiles 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms'
+    """
+    if batch_size:
+        endpoint, payload = f'{url}/predict/batch', {'orders': [SAMPLE_ORDER] * batch_size}
+    else:
+        endpoint, payload = f'{url}/predict', SAMPLE_ORDER
+
+    # Warm up connections and workers
+    requests.post(endpoint, json=payload, timeout=30).raise_for_status()
+
+    latencies, errors, lock = [], [], threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration
+    threads = [
+        threading.Thread(target=worker, args=(endpoint, payload, deadline, latencies, errors, lock))
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1e3
+    percentiles = np.percentile(latencies_ms, [50, 90, 99, 100]) if len(latencies_ms) else [np.nan] * 4
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'rps': len(latencies) / elapsed,
+        'orders_per_second': len(latencies) * max(batch_size, 1) / elapsed,
+        'p50_ms': percentiles[0],
+        'p90_ms': percentiles[1],
+        'p99_ms': percentiles[2],
+        'max_ms': percentiles[3]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds')
+    parser.add_argument('--batch-size', type=int, default=0, help='orders per request, 0 for /predict')
+    args = parser.parse_args()
+
+    result = run(args.url.rstrip('/'), args.concurrency, args.duration, args.batch_size)
+    print(f"{result['requests']} requests, {result['errors']} errors in {args.duration:.0f} s")
+    print(f"{result['rps']:.0f} requests/s ({result['orders_per_second']:.0f} orders/s)")
+    print(f"latency p50 {result['p50_ms']:.2f} ms, p90 {result['p90_ms']:.2f} ms, "
+          f"p99 {result['p99_ms']:.2f} ms, max {result['max_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
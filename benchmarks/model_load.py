@@ -0,0 +1,120 @@
+"""
+Compare the joblib-pickled model, the native XGBoost booster and the
+compiled NumPy tree evaluator.
+
+Reports cold load time (fresh interpreter, imports included), warm load time
+and p50/p99 single-row prediction latency for each path, and checks that
+they predict the same values.
+
+Usage: python -m benchmarks.model_load [--rows 2000] [--repeat 5]
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import model_artifact  # noqa: E402
+from utils.tree_ensemble import TreeEnsemble, compile_model_file, compiled_model_path, save_ensemble  # noqa: E402
+
+MODEL_FILENAME = 'XGBoost_20250508_151557.pkl'
+
+# Run in a fresh interpreter so import and unpickling costs are included
+COLD_LOAD = {
+    'joblib': "import joblib; joblib.load({path!r})",
+    'native': "from utils import model_artifact; model_artifact.load_booster({path!r})",
+    'compiled': "from utils.tree_ensemble import TreeEnsemble; TreeEnsemble.from_file({path!r})"
+}
+
+
+def cold_load_seconds(kind, path, repeat):
+    """Median wall time of importing and loading a model in a new process"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', COLD_LOAD[kind].format(path=path)], cwd=ROOT, check=True)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def warm_load_seconds(load, repeat):
+    """Median time of loading a model in this (already importing) process"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def latency_ms(predict, rows):
+    """p50/p99 latency in milliseconds of predicting one row at a time"""
+    for row in rows[:50]:
+        predict(row)  # warm-up
+    times = np.empty(len(rows))
+    for i, row in enumerate(rows):
+        start = time.perf_counter()
+        predict(row)
+        times[i] = time.perf_counter() - start
+    return float(np.percentile(times, 50) * 1e3), float(np.percentile(times, 99) * 1e3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000, help='single-row predictions to time')
+    parser.add_argument('--repeat', type=int, default=5, help='load repetitions')
+    args = parser.parse_args()
+
+    import joblib
+
+    pickle_path = os.path.join(model_artifact.MODEL_DIR, MODEL_FILENAME)
+    native_path = model_artifact.native_model_path(MODEL_FILENAME)
+    compiled_path = compiled_model_path(MODEL_FILENAME)
+    os.chdir(ROOT)
+    if not os.path.exists(native_path):
+        model_artifact.export_native_model(MODEL_FILENAME)
+    if not os.path.exists(compiled_path):
+        save_ensemble(compiled_path, compile_model_file(native_path))
+
+    model = joblib.load(pickle_path)
+    booster = model_artifact.load_booster(native_path)
+    ensemble = TreeEnsemble.from_file(compiled_path)
+
+    rng = np.random.default_rng(0)
+    rows = rng.random((args.rows, booster.num_features()), dtype=np.float32).reshape(args.rows, 1, -1)
+    expected = model.predict(rows[:, 0])
+    candidates = {'Native booster': booster.inplace_predict, 'Compiled trees': ensemble.predict}
+    for name, predict in candidates.items():
+        actual = predict(rows[:, 0])
+        if not np.allclose(expected, actual, rtol=0, atol=1e-5):
+            raise SystemExit(f"{name} differs from the pickled model by {np.abs(expected - actual).max()}")
+
+    results = {
+        'joblib': (
+            cold_load_seconds('joblib', pickle_path, args.repeat),
+            warm_load_seconds(lambda: joblib.load(pickle_path), args.repeat),
+            latency_ms(model.predict, rows)
+        ),
+        'native': (
+            cold_load_seconds('native', native_path, args.repeat),
+            warm_load_seconds(lambda: model_artifact.load_booster(native_path), args.repeat),
+            latency_ms(booster.inplace_predict, rows)
+        ),
+        'compiled': (
+            cold_load_seconds('compiled', compiled_path, args.repeat),
+            warm_load_seconds(lambda: TreeEnsemble.from_file(compiled_path), args.repeat),
+            latency_ms(ensemble.predict, rows)
+        )
+    }
+
+    print(f"{'path':<10}{'cold load (s)':>15}{'warm load (ms)':>16}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    for name, (cold, warm, (p50, p99)) in results.items():
+        print(f"{name:<10}{cold:>15.3f}{warm * 1e3:>16.2f}{p50:>10.3f}{p99:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+Benchmark suite for the prediction, routing and dashboard hot paths.
+
+Runs offline: route lookups are answered by a fixed fake route and the model
+is loaded from saved_models/. Every benchmark is warmed up once and then
+timed `--repeat` times; the results, with the commit and library versions
+they were measured on, are written as JSON so runs can be compared across
+commits and dependency upgrades.
+
+Cold imports of the app's entry point and pages are timed in fresh
+interpreters and checked against IMPORT_TIME_BUDGET_MS and
+FORBIDDEN_IMPORTS; the suite exits with status 1 if a budget is exceeded.
+
+Usage: python -m benchmarks.suite [--output benchmarks/results/<commit>.json]
+           [--rows 10000 100000 1000000] [--repeat 5]
+       python -m benchmarks.suite --compare old.json new.json
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import importlib.metadata
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import dash_support, data_preparation, prep_support  # noqa: E402
+from utils.dashboard_artifact import DashboardAggregates  # noqa: E402
+from utils.driver_aggregates import DriverAggregateStore  # noqa: E402
+from utils.synthetic_deliveries import synthetic_deliveries  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# Delivery log sizes for the dashboard aggregates
+DEFAULT_ROWS = (10_000, 100_000, 1_000_000)
+
+# Deliveries per batch appended to the incremental driver aggregates
+APPEND_BATCH_ROWS = 100
+
+# Libraries whose upgrades the suite is meant to catch
+TRACKED_PACKAGES = ('numpy', 'pandas', 'scipy', 'xgboost', 'folium', 'streamlit', 'plotly')
+
+# ~10 km drive between the Delivery Time page's default locations
+FAKE_ROUTE = {
+    'duration': 1050.0,
+    'distance': 10200.0,
+    'coordinates': [[72.825203, 18.994049], [72.86, 19.03], [72.905203, 19.074049]]
+}
+
+# Cold import budget of the app's entry point and each page, in milliseconds
+IMPORT_TIME_BUDGET_MS = {
+    'smartdelivery_app': 1000,
+    'custom_pages.home': 1000,
+    'custom_pages.contact': 1000,
+    'custom_pages.overview': 1000,
+    'custom_pages.dashboard': 1800,
+    'app.delivery_time': 1800
+}
+
+# Heavy packages a page must not load just by being imported
+FORBIDDEN_IMPORTS = {
+    'smartdelivery_app': ('pandas', 'scipy', 'xgboost', 'folium', 'plotly.express'),
+    'custom_pages.home': ('pandas', 'scipy', 'xgboost', 'folium', 'plotly.express'),
+    'custom_pages.contact': ('pandas', 'scipy', 'xgboost', 'folium', 'plotly.express'),
+    'custom_pages.overview': ('pandas', 'scipy', 'xgboost', 'folium', 'plotly.express'),
+    'custom_pages.dashboard': ('scipy', 'xgboost', 'folium', 'plotly.express'),
+    'app.delivery_time': ('scipy', 'xgboost', 'folium', 'plotly.express')
+}
+
+# Run in a fresh interpreter with -X importtime: wall time of one import and the forbidden packages it loaded
+IMPORT_PROBE = """
+import sys, json, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [name for name in {forbidden!r} if name in sys.modules]}}))
+"""
+
+# Default inputs of the Delivery Time form
+ORDER_INPUTS = {
+    'delivery_person_age': 39,
+    'delivery_person_ratings': 4.9,
+    'restaurant_location_latitude': 18.994049,
+    'restaurant_location_longitude': 72.825203,
+    'delivery_location_latitude': 19.074049,
+    'delivery_location_longitude': 72.905203,
+    'vehicle_condition': 0,
+    'multiple_deliveries': 1,
+    'weather_conditions': 'Stormy',
+    'road_traffic_density': 'Jam',
+    'type_of_order': 'Snack',
+    'type_of_vehicle': 'Motorcycle',
+    'festival': 'No',
+    'city': 'Metropolitan',
+    'order_day_of_week': 'Monday',
+    'order_month': 'April',
+    'time_ordered_hour': 21,
+    'time_picked_hour': 21,
+    'time_picked_mins': 25
+}
+
+
+def measure(function, repeat, number=1):
+    """
+    Time `function` after one warm-up call.
+
+    Args:
+        repeat (int): Timed samples
+        number (int): Calls per sample, for functions too fast to time alone
+
+    Returns:
+        dict: 'min_s', 'median_s', 'mean_s', 'max_s' per call and 'samples'
+    """
+    function()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    times = np.array(times)
+    return {
+        'min_s': float(times.min()),
+        'median_s': float(np.median(times)),
+        'mean_s': float(times.mean()),
+        'max_s': float(times.max()),
+        'samples': repeat * number
+    }
+
+
+def bench_prediction(repeat):
+    """Single-order encoding and prediction, with OSRM stubbed"""
+    prep_support.get_osrm_route_data = lambda *args, **kwargs: FAKE_ROUTE
+    results = {
+        'data_prep.prepare_order': measure(lambda: data_preparation.prepare_order(**ORDER_INPUTS), repeat, 200)
+    }
+
+    # Distinct rows, so every call misses the prediction cache and runs the model
+    features = data_preparation.prepare_order(**ORDER_INPUTS)['features']
+    rows = np.repeat(features, repeat * 200 + 1, axis=0)
+    rows[:, 0] = 15 + np.arange(len(rows)) * 1e-4
+    rows = iter(rows)
+    results['make_prediction (miss)'] = measure(lambda: prep_support.make_prediction(next(rows)), repeat, 200)
+    results['make_prediction (hit)'] = measure(lambda: prep_support.make_prediction(features), repeat, 200)
+    return results
+
+
+def bench_routes(repeat):
+    """Route parsing, loading and map building over the shipped routes"""
+    route_strings = pd.read_csv(dash_support.ROUTE_CSV_PATH)['routes'].tolist()
+    restaurant_locs, delivery_locs, routes = dash_support.load_route_data()
+    map_obj = dash_support.generate_route_map(restaurant_locs, delivery_locs, routes)
+    return {
+        'dash_support.parse_route': {
+            **measure(lambda: [dash_support.parse_route(route) for route in route_strings], repeat),
+            'routes': len(route_strings)
+        },
+        'dash_support.load_route_data': measure(dash_support.load_route_data, repeat),
+        'dash_support.generate_route_map': measure(
+            lambda: dash_support.generate_route_map(restaurant_locs, delivery_locs, routes), repeat
+        ),
+        'dash_support.render_map': measure(lambda: dash_support.render_map(map_obj), repeat)
+    }
+
+
+def bench_driver_aggregates(row_counts, repeat):
+    """
+    Driver performance aggregates over delivery logs of each size, appending
+    a small batch to the incremental store, and building and loading the
+    precomputed dashboard aggregates
+    """
+    results = {}
+    artifact_path = os.path.join(tempfile.mkdtemp(), 'dashboard_aggregates.json')
+    batch = synthetic_deliveries(APPEND_BATCH_ROWS, seed=1)
+    for n_rows in row_counts:
+        charts_df = synthetic_deliveries(n_rows)
+        performance_df = dash_support.create_performance_df(charts_df)
+        results[f'create_performance_df[{n_rows}]'] = {
+            **measure(lambda: dash_support.create_performance_df(charts_df), repeat),
+            'rows': n_rows
+        }
+        results[f'calculate_efficiency_metrics[{n_rows}]'] = {
+            **measure(lambda: dash_support.calculate_efficiency_metrics(performance_df), repeat),
+            'rows': n_rows,
+            'drivers': len(performance_df)
+        }
+        store = DriverAggregateStore()
+        store.append(charts_df)
+        results[f'DriverAggregateStore.append[{n_rows}]'] = {
+            **measure(lambda: store.append(batch), repeat),
+            'rows': n_rows,
+            'batch_rows': APPEND_BATCH_ROWS
+        }
+        results[f'DriverAggregateStore.efficiency_df[{n_rows}]'] = {
+            **measure(store.efficiency_df, repeat),
+            'rows': n_rows,
+            'drivers': len(store)
+        }
+        results[f'DashboardAggregates.build[{n_rows}]'] = {
+            **measure(lambda: DashboardAggregates.build(charts_df), repeat),
+            'rows': n_rows
+        }
+        DashboardAggregates.build(charts_df).save(artifact_path)
+        results[f'DashboardAggregates.from_file[{n_rows}]'] = {
+            **measure(lambda: DashboardAggregates.from_file(artifact_path), repeat),
+            'rows': n_rows,
+            'bytes': os.path.getsize(artifact_path)
+        }
+    return results
+
+
+def import_profile(stderr, module, top=5):
+    """
+    Slowest imports of an `-X importtime` log as (package, cumulative ms).
+
+    Only packages imported at the top level or directly by `module` are
+    listed; deeper imports are already counted in their parents.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or line.endswith('imported package'):
+            continue
+        _, cumulative, name = line.split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1 and name.strip() != module:
+            entries.append((name.strip(), int(cumulative) / 1e3))
+    return sorted(entries, key=lambda entry: entry[1], reverse=True)[:top]
+
+
+def bench_import_time(repeat):
+    """Cold import of the entry point and every page, each in `repeat` fresh interpreters"""
+    results = {}
+    for module, budget_ms in IMPORT_TIME_BUDGET_MS.items():
+        times, loaded, profile = [], set(), None
+        for _ in range(repeat):
+            probe = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c',
+                 IMPORT_PROBE.format(module=module, forbidden=FORBIDDEN_IMPORTS[module])],
+                cwd=ROOT, capture_output=True, text=True, check=True
+            )
+            result = json.loads(probe.stdout.strip().splitlines()[-1])
+            times.append(result['seconds'])
+            loaded.update(result['loaded'])
+            profile = profile or import_profile(probe.stderr, module)
+        times = np.array(times)
+        results[f'import {module}'] = {
+            'min_s': float(times.min()),
+            'median_s': float(np.median(times)),
+            'mean_s': float(times.mean()),
+            'max_s': float(times.max()),
+            'samples': repeat,
+            'budget_ms': budget_ms,
+            'forbidden_loaded': sorted(loaded),
+            'within_budget': bool(np.median(times) * 1e3 <= budget_ms and not loaded),
+            'slowest_imports_ms': profile
+        }
+    return results
+
+
+def environment():
+    """Commit, interpreter and library versions the results were measured on"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    versions = {}
+    for package in TRACKED_PACKAGES:
+        try:
+            versions[package] = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'packages': versions
+    }
+
+
+def compare(old_path, new_path):
+    """Print the median time of every benchmark in two result files and their ratio"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    print(f"{'benchmark':<48}{'old (ms)':>12}{'new (ms)':>12}{'ratio':>8}")
+    for name, result in new['benchmarks'].items():
+        if name not in old['benchmarks']:
+            continue
+        before, after = old['benchmarks'][name]['median_s'] * 1e3, result['median_s'] * 1e3
+        print(f"{name:<48}{before:>12.3f}{after:>12.3f}{after / before:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', help='result file (default benchmarks/results/<commit>.json)')
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help='delivery log sizes')
+    parser.add_argument('--repeat', type=int, default=5, help='timed samples per benchmark')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files')
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare(*args.compare)
+
+    os.chdir(ROOT)
+    env = environment()
+    benchmarks = {}
+    benchmarks.update(bench_import_time(args.repeat))
+    benchmarks.update(bench_prediction(args.repeat))
+    benchmarks.update(bench_routes(args.repeat))
+    benchmarks.update(bench_driver_aggregates(args.rows, args.repeat))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{env['commit'] or 'results'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'environment': env, 'benchmarks': benchmarks}, f, indent=1)
+
+    print(f"{'benchmark':<48}{'median (ms)':>12}{'min (ms)':>12}")
+    for name, result in benchmarks.items():
+        print(f"{name:<48}{result['median_s'] * 1e3:>12.3f}{result['min_s'] * 1e3:>12.3f}")
+    print(f"Wrote {output}")
+
+    over_budget = [name for name, result in benchmarks.items() if result.get('within_budget') is False]
+    for name in over_budget:
+        result = benchmarks[name]
+        print(f"Over budget: {name} took {result['median_s'] * 1e3:.0f} ms (budget {result['budget_ms']} ms), "
+              f"loaded {result['forbidden_loaded'] or 'no forbidden packages'}")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
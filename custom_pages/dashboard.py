@@ -27,47 +27,39 @@ def dashboard_page():
     ########## Delivery routes section
     st.subheader('🧭 Delivery Routes Visualization')
     
-    # Initialize cached map
-    if 'cached_map' not in st.session_state:
-        st.session_state.cached_map = None
-    
-    # Generate map if not cached
-    if not st.session_state.cached_map:
-        with st.spinner('Generating optimized route visualization...'):
-            restaurant_locs, delivery_locs, routes = dash_support.load_route_data()
-            st.session_state.cached_map = dash_support.generate_route_map(
-                restaurant_locs,
-                delivery_locs,
-                routes
-            )
-    
-    # Display cached map
-    if st.session_state.cached_map:
-        dash_support.render_map(st.session_state.cached_map)
+    # Large route histories are loaded per viewport as the user pans
+    route_count = dash_support.route_store_size()
+    if route_count is not None and route_count > dash_support.VIEWPORT_ROUTE_THRESHOLD:
+        dash_support.render_viewport_map()
+
+    else:
+        # Map and HTML are built once per route source version and shared by all sessions
+        _, map_html = dash_support.get_route_map()
+        dash_support.render_map_html(map_html)
+
+
+    # Aggregates of the delivery log, precomputed by `python -m utils.dashboard_artifact`;
+    # driver sections from the store updated by `python -m utils.driver_aggregates`
+    aggregates = dash_support.get_dashboard_aggregates()
 
 
     ########### Feature Importance section
-    dash_support.show_feature_importance()
+    dash_support.show_feature_importance(aggregates.feature_importance)
 
 
     ########### Traffic Levels section
-    charts_df = pd.read_csv('saved_csv/charts.csv')
-    dash_support.visualize_traffic_levels(charts_df)
+    dash_support.visualize_traffic_levels(aggregates.traffic_by_hour)
 
 
     ########### Underperforming Drivers section
-    # Create and transform data
-    performance_df = dash_support.create_performance_df(charts_df)
-    performance_df = dash_support.calculate_efficiency_metrics(performance_df)
-    underperformers_table, underperformers_length = dash_support.generate_underperformers_table(performance_df)
-    key_metrics = dash_support.generate_key_metrics(performance_df)
+    key_metrics = aggregates.key_metrics
     
     # Display metrics
-    st.subheader(f'🙁 Underperforming Drivers ({underperformers_length}/{len(performance_df)})')
+    st.subheader(f'🙁 Underperforming Drivers ({aggregates.underperformer_count}/{aggregates.driver_count})')
     
     # Show underperformers table
     st.dataframe(
-        underperformers_table,
+        aggregates.underperformers_table,
         column_config={
             "speed_ratio": st.column_config.NumberColumn(
                 "Speed Ratio",
@@ -1,4 +1,6 @@
+import threading
 import streamlit as st
+from utils import latency_metrics
 
 # Adjusting the page
 st.set_page_config(
@@ -7,7 +9,28 @@ st.set_page_config(
     layout='wide'
 )
 
+def warm_up_prediction():
+    """Load the feature schema and model and run one prediction, so the first real one is fast"""
+    # Imported here: pandas, the schema and the model stay off the script thread
+    import numpy as np
+    from utils import feature_schema, prep_support
+
+    if prep_support.PREDICTION_SERVICE_URL:
+        return  # predictions come from the service
+    schema = feature_schema.get_feature_schema()
+    prep_support.make_prediction(np.zeros(schema.n_features, dtype=np.float32))
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    """Start warming the prediction path in a background thread, once per process"""
+    thread = threading.Thread(target=warm_up_prediction, name='smartdelivery-warm-up', daemon=True)
+    thread.start()
+    return thread
+
 def main():
+    # Pages that never predict render without waiting for the model
+    start_warm_up()
+
     # Load external CSS
     def load_css():
         with open("assets/styles.css") as f:
@@ -76,5 +99,9 @@ def main():
         from custom_pages.contact import contact_page
         contact_page()
 
+    # Stage latencies of this process, after the page so they include its run
+    if latency_metrics.METRICS_PANEL:
+        latency_metrics.render_metrics_panel()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,76 @@
+import time
+import pytest
+from utils.cache_support import TwoTierCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake time.time that only moves when the test advances it"""
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    return now
+
+
+def test_memory_only_cache_evicts_least_recently_used():
+    cache = TwoTierCache(max_memory_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    stats = cache.stats()
+    assert stats['memory_evictions'] == 1
+    assert stats['disk_entries'] == 0
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    TwoTierCache(path).set('route', {'duration': 12.5, 'coords': [[1.0, 2.0]]})
+
+    cache = TwoTierCache(path)
+    assert cache.stats()['disk_entries'] == 1
+    assert cache.get('route') == {'duration': 12.5, 'coords': [[1.0, 2.0]]}
+    assert cache.get('route') == {'duration': 12.5, 'coords': [[1.0, 2.0]]}
+    stats = cache.stats()
+    assert (stats['disk_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 0)
+
+
+def test_entries_expire_in_both_tiers(tmp_path, clock):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = TwoTierCache(path, ttl_seconds=60)
+    cache.set('a', 1)
+
+    clock[0] += 59
+    assert cache.get('a') == 1
+    clock[0] += 2
+    assert cache.get('a') is None
+    assert cache.stats()['expired'] == 2
+    assert TwoTierCache(path).stats()['disk_entries'] == 0
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path, clock):
+    cache = TwoTierCache(str(tmp_path / 'cache.sqlite'), max_memory_entries=1, max_disk_entries=2)
+    for key in 'abc':
+        cache.set(key, key)
+        clock[0] += 1
+        if key == 'b':
+            assert cache.get('a') == 'a'
+            clock[0] += 1
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == ('a', 'c')
+    assert cache.stats()['disk_evictions'] == 1
+
+
+def test_set_overwrites_and_clear_empties_both_tiers(tmp_path):
+    cache = TwoTierCache(str(tmp_path / 'cache.sqlite'))
+    cache.set('a', 1)
+    cache.set('a', 2)
+    assert cache.stats()['disk_entries'] == 1
+    assert TwoTierCache(str(tmp_path / 'cache.sqlite')).get('a') == 2
+
+    cache.clear()
+    assert cache.get('a') is None
+    assert cache.stats()['memory_entries'] == cache.stats()['disk_entries'] == 0
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils import dash_support
+from utils.dashboard_artifact import DashboardAggregates, SOURCE_COLUMNS
+from utils.driver_aggregates import REQUIRED_COLUMNS, DriverAggregateStore
+from utils.synthetic_deliveries import synthetic_deliveries
+
+
+@pytest.fixture(scope='module')
+def deliveries():
+    """Synthetic log with missing values and rows without a driver"""
+    df = synthetic_deliveries(6000, seed=5)
+    rng = np.random.default_rng(5)
+    for column in ('Delivery_person_Ratings', 'Time_taken (min)', 'speed_osrm'):
+        df.loc[rng.random(len(df)) < 0.03, column] = np.nan
+    df.loc[rng.random(len(df)) < 0.01, 'Delivery_person_ID'] = None
+    return df
+
+
+def batch_efficiency(deliveries):
+    return dash_support.calculate_efficiency_metrics(dash_support.create_performance_df(deliveries))
+
+
+def appended_store(deliveries, seed=0):
+    """Store fed with the log in chunks of random size"""
+    store = DriverAggregateStore()
+    bounds = np.sort(np.random.default_rng(seed).choice(np.arange(1, len(deliveries)), 12, replace=False))
+    for chunk in np.split(np.arange(len(deliveries)), bounds):
+        store.append(deliveries.iloc[chunk])
+    return store
+
+
+def test_incremental_matches_batch(deliveries):
+    expected = batch_efficiency(deliveries)
+
+    pd.testing.assert_frame_equal(appended_store(deliveries).efficiency_df(), expected, check_dtype=False, rtol=1e-9)
+
+
+def test_append_returns_the_touched_drivers(deliveries):
+    store = appended_store(deliveries.iloc[:5000])
+    batch = deliveries.iloc[5000:]
+
+    touched = store.append(batch).set_index('Delivery_person_ID').sort_index()
+    expected = batch_efficiency(deliveries).set_index('Delivery_person_ID')
+
+    assert set(touched.index) == set(batch['Delivery_person_ID'].dropna())
+    pd.testing.assert_frame_equal(touched, expected.loc[touched.index], check_dtype=False, rtol=1e-9)
+
+
+def test_variance_matches_groupby(deliveries):
+    store = appended_store(deliveries, seed=1)
+    expected = deliveries.groupby('Delivery_person_ID')['Time_taken (min)'].var(ddof=0)
+
+    pd.testing.assert_series_equal(store.variance('Time_taken (min)'), expected, check_names=False, rtol=1e-9)
+
+
+def test_saved_store_keeps_appending(deliveries, tmp_path):
+    path = tmp_path / 'drivers.npz'
+    appended_store(deliveries.iloc[:3000]).save(path)
+
+    store = DriverAggregateStore.from_file(path)
+    store.append(deliveries.iloc[3000:])
+
+    pd.testing.assert_frame_equal(store.efficiency_df(), batch_efficiency(deliveries), check_dtype=False, rtol=1e-9)
+
+
+def test_dashboard_driver_sections_come_from_the_store(deliveries):
+    built = DashboardAggregates.build(deliveries.iloc[:2000][SOURCE_COLUMNS])
+    full = DashboardAggregates.build(deliveries[SOURCE_COLUMNS])
+
+    aggregates = built.with_driver_aggregates(appended_store(deliveries))
+
+    assert (aggregates.driver_count, aggregates.underperformer_count) == (full.driver_count, full.underperformer_count)
+    pd.testing.assert_frame_equal(aggregates.underperformers_table, full.underperformers_table)
+    assert aggregates.key_metrics == pytest.approx(full.key_metrics, rel=1e-9)
+    pd.testing.assert_frame_equal(aggregates.traffic_by_hour, built.traffic_by_hour)
+
+
+def test_missing_columns_are_rejected(deliveries):
+    with pytest.raises(ValueError, match='Missing columns'):
+        DriverAggregateStore().append(deliveries[REQUIRED_COLUMNS[:-1]])
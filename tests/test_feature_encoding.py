@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils import batch_preparation, prep_support
+from utils.feature_schema import get_feature_schema
+from utils.synthetic_deliveries import synthetic_deliveries
+
+
+def legacy_data_prep(order):
+    """One order through the original prep_support chain of `data_preparation.data_prep`"""
+    df = pd.DataFrame({
+        'Delivery_person_Age': [float(order['Delivery_person_Age'])],
+        'Delivery_person_Ratings': [order['Delivery_person_Ratings']],
+        'Delivery_location_latitude': [order['Delivery_location_latitude']],
+        'Delivery_location_longitude': [order['Delivery_location_longitude']],
+        'Vehicle_condition': [order['Vehicle_condition']],
+        'multiple_deliveries': [float(order['multiple_deliveries'])],
+        'duration_osrm': [order['duration_osrm']],
+        'speed_osrm': [order['speed_osrm']]
+    })
+    df = prep_support.one_hot_encode(df, 'Weather_conditions', ["Cloudy", "Fog", "Sandstorms", "Stormy", "Sunny", "Windy"], order['Weather_conditions'])
+    df = prep_support.one_hot_encode(df, 'Road_traffic_density', ["High", "Jam", "Low", "Medium"], order['Road_traffic_density'])
+    df = prep_support.one_hot_encode(df, 'Type_of_order', ["Buffet", "Drinks", "Meal", "Snack"], order['Type_of_order'])
+    df = prep_support.one_hot_encode(df, 'Type_of_vehicle', ["bicycle", "electric_scooter", "motorcycle", "scooter"], order['Type_of_vehicle'])
+    df = prep_support.one_hot_encode(df, 'Festival', ["No", "Unknown", "Yes"], order['Festival'])
+    df = prep_support.one_hot_encode(df, 'City', ["Metropolitian", "Semi-Urban", "Urban"], order['City'])
+    df = prep_support.transform_datetime_features(
+        df, order['Order_DayOfWeek'], order['Order_Month'], order['Time_Orderd_Hour'], order['Time_Order_picked_Hour']
+    )
+    df = prep_support.cyclical_encode(df, 'Order_DayOfWeek', 7)
+    df = prep_support.cyclical_encode(df, 'Order_Month', 12)
+    df = prep_support.cyclical_encode(df, 'Time_Orderd_Hour', 24)
+    df = prep_support.cyclical_encode(df, 'Time_Order_picked_Hour', 24)
+    df = prep_support.drop_unnecessary_columns(df)
+    return prep_support.validate_and_reorder_columns(df)
+
+
+@pytest.fixture(scope='module')
+def orders():
+    """A few synthetic orders, plus labels the generator never draws"""
+    orders = synthetic_deliveries(40, seed=5)
+    orders.loc[0, ['Festival', 'City', 'Type_of_vehicle']] = ['Unknown', 'Semi-Urban', 'bicycle']
+    orders.loc[1, ['Weather_conditions', 'Road_traffic_density']] = ['Cloudy', 'High']
+    return orders
+
+
+def test_batch_data_prep_matches_legacy_pipeline(orders):
+    expected = pd.concat([legacy_data_prep(order) for order in orders.to_dict('records')], ignore_index=True)
+    features = batch_preparation.batch_data_prep(orders)
+
+    assert list(features.columns) == list(expected.columns)
+    np.testing.assert_array_equal(features.to_numpy(dtype=float), expected.to_numpy(dtype=float))
+
+
+def test_feature_schema_encode_matches_legacy_pipeline(orders):
+    schema = get_feature_schema()
+    out = np.empty((1, schema.n_features), dtype=np.float32)
+
+    for order in orders.to_dict('records'):
+        expected = legacy_data_prep(order)
+        assert schema.columns == tuple(expected.columns)
+        np.testing.assert_array_equal(schema.encode(order), expected.to_numpy(dtype=np.float32))
+        np.testing.assert_array_equal(schema.encode(order, out=out), expected.to_numpy(dtype=np.float32))
+
+
+def test_feature_schema_encode_batch_matches_encode(orders):
+    schema = get_feature_schema()
+    rows = np.vstack([schema.encode(order).copy() for order in orders.to_dict('records')])
+    np.testing.assert_array_equal(schema.encode_batch(orders), rows)
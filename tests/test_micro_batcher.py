@@ -0,0 +1,89 @@
+import time
+import queue
+import threading
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor, wait
+from utils.micro_batcher import MicroBatcher
+
+
+def row_sums(X):
+    return X.sum(axis=1)
+
+
+def test_concurrent_rows_get_their_own_predictions():
+    batcher = MicroBatcher(row_sums, max_batch_size=16, max_wait_ms=5)
+    rows = np.random.default_rng(0).normal(size=(400, 5)).astype(np.float32)
+    try:
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            predictions = list(pool.map(batcher.predict, rows))
+        metrics = batcher.metrics()
+    finally:
+        batcher.close()
+
+    np.testing.assert_array_equal(np.array(predictions, dtype=np.float32), row_sums(rows))
+    assert metrics['rows'] == len(rows)
+    assert metrics['batches'] < len(rows)
+    assert max(metrics['batch_sizes']) <= 16
+
+
+def test_predict_fn_errors_reach_every_row_of_the_batch():
+    def fail(X):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(fail, max_wait_ms=50)
+    futures = [batcher.submit(np.ones(3)) for _ in range(5)]
+    batcher.close()
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model failed"):
+            future.result(timeout=1)
+    assert batcher.metrics()['errors'] >= 1
+
+
+def test_close_runs_queued_rows_and_rejects_new_ones():
+    batcher = MicroBatcher(row_sums, max_wait_ms=1000)
+    futures = [batcher.submit(np.full(2, i)) for i in range(10)]
+    batcher.close()
+
+    assert [future.result(timeout=0) for future in futures] == [2.0 * i for i in range(10)]
+    with pytest.raises(RuntimeError, match="closed"):
+        batcher.submit(np.ones(2))
+
+
+class SlowPutQueue(queue.SimpleQueue):
+    """Queue that pauses before queueing a row, widening the gap between `submit`'s closed check and its put"""
+
+    def put(self, item, *args, **kwargs):
+        if isinstance(item, tuple):
+            time.sleep(0.001)
+        super().put(item, *args, **kwargs)
+
+
+def test_submit_racing_close_never_leaves_a_future_pending(monkeypatch):
+    monkeypatch.setattr(queue, 'SimpleQueue', SlowPutQueue)
+    for _ in range(10):
+        batcher = MicroBatcher(row_sums, max_wait_ms=0.5)
+        start = threading.Barrier(9)
+        futures = []
+
+        def submit_until_closed():
+            start.wait()
+            while True:
+                try:
+                    futures.append(batcher.submit(np.ones(2)))
+                except RuntimeError:
+                    return
+
+        threads = [threading.Thread(target=submit_until_closed) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        time.sleep(0.005)
+        batcher.close()
+        for thread in threads:
+            thread.join()
+
+        done, not_done = wait(futures, timeout=1)
+        assert not not_done
+        assert all(future.result() == 2.0 for future in done)
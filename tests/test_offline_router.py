@@ -0,0 +1,109 @@
+import heapq
+import math
+import numpy as np
+import pytest
+from utils.offline_router import OfflineRouter, build_graph, haversine_m, save_graph
+
+GRID_SIZE = 12
+
+
+def grid_graph(seed=0):
+    """Street grid around Mumbai with random speeds, some one-way streets and one isolated node"""
+    rng = np.random.default_rng(seed)
+    rows, cols = np.divmod(np.arange(GRID_SIZE * GRID_SIZE), GRID_SIZE)
+    node_lat = np.append(19.0 + rows * 0.002 + rng.uniform(-3e-4, 3e-4, len(rows)), 19.5)
+    node_lon = np.append(72.8 + cols * 0.002 + rng.uniform(-3e-4, 3e-4, len(cols)), 73.5)
+
+    edge_from, edge_to = [], []
+    for node in range(GRID_SIZE * GRID_SIZE):
+        for neighbour in (node + 1 if cols[node] < GRID_SIZE - 1 else None,
+                          node + GRID_SIZE if rows[node] < GRID_SIZE - 1 else None):
+            if neighbour is None:
+                continue
+            edge_from.append(node)
+            edge_to.append(neighbour)
+            if rng.random() > 0.2:  # two-way street
+                edge_from.append(neighbour)
+                edge_to.append(node)
+
+    edge_from, edge_to = np.array(edge_from), np.array(edge_to)
+    distance = haversine_m(node_lat[edge_from], node_lon[edge_from], node_lat[edge_to], node_lon[edge_to])
+    duration = distance / (rng.uniform(10, 60, len(distance)) / 3.6)
+    return build_graph(node_lat, node_lon, edge_from, edge_to, duration, distance)
+
+
+def dijkstra(graph, source, target):
+    """Plain Dijkstra on travel time over the graph arrays"""
+    indptr, indices, durations = graph['indptr'], graph['indices'], graph['duration'].astype(float)
+    dist, heap = {source: 0.0}, [(0.0, source)]
+    while heap:
+        d_u, u = heapq.heappop(heap)
+        if u == target:
+            return d_u
+        if d_u > dist[u]:
+            continue
+        for k in range(indptr[u], indptr[u + 1]):
+            d_v = d_u + durations[k]
+            if d_v < dist.get(indices[k], math.inf):
+                dist[indices[k]] = d_v
+                heapq.heappush(heap, (d_v, indices[k]))
+    return None
+
+
+@pytest.fixture(scope='module')
+def graph():
+    return grid_graph()
+
+
+@pytest.fixture(scope='module')
+def router(graph):
+    return OfflineRouter(graph)
+
+
+def test_shortest_paths_match_dijkstra(graph, router):
+    rng = np.random.default_rng(1)
+    n_nodes = GRID_SIZE * GRID_SIZE
+    for source, target in rng.integers(0, n_nodes, (200, 2)):
+        expected = dijkstra(graph, int(source), int(target))
+        duration, path = router.shortest_path(int(source), int(target))
+        if expected is None:
+            assert path is None
+            continue
+        assert duration == pytest.approx(expected, rel=1e-9)
+        assert path[0] == source and path[-1] == target
+
+        # The path follows edges of the graph and its edge times add up to the duration
+        total = 0.0
+        for u, v in zip(path[:-1], path[1:]):
+            candidates = graph['indices'][graph['indptr'][u]:graph['indptr'][u + 1]] == v
+            assert candidates.any()
+            total += graph['duration'][graph['indptr'][u]:graph['indptr'][u + 1]][candidates].min()
+        assert total == pytest.approx(expected, rel=1e-5)
+
+
+def test_unreachable_node_has_no_path(router):
+    isolated = GRID_SIZE * GRID_SIZE
+
+    assert router.shortest_path(0, isolated) == (None, None)
+    assert router.shortest_path(3, 3) == (0.0, [3])
+
+
+def test_route_snaps_to_nearest_nodes(graph, router):
+    start, end = 0, GRID_SIZE * GRID_SIZE - 1
+    start_lon, start_lat = float(graph['node_lon'][start]), float(graph['node_lat'][start])
+    end_lon, end_lat = float(graph['node_lon'][end]), float(graph['node_lat'][end])
+
+    route = router.route(start_lon + 1e-5, start_lat - 1e-5, end_lon - 1e-5, end_lat + 1e-5)
+    duration, path = router.shortest_path(start, end)
+
+    assert route['duration'] == pytest.approx(max(1, duration))
+    assert route['distance'] == pytest.approx(router.path_distance(path))
+    assert route['coordinates'][0] == [start_lon, start_lat]
+    assert route['coordinates'][-1] == [end_lon, end_lat]
+
+
+def test_router_loads_saved_graph(graph, router, tmp_path):
+    path = tmp_path / 'road_graph.npz'
+    save_graph(path, graph)
+
+    assert OfflineRouter.from_file(path).shortest_path(5, 100) == router.shortest_path(5, 100)
@@ -0,0 +1,100 @@
+from http.server import ThreadingHTTPServer
+import threading
+import pytest
+from benchmarks.fake_osrm import FakeOSRMHandler, start_server
+from utils.offline_router import haversine_m
+from utils.osrm_client import OSRMClient, OSRMError
+
+PAIRS = [
+    (72.8777, 19.0760, 72.9050, 19.0740),
+    (77.5946, 12.9716, 77.6400, 12.9300),
+    (88.3639, 22.5726, 88.4000, 22.6000)
+]
+
+
+class BadJSONHandler(FakeOSRMHandler):
+    """Answers every request with HTTP 200 and a body that is not JSON"""
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+        self.send_response(200)
+        self.send_header('Content-Length', '5')
+        self.end_headers()
+        self.wfile.write(b'{bad}')
+
+
+@pytest.fixture
+def server():
+    server = start_server(delay_ms=0)
+    yield server
+    server.shutdown()
+
+
+def client_for(server, **kwargs):
+    return OSRMClient(f'http://127.0.0.1:{server.server_port}', backoff_seconds=0.001, **kwargs)
+
+
+def test_route_parses_the_answer(server):
+    route = client_for(server).route(*PAIRS[0])
+    start_lon, start_lat, end_lon, end_lat = PAIRS[0]
+
+    assert route['coordinates'] == [[start_lon, start_lat], [end_lon, end_lat]]
+    assert route['distance'] == pytest.approx(float(haversine_m(start_lat, start_lon, end_lat, end_lon)) * 1.3)
+    assert route['duration'] == pytest.approx(route['distance'] / (25 / 3.6))
+
+
+def test_route_many_keeps_input_order(server):
+    client = client_for(server)
+    pairs = PAIRS * 10
+
+    routes = client.route_many(pairs)
+
+    assert [route['coordinates'][0] for route in routes] == [[pair[0], pair[1]] for pair in pairs]
+    assert server.requests == len(pairs)
+
+
+def test_unavailable_server_is_retried_then_fails(server):
+    server.faults['error_rate'] = 1.0
+    client = client_for(server, max_retries=2)
+
+    with pytest.raises(OSRMError) as excinfo:
+        client.route(*PAIRS[0])
+    assert excinfo.value.retryable
+    assert server.requests == 3
+
+
+def test_route_many_returns_none_for_failed_pairs(server):
+    server.faults['error_rate'] = 1.0
+
+    assert client_for(server, max_retries=1).route_many(PAIRS) == [None] * len(PAIRS)
+
+
+def test_stalled_request_times_out(server):
+    server.faults.update(stall_rate=1.0, stall_seconds=2.0)
+
+    with pytest.raises(OSRMError):
+        client_for(server, timeout=0.1, max_retries=0).route(*PAIRS[0])
+
+
+def test_malformed_json_is_not_retried():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), BadJSONHandler)
+    server.daemon_threads = True
+    server.requests = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = client_for(server, max_retries=3)
+        with pytest.raises(OSRMError) as excinfo:
+            client.route(*PAIRS[0])
+        assert not excinfo.value.retryable
+        assert server.requests == 1
+        assert client.route_many(PAIRS) == [None] * len(PAIRS)
+    finally:
+        server.shutdown()
+
+
+def test_invalid_url_fails_the_pair_not_the_batch():
+    client = OSRMClient('http://[invalid', max_retries=3, backoff_seconds=0.001)
+
+    assert client.route_many(PAIRS) == [None] * len(PAIRS)
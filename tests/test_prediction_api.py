@@ -0,0 +1,102 @@
+import asyncio
+import json
+import types
+import numpy as np
+import pytest
+from api import prediction_api
+from api.prediction_api import OrderError, predict_orders
+from benchmarks.load_test import SAMPLE_ORDER
+from utils import prep_support
+from utils.feature_schema import get_feature_schema
+
+
+class FakeRequest:
+    """Just enough of a Starlette request to call the endpoints directly"""
+
+    def __init__(self, body):
+        self.body = body
+        self.app = types.SimpleNamespace(state=types.SimpleNamespace(batcher=None))
+
+    async def json(self):
+        return self.body
+
+
+def call(endpoint, body):
+    response = asyncio.run(endpoint(FakeRequest(body)))
+    return response.status_code, json.loads(response.body)
+
+
+def routed_order(**changes):
+    """SAMPLE_ORDER without route features, so they are looked up from its coordinates"""
+    order = {key: value for key, value in SAMPLE_ORDER.items() if key not in prediction_api.ROUTE_FEATURES}
+    return {**order, 'Restaurant_latitude': 19.0178, 'Restaurant_longitude': 72.8478, **changes}
+
+
+@pytest.fixture
+def route_lookups(monkeypatch):
+    """Replace the bulk route lookup with a fixed 6 km, 10 minute route, recording the pairs"""
+    calls = []
+
+    def get_route_data_many(pairs, cities=None, road_traffic_densities=None):
+        calls.append(list(pairs))
+        return [{'duration': 600.0, 'distance': 6000.0, 'coordinates': None} for _ in pairs]
+
+    monkeypatch.setattr(prep_support, 'get_route_data_many', get_route_data_many)
+    return calls
+
+
+def test_batch_matches_encoding_each_order(route_lookups):
+    orders = [SAMPLE_ORDER, {**SAMPLE_ORDER, 'City': 'Urban', 'Time_Orderd_Hour': 9.5}]
+    predictions, estimated = predict_orders(orders)
+
+    expected = prep_support.make_batch_prediction(get_feature_schema().encode_batch(orders))
+    np.testing.assert_array_equal(predictions, expected)
+    assert estimated == [False, False]
+    assert route_lookups == []
+
+
+def test_missing_route_features_are_looked_up_once_for_the_batch(route_lookups):
+    orders = [SAMPLE_ORDER, routed_order(), routed_order(Type_of_order='Meal')]
+    predictions, _ = predict_orders(orders)
+
+    assert route_lookups == [[(72.8478, 19.0178, 72.905203, 19.074049)] * 2]
+    route_features = {'duration_osrm': 10.0, 'speed_osrm': 36.0}
+    assert predictions[1] == predict_orders([{**SAMPLE_ORDER, **route_features}])[0][0]
+
+
+@pytest.mark.parametrize('changes, message', [
+    ({'Weather_conditions': 'Hail'}, "Unknown Weather_conditions 'Hail'"),
+    ({'Type_of_vehicle': 'Motorcycle'}, "Unknown Type_of_vehicle 'Motorcycle'"),
+    ({'Order_Month': 'Smarch'}, "Unknown Order_Month 'Smarch'"),
+    ({'Delivery_person_Age': float('inf')}, "Delivery_person_Age must be a finite number"),
+    ({'Vehicle_condition': True}, "Vehicle_condition must be a finite number"),
+    ({'Time_Orderd_Hour': '21'}, "Time_Orderd_Hour must be a finite number"),
+    ({'Festival': None}, "Null values: \\['Festival'\\]"),
+    ({'Restaurant_latitude': None}, "Invalid coordinates")
+])
+def test_bad_order_fails_the_batch_before_any_route_lookup(route_lookups, changes, message):
+    orders = [routed_order(), SAMPLE_ORDER, routed_order(**changes)]
+    with pytest.raises(OrderError, match=f"^Order 2: {message}"):
+        predict_orders(orders)
+    assert route_lookups == []
+
+
+def test_endpoints_answer_bad_orders_with_400(route_lookups):
+    status, body = call(prediction_api.predict, {**SAMPLE_ORDER, 'City': 'Atlantis'})
+    assert status == 400 and body['error'].startswith("Unknown City 'Atlantis'")
+
+    status, body = call(prediction_api.predict_batch, {'orders': [SAMPLE_ORDER, {**SAMPLE_ORDER, 'speed_osrm': None}]})
+    assert status == 400 and body['error'].startswith("Order 1: Null values")
+
+    status, body = call(prediction_api.predict_batch, {'orders': SAMPLE_ORDER})
+    assert status == 400
+    assert route_lookups == []
+
+
+def test_endpoints_predict_valid_orders(route_lookups):
+    status, body = call(prediction_api.predict, SAMPLE_ORDER)
+    assert status == 200 and body['route_estimated'] is False
+
+    status, batch = call(prediction_api.predict_batch, {'orders': [SAMPLE_ORDER, routed_order()]})
+    assert status == 200 and batch['route_estimated'] == [False, False]
+    assert batch['predictions'][0] == pytest.approx(body['prediction'])
@@ -0,0 +1,145 @@
+import time
+import pytest
+from benchmarks.fake_osrm import start_server
+from utils.osrm_client import OSRMClient, OSRMError
+from utils.route_guard import CircuitBreaker, RouteGuard
+
+PAIR = (72.8777, 19.0760, 72.9050, 19.0740)
+
+
+@pytest.fixture
+def primary():
+    server = start_server(delay_ms=0)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def hedge():
+    server = start_server(delay_ms=0)
+    yield server
+    server.shutdown()
+
+
+def client_for(server):
+    return OSRMClient(f'http://127.0.0.1:{server.server_port}')
+
+
+def test_healthy_primary_answers(primary):
+    guard = RouteGuard(client_for(primary))
+
+    route = guard.route(*PAIR)
+
+    assert not route.get('fallback')
+    assert route['coordinates'] == [[PAIR[0], PAIR[1]], [PAIR[2], PAIR[3]]]
+    assert guard.stats()['primary'] == 1
+    assert primary.requests == 1
+
+
+def test_failures_are_retried_then_fall_back(primary):
+    primary.faults['error_rate'] = 1.0
+    guard = RouteGuard(client_for(primary), max_retries=2, backoff_seconds=0.001)
+
+    route = guard.route(*PAIR)
+
+    assert route['fallback'] and route['estimated']
+    stats = guard.stats()
+    assert stats['failure'] == 1 and stats['retries'] == 2
+    assert primary.requests == 3
+
+
+def test_errors_that_are_not_retryable_are_not_retried():
+    guard = RouteGuard(OSRMClient('http://[invalid'), max_retries=2, backoff_seconds=0.001)
+
+    with pytest.raises(OSRMError):
+        guard.fetch(*PAIR)
+    assert guard.stats()['retries'] == 0
+
+
+def test_stalled_primary_stays_within_budget(primary):
+    primary.faults.update(stall_rate=1.0, stall_seconds=3.0)
+    guard = RouteGuard(client_for(primary), budget_seconds=0.3, backoff_seconds=0.001)
+
+    start = time.perf_counter()
+    route = guard.route(*PAIR)
+
+    assert time.perf_counter() - start < 1.0
+    assert route['fallback']
+
+
+def test_slow_primary_is_hedged(primary, hedge):
+    primary.faults.update(stall_rate=1.0, stall_seconds=3.0)
+    guard = RouteGuard(client_for(primary), hedge=client_for(hedge), budget_seconds=2.0, hedge_delay=0.05)
+
+    start = time.perf_counter()
+    route = guard.route(*PAIR)
+
+    assert time.perf_counter() - start < 1.0
+    assert not route.get('fallback')
+    stats = guard.stats()
+    assert stats['hedge'] == 1 and stats['hedged'] == 1
+    assert hedge.requests == 1
+
+
+def test_hedge_is_not_sent_when_primary_is_fast(primary, hedge):
+    guard = RouteGuard(client_for(primary), hedge=client_for(hedge), hedge_delay=0.5)
+
+    guard.route(*PAIR)
+
+    assert guard.stats()['hedged'] == 0
+    assert hedge.requests == 0
+
+
+def test_breaker_opens_short_circuits_and_recovers(primary):
+    primary.faults['error_rate'] = 1.0
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.2)
+    guard = RouteGuard(client_for(primary), max_retries=0, breaker=breaker)
+
+    guard.route(*PAIR)
+    guard.route(*PAIR)
+    assert breaker.state == 'open'
+
+    # While open, lookups go straight to the fallback without a request
+    requests = primary.requests
+    assert guard.route(*PAIR)['fallback']
+    assert primary.requests == requests
+    assert guard.stats()['short_circuit'] == 1
+
+    # After the cooldown one probe goes through and closes the breaker again
+    primary.faults['error_rate'] = 0.0
+    time.sleep(0.25)
+    assert not guard.route(*PAIR).get('fallback')
+    assert breaker.state == 'closed'
+    assert [(t['from'], t['to']) for t in guard.stats()['transitions']] == [
+        ('closed', 'open'), ('open', 'half_open'), ('half_open', 'closed')
+    ]
+
+
+def test_failed_probe_opens_the_breaker_again():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    assert not breaker.allow()  # a single probe at a time
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+
+def test_unexpected_error_in_a_probe_reopens_the_breaker(primary):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    client = client_for(primary)
+    guard = RouteGuard(client, max_retries=0, breaker=breaker)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    # A malformed answer raises KeyError from parse_route during the half-open probe
+    client.parse_route = lambda data: data['missing']
+    assert guard.route(*PAIR)['fallback']
+    assert breaker.state == 'open'
+
+    del client.parse_route
+    time.sleep(0.06)
+    assert not guard.route(*PAIR).get('fallback')
+    assert breaker.state == 'closed'
@@ -0,0 +1,60 @@
+import json
+import numpy as np
+import pytest
+from utils import batch_preparation
+from utils.prep_support import MODEL_FILENAME
+from utils.synthetic_deliveries import synthetic_deliveries
+from utils.tree_ensemble import TreeEnsemble, compile_model_file, compile_model_json, compiled_model_path, save_ensemble
+
+xgb = pytest.importorskip('xgboost')
+
+
+def trained_booster(seed=0):
+    """Small booster on random data with missing values, so default directions are used"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(2000, 6)).astype(np.float32)
+    y = 3 * X[:, 0] - 2 * X[:, 1] * X[:, 2] + np.sin(X[:, 3]) + rng.normal(0, 0.1, len(X))
+    X[rng.random(X.shape) < 0.1] = np.nan
+    return xgb.train(
+        {'objective': 'reg:squarederror', 'max_depth': 5, 'eta': 0.3, 'seed': seed},
+        xgb.DMatrix(X, label=y), num_boost_round=40
+    )
+
+
+def test_trained_ensemble_matches_booster(tmp_path):
+    booster = trained_booster()
+    path = tmp_path / 'model.npz'
+    save_ensemble(path, compile_model_json(json.loads(booster.save_raw('json'))))
+
+    X = np.random.default_rng(1).normal(size=(3000, 6)).astype(np.float32)
+    X[::7, 2] = np.nan
+    np.testing.assert_array_equal(TreeEnsemble.from_file(path).predict(X), booster.inplace_predict(X))
+
+
+# The pickled model was written by an older XGBoost, which warns when loading it
+@pytest.mark.filterwarnings('ignore::UserWarning')
+def test_compiled_model_matches_model_predict():
+    joblib = pytest.importorskip('joblib')
+    model = joblib.load(f'saved_models/{MODEL_FILENAME}')
+    features = batch_preparation.batch_data_prep(synthetic_deliveries(2500, seed=3))
+    X = features.to_numpy(dtype=np.float32)
+    X[::11, 0] = np.nan
+
+    ensemble = TreeEnsemble(compile_model_file(f'saved_models/{MODEL_FILENAME}'))
+    np.testing.assert_array_equal(ensemble.predict(X), model.predict(X))
+
+
+def test_shipped_compiled_model_is_current():
+    compiled = compiled_model_path(MODEL_FILENAME)
+    X = batch_preparation.batch_data_prep(synthetic_deliveries(500, seed=4)).to_numpy(dtype=np.float32)
+
+    expected = TreeEnsemble(compile_model_file(compiled.replace('.npz', '.ubj'))).predict(X)
+    np.testing.assert_array_equal(TreeEnsemble.from_file(compiled).predict(X), expected)
+
+
+def test_unsupported_objective_is_rejected():
+    model = json.loads(trained_booster().save_raw('json'))
+    model['learner']['objective']['name'] = 'binary:logistic'
+
+    with pytest.raises(ValueError, match='Unsupported objective'):
+        compile_model_json(model)
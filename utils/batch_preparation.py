@@ -0,0 +1,165 @@
+import functools
+import numpy as np
+import pandas as pd
+from utils import latency_metrics, prep_support
+
+# Raw order columns copied straight into the feature matrix
+NUMERIC_COLUMNS = [
+    'Delivery_person_Age',
+    'Delivery_person_Ratings',
+    'Delivery_location_latitude',
+    'Delivery_location_longitude',
+    'Vehicle_condition',
+    'multiple_deliveries',
+    'duration_osrm',
+    'speed_osrm'
+]
+
+# Numeric columns the single-row path casts to float before encoding
+FLOAT_COLUMNS = ['Delivery_person_Age', 'multiple_deliveries']
+
+# Raw order columns holding day/month names and pick-up hours
+DATETIME_COLUMNS = ['Order_DayOfWeek', 'Order_Month', 'Time_Orderd_Hour', 'Time_Order_picked_Hour']
+
+REQUIRED_COLUMNS = NUMERIC_COLUMNS + list(prep_support.ONE_HOT_CATEGORIES) + DATETIME_COLUMNS
+
+@functools.lru_cache(maxsize=None)
+def load_feature_columns(feature_columns_path='saved_csv/feature_columns.csv'):
+    """Load the reference feature column order once per process"""
+    return tuple(pd.read_csv(feature_columns_path, header=None)[0].tolist())
+
+def to_dataframe(orders):
+    """
+    Convert a batch of raw orders to a pandas DataFrame.
+
+    Args:
+        orders: pandas DataFrame, pyarrow Table/RecordBatch or a list of dicts
+
+    Returns:
+        pd.DataFrame: The orders as a DataFrame
+    """
+    if isinstance(orders, pd.DataFrame):
+        return orders
+    if hasattr(orders, 'to_pandas'):
+        return orders.to_pandas()
+    return pd.DataFrame(orders)
+
+def map_names(values, mapping, column_name):
+    """
+    Vectorized lookup of day/month names in a mapping.
+
+    Raises:
+        ValueError: If any value is not a key of the mapping.
+    """
+    codes = pd.Categorical(values, categories=list(mapping)).codes
+    if (codes < 0).any():
+        unknown = sorted(set(pd.Series(values)[codes < 0].astype(str)))
+        raise ValueError(f"Unknown values in {column_name}: {unknown}")
+    return np.array(list(mapping.values()), dtype=float)[codes]
+
+def batch_data_prep(orders, feature_columns_path='saved_csv/feature_columns.csv'):
+    """
+    Encode a batch of raw orders into the model-ready feature matrix.
+
+    Produces the same columns, order and values as `data_preparation.data_prep`
+    for each row, but in one vectorized pass over whole columns.
+
+    Args:
+        orders: DataFrame, Arrow table or list of dicts with the REQUIRED_COLUMNS.
+            Categorical columns hold the raw labels (e.g. 'Jam', 'Snack'),
+            'Order_DayOfWeek'/'Order_Month' hold day and month names, and
+            'duration_osrm'/'speed_osrm' are in minutes and km/h.
+        feature_columns_path (str): Path to the CSV file containing the reference column order
+
+    Returns:
+        pd.DataFrame: Feature matrix in feature_columns.csv order, indexed like the input
+
+    Raises:
+        ValueError: If required columns are missing or day/month names are unknown.
+    """
+    orders = to_dataframe(orders)
+
+    missing_cols = [col for col in REQUIRED_COLUMNS if col not in orders.columns]
+    if missing_cols:
+        raise ValueError(f"Missing columns: {missing_cols}")
+
+    features = {}
+
+    # Numerical features
+    with latency_metrics.timer('batch_encode.numeric'):
+        for column_name in NUMERIC_COLUMNS:
+            values = orders[column_name].to_numpy()
+            features[column_name] = values.astype(float) if column_name in FLOAT_COLUMNS else values
+
+    # One-hot encoding, one comparison per category instead of per row
+    with latency_metrics.timer('batch_encode.one_hot'):
+        for column_base, categories in prep_support.ONE_HOT_CATEGORIES.items():
+            codes = pd.Categorical(orders[column_base], categories=categories).codes
+            for i, category in enumerate(categories):
+                features[f"{column_base}_{category}"] = (codes == i).astype(np.int64)
+
+    # Datetime features as numbers, then cyclical encoding
+    with latency_metrics.timer('batch_encode.datetime'):
+        datetime_values = {
+            'Order_DayOfWeek': map_names(orders['Order_DayOfWeek'], prep_support.DAY_OF_WEEK_MAP, 'Order_DayOfWeek'),
+            'Order_Month': map_names(orders['Order_Month'], prep_support.MONTH_MAP, 'Order_Month'),
+            'Time_Orderd_Hour': orders['Time_Orderd_Hour'].to_numpy(dtype=float),
+            'Time_Order_picked_Hour': orders['Time_Order_picked_Hour'].to_numpy(dtype=float)
+        }
+        for column_name, period in prep_support.CYCLICAL_PERIODS.items():
+            features[f'{column_name}_sin'] = np.sin(2 * np.pi * datetime_values[column_name] / period)
+            features[f'{column_name}_cos'] = np.cos(2 * np.pi * datetime_values[column_name] / period)
+
+    # Keep only the model columns, in the reference order
+    with latency_metrics.timer('batch_encode.reorder'):
+        feature_columns = load_feature_columns(feature_columns_path)
+        return pd.DataFrame({col: features[col] for col in feature_columns}, index=orders.index)
+
+def osrm_features(durations, distances):
+    """
+    Convert OSRM durations/distances to the model's route features.
+
+    Applies the same conversions as the single-row path, element-wise, so it
+    works on scalars, route results or whole `OSRMClient.table` matrices.
+
+    Args:
+        durations: Travel times in seconds
+        distances: Travel distances in meters
+
+    Returns:
+        dict: 'duration_osrm' (minutes), 'speed_osrm' (km/h) and 'distance_osrm' (km) arrays
+    """
+    # Same minimum of 1 second as the route service to prevent division by zero
+    durations = np.maximum(1, np.asarray(durations, dtype=float))
+    distances = np.asarray(distances, dtype=float)
+    return {
+        'duration_osrm': durations / 60,  # in minutes
+        'speed_osrm': (distances / 1000) / (durations / 3600),  # in km/h
+        'distance_osrm': distances / 1000  # in km
+    }
+
+def with_osrm_matrix(orders, durations, distances, source_index, destination_index):
+    """
+    Fill 'duration_osrm'/'speed_osrm' of each order from an OSRM table matrix.
+
+    Args:
+        orders: Raw orders accepted by `batch_data_prep`, without the OSRM columns
+        durations (np.ndarray): Matrix in seconds from `OSRMClient.table`
+        distances (np.ndarray): Matrix in meters from `OSRMClient.table`
+        source_index: Row of the matrix (restaurant/driver) for each order
+        destination_index: Column of the matrix (drop-off) for each order
+
+    Returns:
+        pd.DataFrame: Copy of the orders with the OSRM columns filled in
+    """
+    orders = to_dataframe(orders).copy()
+    source_index = np.asarray(source_index)
+    destination_index = np.asarray(destination_index)
+
+    route_features = osrm_features(
+        durations[source_index, destination_index],
+        distances[source_index, destination_index]
+    )
+    orders['duration_osrm'] = route_features['duration_osrm']
+    orders['speed_osrm'] = route_features['speed_osrm']
+    return orders
@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class TwoTierCache:
+    """
+    Key/value cache with an in-process LRU in front of an optional SQLite store.
+
+    Both tiers expire entries after `ttl_seconds` and evict the least recently
+    used entries once they hold more than their maximum number of entries.
+    Values must be JSON serializable to be written to disk.
+    """
+
+    def __init__(self, db_path=None, max_memory_entries=1024, max_disk_entries=100_000,
+                 ttl_seconds=7 * 24 * 3600, table_name='cache'):
+        """
+        Args:
+            db_path (str): SQLite file for the persistent tier, or None for memory only
+            max_memory_entries (int): Maximum number of entries kept in memory
+            max_disk_entries (int): Maximum number of entries kept on disk
+            ttl_seconds (float): Time to live of an entry, or None to never expire
+            table_name (str): Table used inside the SQLite file
+        """
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.table_name = table_name
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0
+        }
+
+        self._db = None
+        self._disk_entries = 0
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path):
+        """Open (or create) the SQLite store"""
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Streamlit serves each session from its own thread, so the connection is shared behind self._lock
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table_name} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.table_name}_accessed ON {self.table_name} (accessed_at)"
+        )
+        self._disk_entries = self._db.execute(f"SELECT COUNT(*) FROM {self.table_name}").fetchone()[0]
+
+    def _expires_at(self, now):
+        return None if self.ttl_seconds is None else now + self.ttl_seconds
+
+    def get(self, key):
+        """
+        Return the cached value for `key`, or None on a miss.
+
+        A disk hit is promoted to the memory tier.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._counters['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+                self._counters['expired'] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    f"SELECT value, expires_at FROM {self.table_name} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = json.loads(row[0]), row[1]
+                    if expires_at is None or expires_at > now:
+                        self._db.execute(
+                            f"UPDATE {self.table_name} SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                        self._remember(key, value, expires_at)
+                        self._counters['disk_hits'] += 1
+                        return value
+                    self._db.execute(f"DELETE FROM {self.table_name} WHERE key = ?", (key,))
+                    self._disk_entries -= 1
+                    self._counters['expired'] += 1
+
+            self._counters['misses'] += 1
+            return None
+
+    def set(self, key, value):
+        """Store `value` under `key` in both tiers"""
+        now = time.time()
+        expires_at = self._expires_at(now)
+        with self._lock:
+            self._remember(key, value, expires_at)
+
+            if self._db is not None:
+                cursor = self._db.execute(
+                    f"INSERT OR IGNORE INTO {self.table_name} (key, value, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), expires_at, now)
+                )
+                if cursor.rowcount:
+                    self._disk_entries += 1
+                else:
+                    self._db.execute(
+                        f"UPDATE {self.table_name} SET value = ?, expires_at = ?, accessed_at = ? WHERE key = ?",
+                        (json.dumps(value), expires_at, now, key)
+                    )
+                if self._disk_entries > self.max_disk_entries:
+                    self._evict_disk(now)
+
+    def _remember(self, key, value, expires_at):
+        """Insert into the memory tier, evicting the least recently used entries"""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._counters['memory_evictions'] += 1
+
+    def _evict_disk(self, now):
+        """Drop expired rows, then the least recently used rows above the size limit"""
+        deleted = self._db.execute(
+            f"DELETE FROM {self.table_name} WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+        ).rowcount
+        self._disk_entries -= deleted
+        self._counters['expired'] += deleted
+
+        excess = self._disk_entries - self.max_disk_entries
+        if excess > 0:
+            deleted = self._db.execute(
+                f"DELETE FROM {self.table_name} WHERE key IN "
+                f"(SELECT key FROM {self.table_name} ORDER BY accessed_at LIMIT ?)", (excess,)
+            ).rowcount
+            self._disk_entries -= deleted
+            self._counters['disk_evictions'] += deleted
+
+    def clear(self):
+        """Remove every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self.table_name}")
+                self._disk_entries = 0
+
+    def stats(self):
+        """Return hit/miss/eviction counters and current sizes"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._memory)
+            stats['disk_entries'] = self._disk_entries
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
@@ -1,27 +1,89 @@
 import os
 import ast
 import json
-import folium
+import hashlib
+import threading
 import numpy as np
 import pandas as pd
 import streamlit as st
-import plotly.express as px
 
-from scipy import stats
-from utils import prep_support
+from utils import latency_metrics, prep_support, route_simplify, route_store
+from utils.dashboard_artifact import CHARTS_CSV_PATH, DASHBOARD_ARTIFACT_PATH, SOURCE_COLUMNS, TRAFFIC_ORDER, DashboardAggregates
+from utils.driver_aggregates import DRIVER_AGGREGATES_PATH, DriverAggregateStore
+from utils.route_index import RouteIndex
 
+# folium, streamlit_folium, plotly.express and scipy are imported by the functions
+# that use them, so pages that never draw a map or chart do not load them
 
-def load_route_data():
-    """Load and return route data from CSV"""
-    result_route = pd.read_csv("saved_csv/route_prod.csv")
+# Binary route store built from saved_csv/route_prod.csv with `python -m utils.route_store`
+ROUTE_STORE_DIR = 'saved_routes/route_prod'
+
+# Above this many routes the map switches from per-route markers to a single GeoJSON layer
+GEOJSON_ROUTE_THRESHOLD = 500
+
+# Route histories larger than this are loaded per viewport instead of all at once
+VIEWPORT_ROUTE_THRESHOLD = 2000
+
+# Initial view of the route map: India at zoom 5 as [south, west, north, east]
+INITIAL_MAP_BOUNDS = [8.4, 68.7, 37.6, 97.4]
+INITIAL_MAP_ZOOM = 5
+
+# CSV fallback when no route store has been built
+ROUTE_CSV_PATH = 'saved_csv/route_prod.csv'
+
+# Content digests of route source files, keyed on (path, mtime, size) so unchanged files are not re-read
+_file_digests = {}
+_file_digests_lock = threading.Lock()
+
+# Canvas circle markers for clustered points, drawn from plain [lat, lon] rows
+POINT_MARKER_CALLBACK = """
+function (row) {
+    return L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 5, color: '%s', fillColor: '%s', fillOpacity: 0.8, weight: 1
+    });
+}
+"""
+
+# Detail level of the route map: sharp down to city-level zoom, far fewer vertices than OSRM's full overview
+ROUTE_MAP_LOD_ZOOM = 12
+
+
+def load_route_data(zoom=ROUTE_MAP_LOD_ZOOM):
+    """
+    Load and return route data, from the memory-mapped route store when available.
+
+    Routes are simplified for display at `zoom` (None keeps every vertex).
+    """
+    if os.path.exists(os.path.join(ROUTE_STORE_DIR, 'meta.json')):
+        store = route_store.RouteStore(ROUTE_STORE_DIR, zoom=zoom)
+        routes = store.routes()
+        if zoom is not None and store.lod_zoom is None:
+            routes = [route_simplify.simplify_route(route, zoom) for route in routes]
+        return store.restaurant_locs, store.delivery_locs, routes
+
+    result_route = pd.read_csv(ROUTE_CSV_PATH)
+    routes = result_route['routes']
+    if zoom is not None:
+        routes = [simplify_route_or_none(parse_route(route), zoom) for route in routes]
     return (
         result_route['restaurant_locs'],
         result_route['delivery_locs'],
-        result_route['routes']
+        routes
     )
 
+def simplify_route_or_none(route, zoom):
+    """Simplify a parsed route, keeping None for rows that did not parse, like the unsimplified path skips them"""
+    if route is None or isinstance(route, float) or len(route) == 0:
+        return None
+    try:
+        return route_simplify.simplify_route(route, zoom)
+    except (ValueError, TypeError):
+        return None
+
 def parse_location(location_str):
     """Parse location string to coordinate list"""
+    if isinstance(location_str, np.ndarray):
+        return location_str.tolist()
     try:
         return ast.literal_eval(location_str) if isinstance(location_str, str) else location_str
     except:
@@ -29,16 +91,25 @@ def parse_location(location_str):
 
 def parse_route(route_str):
     """Parse route string to coordinate list"""
+    if isinstance(route_str, np.ndarray):
+        return route_store.route_to_list(route_str)
+    if not isinstance(route_str, str):
+        return route_str
     try:
-        return json.loads(route_str) if isinstance(route_str, str) else route_str
-    except:
+        return route_store.parse_coordinates(route_str).tolist()
+    except ValueError:
         try:
-            return ast.literal_eval(route_str)
+            return json.loads(route_str)
         except:
-            return None
+            try:
+                return ast.literal_eval(route_str)
+            except:
+                return None
 
 def create_map_markers(map_obj, restaurant_locs, delivery_locs, routes):
     """Add markers and routes to Folium map"""
+    import folium
+
     for i, (route_str, r_loc, d_loc) in enumerate(zip(routes, restaurant_locs, delivery_locs)):
         route = parse_route(route_str)
         if not route:
@@ -69,23 +140,293 @@ def create_map_markers(map_obj, restaurant_locs, delivery_locs, routes):
                 icon=folium.Icon(color='red', icon='flag')
             ).add_to(map_obj)
 
-def generate_route_map(restaurant_locs, delivery_locs, routes):
-    """Generate Folium map with optimized routes"""
-    map_obj = folium.Map(location=[21.5937, 78.9629], zoom_start=5)
+def routes_to_geojson(routes):
+    """Build one GeoJSON FeatureCollection from [lat, lon] routes"""
+    features = []
+    for i, route_str in enumerate(routes):
+        route = route_str if isinstance(route_str, np.ndarray) else parse_route(route_str)
+        if route is None or len(route) == 0:
+            continue
+        # GeoJSON stores [lon, lat]
+        coordinates = np.round(np.asarray(route, dtype=np.float64)[:, ::-1], route_store.ROUTE_DECIMALS)
+        features.append({
+            'type': 'Feature',
+            'properties': {'name': f"Route {i+1}"},
+            'geometry': {'type': 'LineString', 'coordinates': coordinates.tolist()}
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+def locations_to_list(locations):
+    """Convert location strings or an (n, 2) array to a list of [lat, lon] rows"""
+    if isinstance(locations, np.ndarray):
+        return np.asarray(locations, dtype=np.float64).tolist()
+    return [loc for loc in (parse_location(loc) for loc in locations) if loc]
+
+def create_route_layer(map_obj, restaurant_locs, delivery_locs, routes):
+    """
+    Add all routes as one GeoJSON layer and the points as clustered canvas markers.
+
+    Scales with the number of coordinates rather than the number of folium
+    objects, so thousands of routes stay responsive.
+    """
+    import folium
+    from folium.plugins import FastMarkerCluster
+
+    folium.GeoJson(
+        routes_to_geojson(routes),
+        name="Routes",
+        style_function=lambda feature: {'color': 'blue', 'weight': 3, 'opacity': 0.7},
+        tooltip=folium.GeoJsonTooltip(fields=['name'], labels=False)
+    ).add_to(map_obj)
+
+    FastMarkerCluster(
+        locations_to_list(restaurant_locs),
+        name="Restaurants",
+        callback=POINT_MARKER_CALLBACK % ('green', 'green')
+    ).add_to(map_obj)
+
+    FastMarkerCluster(
+        locations_to_list(delivery_locs),
+        name="Deliveries",
+        callback=POINT_MARKER_CALLBACK % ('red', 'red')
+    ).add_to(map_obj)
+
+@latency_metrics.timed('generate_route_map')
+def generate_route_map(restaurant_locs, delivery_locs, routes, mode='auto'):
+    """
+    Generate Folium map with optimized routes.
+
+    Args:
+        mode (str): 'markers' draws a PolyLine and two icon markers per route,
+            'geojson' draws a single layer (see `create_route_layer`), and
+            'auto' picks 'geojson' above GEOJSON_ROUTE_THRESHOLD routes.
+    """
+    import folium
+
+    if mode == 'auto':
+        mode = 'geojson' if len(routes) > GEOJSON_ROUTE_THRESHOLD else 'markers'
+
+    map_obj = folium.Map(location=[21.5937, 78.9629], zoom_start=5, prefer_canvas=(mode == 'geojson'))
     map_obj.get_root().width = "100%"
     map_obj.get_root().height = "600px"
-    create_map_markers(map_obj, restaurant_locs, delivery_locs, routes)
+    if mode == 'geojson':
+        create_route_layer(map_obj, restaurant_locs, delivery_locs, routes)
+    else:
+        create_map_markers(map_obj, restaurant_locs, delivery_locs, routes)
     return map_obj
 
-def render_map(map_obj):
-    """Render Folium map in Streamlit with proper dimensions"""
+def route_store_size():
+    """Number of routes in the route store, or None if only the CSV is available"""
+    if not os.path.exists(os.path.join(ROUTE_STORE_DIR, 'meta.json')):
+        return None
+    return len(route_store.RouteStore(ROUTE_STORE_DIR))
+
+@st.cache_resource
+def load_route_index():
+    """Open the route store at map detail and build its spatial index, once per process"""
+    store = route_store.RouteStore(ROUTE_STORE_DIR, zoom=ROUTE_MAP_LOD_ZOOM)
+    return store, RouteIndex.from_store(store)
+
+def create_base_route_map():
+    """
+    Empty route map that viewport layers are added to.
+
+    Built fresh on every run: st_folium adds the viewport layer to the map it
+    is given, so a shared map would keep the routes of earlier views and of
+    other sessions. st_folium normalises element ids, so the fresh map renders
+    the same component and the page does not remount it.
+    """
+    import folium
+
+    return folium.Map(location=[21.5937, 78.9629], zoom_start=INITIAL_MAP_ZOOM, prefer_canvas=True)
+
+def map_view(map_state):
+    """
+    Read the view from st_folium's returned state.
+
+    Returns:
+        tuple: ([south, west, north, east], zoom), the initial view before any interaction
+    """
+    try:
+        bounds = map_state['bounds']
+        view = [
+            bounds['_southWest']['lat'], bounds['_southWest']['lng'],
+            bounds['_northEast']['lat'], bounds['_northEast']['lng']
+        ]
+        if None not in view:
+            return view, int(map_state['zoom'])
+    except (KeyError, TypeError):
+        pass
+    return INITIAL_MAP_BOUNDS, INITIAL_MAP_ZOOM
+
+def create_viewport_layer(store, route_ids):
+    """Feature group with the selected routes and their restaurant/delivery points"""
+    import folium
+
+    feature_group = folium.FeatureGroup(name="Routes")
+    if len(route_ids) == 0:
+        return feature_group
+
+    routes = routes_to_geojson([store.route(i) for i in route_ids])
+    for feature, i in zip(routes['features'], route_ids):
+        feature['properties']['name'] = f"Route {i+1}"
+    folium.GeoJson(
+        routes,
+        style_function=lambda feature: {'color': 'blue', 'weight': 3, 'opacity': 0.7},
+        tooltip=folium.GeoJsonTooltip(fields=['name'], labels=False)
+    ).add_to(feature_group)
+
+    points = {'type': 'FeatureCollection', 'features': [
+        {
+            'type': 'Feature',
+            'properties': {'name': f"{kind} {i+1}", 'color': color},
+            'geometry': {'type': 'Point', 'coordinates': [float(locs[i][1]), float(locs[i][0])]}
+        }
+        for kind, color, locs in (
+            ("Restaurant", 'green', store.restaurant_locs),
+            ("Delivery", 'red', store.delivery_locs)
+        )
+        for i in route_ids
+    ]}
+    folium.GeoJson(
+        points,
+        marker=folium.CircleMarker(radius=5, fill=True, fill_opacity=0.8, weight=1),
+        style_function=lambda feature: {
+            'color': feature['properties']['color'],
+            'fillColor': feature['properties']['color']
+        },
+        tooltip=folium.GeoJsonTooltip(fields=['name'], labels=False)
+    ).add_to(feature_group)
+    return feature_group
+
+def render_viewport_map(key='route_viewport_map'):
+    """
+    Render the route map, loading only the routes inside the current view.
+
+    The base map stays mounted; as the user pans or zooms, st_folium returns
+    the new bounds, the rerun queries the spatial index and only the routes
+    layer is replaced, so the first paint does not depend on history size.
+    """
+    from streamlit_folium import st_folium
+
+    store, index = load_route_index()
+    view, zoom = map_view(st.session_state.get(key))
+    route_ids = index.query(*view, zoom=zoom)
+
+    st.caption(f"Showing {len(route_ids):,} of {len(store):,} routes in view. Pan or zoom to load more.")
+    st_folium(
+        create_base_route_map(),
+        key=key,
+        height=600,
+        use_container_width=True,
+        feature_group_to_add=create_viewport_layer(store, route_ids),
+        returned_objects=['bounds', 'zoom']
+    )
+
+def file_digest(path):
+    """SHA-256 of a file, reused until its modification time or size changes"""
+    stat = os.stat(path)
+    signature = (path, stat.st_mtime_ns, stat.st_size)
+    with _file_digests_lock:
+        if signature in _file_digests:
+            return _file_digests[signature]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+
+    with _file_digests_lock:
+        # Drop digests of older versions of the same file
+        for old in [key for key in _file_digests if key[0] == path]:
+            del _file_digests[old]
+        _file_digests[signature] = digest.hexdigest()
+    return _file_digests[signature]
+
+def route_source_fingerprint():
+    """Content hash of whatever `load_route_data` reads (route store files or the CSV)"""
+    if os.path.exists(os.path.join(ROUTE_STORE_DIR, 'meta.json')):
+        paths = [os.path.join(ROUTE_STORE_DIR, name) for name in sorted(os.listdir(ROUTE_STORE_DIR))]
+    else:
+        paths = [ROUTE_CSV_PATH]
+
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        digest.update(file_digest(path).encode())
+    return digest.hexdigest()
+
+@st.cache_resource(max_entries=2, show_spinner='Generating optimized route visualization...')
+def build_route_map(fingerprint):
+    """
+    Build the route map and its HTML once per route source version.
+
+    Cached for the whole process, so every session shares one build; a
+    changed route source has a new `fingerprint` and gets a fresh build.
+
+    Returns:
+        tuple: (folium.Map, rendered HTML string)
+    """
+    restaurant_locs, delivery_locs, routes = load_route_data()
+    map_obj = generate_route_map(restaurant_locs, delivery_locs, routes)
+    return map_obj, map_to_html(map_obj)
+
+def get_route_map():
+    """Return the shared (map, HTML) pair for the current route source"""
+    return build_route_map(route_source_fingerprint())
+
+def dashboard_source_fingerprint():
+    """Content hash of the precomputed dashboard aggregates, or of the delivery log if none were built"""
+    path = DASHBOARD_ARTIFACT_PATH if os.path.exists(DASHBOARD_ARTIFACT_PATH) else CHARTS_CSV_PATH
+    return f"{path}:{file_digest(path)}"
+
+@st.cache_resource(max_entries=2, show_spinner='Aggregating the delivery log...')
+def build_dashboard_aggregates(fingerprint, drivers_fingerprint=None):
+    """
+    Load the dashboard aggregates once per source version.
+
+    Reads the artifact written by `python -m utils.dashboard_artifact`. Until
+    one is built, the aggregates come from the whole delivery log instead,
+    without feature importances (`show_feature_importance` then reads the model).
+    With a `drivers_fingerprint`, the driver sections come from the store
+    kept up to date by `python -m utils.driver_aggregates`.
+
+    Returns:
+        DashboardAggregates: Aggregates shared by all sessions
+    """
+    if os.path.exists(DASHBOARD_ARTIFACT_PATH):
+        aggregates = DashboardAggregates.from_file(DASHBOARD_ARTIFACT_PATH)
+    else:
+        aggregates = DashboardAggregates.build(pd.read_csv(CHARTS_CSV_PATH, usecols=SOURCE_COLUMNS))
+    if drivers_fingerprint is not None:
+        aggregates = aggregates.with_driver_aggregates(DriverAggregateStore.from_file(DRIVER_AGGREGATES_PATH))
+    return aggregates
+
+def get_dashboard_aggregates():
+    """Return the shared dashboard aggregates for the current source and driver aggregate store"""
+    drivers_fingerprint = None
+    if os.path.exists(DRIVER_AGGREGATES_PATH):
+        drivers_fingerprint = f"{DRIVER_AGGREGATES_PATH}:{file_digest(DRIVER_AGGREGATES_PATH)}"
+    return build_dashboard_aggregates(dashboard_source_fingerprint(), drivers_fingerprint)
+
+@latency_metrics.timed('map_to_html')
+def map_to_html(map_obj):
+    """Render a Folium map to HTML sized for the dashboard"""
     map_html = map_obj.get_root().render()
-    map_html = map_html.replace(
+    return map_html.replace(
         '<div class="folium-map" id="map_', 
         '<div class="folium-map" style="width:100%; height:600px" id="map_'
     )
+
+def render_map_html(map_html):
+    """Display pre-rendered map HTML in Streamlit"""
     st.components.v1.html(map_html, height=600)
 
+@latency_metrics.timed('render_map')
+def render_map(map_obj):
+    """Render Folium map in Streamlit with proper dimensions"""
+    render_map_html(map_to_html(map_obj))
+
 # Load feature column names with caching
 @st.cache_data
 def load_features_name():
@@ -95,17 +436,20 @@ def load_features_name():
         return None
     return pd.read_csv(feature_columns_path, header=None)[0].tolist()
 
-def show_feature_importance():
-    """
-    Displays an interactive horizontal bar chart of top 10 feature importances using Streamlit and Plotly.
-    
-    Parameters:
-    - model: Trained model object with feature_importances_ attribute
-    - feature_columns: List of feature names
-    """
+def compute_feature_importance(model, feature_columns, top=10):
+    """Top `top` feature importances of a model, most important first, as 'Feature' and 'Importance' columns"""
+    return pd.DataFrame({
+        'Feature': feature_columns,
+        'Importance': model.feature_importances_
+    }).sort_values('Importance', ascending=False).head(top)
 
-    st.subheader('🔑 XGBoost - Top 10 Important Features')
+def load_feature_importance():
+    """
+    Top feature importances of the app's model, or None after showing why they are unavailable.
 
+    Loads the pickled model, so the dashboard only calls this when no
+    precomputed aggregates exist.
+    """
     feature_columns = load_features_name()
 
     model_filename = 'XGBoost_20250508_151557.pkl'
@@ -119,22 +463,35 @@ def show_feature_importance():
     # Input validation
     if feature_columns is None:
         st.error("Error: Feature names not provided.")
-        return
+        return None
     if len(feature_columns) == 0:
         st.error("Error: Empty feature list provided.")
-        return
+        return None
     if not hasattr(model, 'feature_importances_'):
         st.warning("Warning: This model type doesn't support feature importances!")
-        return
+        return None
     if len(feature_columns) != len(model.feature_importances_):
         st.error(f"Mismatch error: Got {len(feature_columns)} features but expected {len(model.feature_importances_)}")
-        return
+        return None
 
-    # Create feature importance DataFrame
-    feat_imp = pd.DataFrame({
-        'Feature': feature_columns,
-        'Importance': model.feature_importances_
-    }).sort_values('Importance', ascending=False).head(10)
+    return compute_feature_importance(model, feature_columns)
+
+def show_feature_importance(feat_imp=None):
+    """
+    Displays an interactive horizontal bar chart of top 10 feature importances using Streamlit and Plotly.
+    
+    Parameters:
+    - feat_imp: DataFrame with 'Feature' and 'Importance' columns, e.g. from the
+      dashboard aggregates; None computes it from the model
+    """
+    import plotly.express as px
+
+    st.subheader('🔑 XGBoost - Top 10 Important Features')
+
+    if feat_imp is None:
+        feat_imp = load_feature_importance()
+        if feat_imp is None:
+            return
 
     # Create interactive visualization
     fig = px.bar(
@@ -180,36 +537,35 @@ def show_feature_importance():
 
     st.plotly_chart(fig, use_container_width=True)
 
-def visualize_traffic_levels(charts_df):
-    """Display traffic levels by hour visualization as a modular component."""
-
-    st.subheader('🚦 Traffic Levels by Hour')
+def compute_traffic_by_hour(charts_df):
+    """
+    Count orders per pickup hour and traffic level.
 
+    Returns:
+        pd.DataFrame: 'Hour_picked', 'Road_traffic_density' (ordered like TRAFFIC_ORDER) and 'Count',
+            with a row for every hour and level, sorted by hour
+    """
     # Convert to categorical with specified order
-    traffic_order = ['Low', 'Medium', 'High', 'Jam']
-    charts_df['Road_traffic_density'] = pd.Categorical(
-        charts_df['Road_traffic_density'],
-        categories=traffic_order,
-        ordered=True
-    )
+    traffic = pd.Categorical(charts_df['Road_traffic_density'], categories=TRAFFIC_ORDER, ordered=True)
 
     # Convert to datetime and extract hour
-    charts_df['Hour_picked'] = pd.to_datetime(
-        charts_df['Time_Order_picked'],
-        format='%H:%M',
-        errors='coerce'
-    ).dt.hour
-
-    # Drop rows with invalid times (if any)
-    charts_df = charts_df.dropna(subset=['Hour_picked'])
+    hour_picked = pd.to_datetime(charts_df['Time_Order_picked'], format='%H:%M', errors='coerce').dt.hour
 
-    # Group by hour and traffic level
-    traffic_by_hour = charts_df.groupby(
+    # Rows with invalid times (if any) are dropped by the groupby
+    traffic_by_hour = pd.DataFrame({'Hour_picked': hour_picked, 'Road_traffic_density': traffic}).groupby(
         ['Hour_picked', 'Road_traffic_density'], observed=False
     ).size().reset_index(name='Count')
 
     # Sort by hour to ensure correct order
-    traffic_by_hour = traffic_by_hour.sort_values('Hour_picked')
+    return traffic_by_hour.sort_values('Hour_picked', kind='stable').reset_index(drop=True)
+
+def visualize_traffic_levels(traffic_by_hour):
+    """Display traffic levels by hour visualization from `compute_traffic_by_hour` counts."""
+    import plotly.express as px
+
+    st.subheader('🚦 Traffic Levels by Hour')
+
+    traffic_by_hour = traffic_by_hour.copy()
 
     # Create formatted hour labels
     traffic_by_hour['Hour'] = traffic_by_hour['Hour_picked'].apply(lambda x: f"{int(x)}:00")
@@ -220,7 +576,7 @@ def visualize_traffic_levels(charts_df):
         x='Hour',
         y='Count',
         color='Road_traffic_density',
-        category_orders={'Road_traffic_density': traffic_order},
+        category_orders={'Road_traffic_density': TRAFFIC_ORDER},
         color_discrete_map={
             'Low': '#1f77b4',    # Blue
             'Medium': '#2ca02c', # Green
@@ -288,13 +644,21 @@ def create_performance_df(charts_df):
         'distance_osrm_km': 'Avg_OSRM_Distance'
     }).reset_index()
 
-def calculate_efficiency_metrics(performance_df):
-    """Calculate efficiency metrics and flags"""
+def calculate_efficiency_metrics(performance_df, time_zscore=None):
+    """
+    Calculate efficiency metrics and flags.
+
+    `time_zscore` takes precomputed absolute z-scores of the drivers' mean
+    time taken, e.g. from a `DriverAggregateStore`; None computes them here.
+    """
     df = performance_df.copy()
     
     # Calculate metrics
     df['speed_ratio'] = df['speed_actual'] / df['speed_osrm']
-    df['time_zscore'] = np.abs(stats.zscore(df['Time_taken (min)']))
+    if time_zscore is None:
+        from scipy import stats
+        time_zscore = np.abs(stats.zscore(df['Time_taken (min)']))
+    df['time_zscore'] = time_zscore
     df['speed_flag'] = np.where(df['speed_ratio'] < 0.5, 1, 0)
     
     # Create flags
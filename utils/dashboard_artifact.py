@@ -0,0 +1,206 @@
+import os
+import sys
+import json
+import time
+import pandas as pd
+
+DASHBOARD_ARTIFACT_VERSION = 1
+
+# Aggregates written by `python -m utils.dashboard_artifact saved_csv/charts.csv`
+DASHBOARD_ARTIFACT_PATH = 'saved_models/dashboard_aggregates.json'
+
+# Raw delivery log the aggregates are built from
+CHARTS_CSV_PATH = 'saved_csv/charts.csv'
+
+# Columns of the delivery log the aggregates read
+SOURCE_COLUMNS = [
+    'ID', 'Delivery_person_ID', 'Delivery_person_Ratings', 'Time_taken (min)', 'Vehicle_condition',
+    'speed_actual', 'speed_osrm', 'duration_osrm', 'distance_osrm_km', 'multiple_deliveries',
+    'Road_traffic_density', 'Time_Order_picked'
+]
+
+# Traffic levels in the order the dashboard stacks them
+TRAFFIC_ORDER = ['Low', 'Medium', 'High', 'Jam']
+
+
+class DashboardAggregates:
+    """
+    Everything the dashboard shows about the delivery log, without the log.
+
+    Holds the orders per pickup hour and traffic level, the model's top
+    feature importances, the first rows of the underperforming drivers table
+    with the driver counts, and the key metrics. Its size does not depend on
+    the number of deliveries, so loading it and rendering the dashboard take
+    the same time for a thousand rows or for millions.
+    """
+
+    def __init__(self, traffic_by_hour, feature_importance, underperformers_table,
+                 underperformer_count, driver_count, key_metrics, source_rows=None, built_at=None):
+        """
+        Args:
+            traffic_by_hour (pd.DataFrame): 'Hour_picked', 'Road_traffic_density' and 'Count'
+            feature_importance (pd.DataFrame or None): 'Feature' and 'Importance', None without a model
+            underperformers_table (pd.DataFrame): From `dash_support.generate_underperformers_table`
+            underperformer_count (int): Drivers flagged as underperformers
+            driver_count (int): Drivers in the log
+            key_metrics (dict): From `dash_support.generate_key_metrics`
+            source_rows (int): Deliveries the aggregates were built from
+            built_at (str): Build time, ISO 8601
+        """
+        self.traffic_by_hour = traffic_by_hour
+        self.feature_importance = feature_importance
+        self.underperformers_table = underperformers_table
+        self.underperformer_count = int(underperformer_count)
+        self.driver_count = int(driver_count)
+        self.key_metrics = {name: float(value) for name, value in key_metrics.items()}
+        self.source_rows = source_rows
+        self.built_at = built_at
+
+    @classmethod
+    def build(cls, charts_df, model=None, feature_columns=None):
+        """
+        Compute the aggregates from a raw delivery log.
+
+        Args:
+            charts_df (pd.DataFrame): Deliveries with the SOURCE_COLUMNS, e.g. saved_csv/charts.csv
+            model: Fitted model with `feature_importances_`; None leaves them out
+            feature_columns (list): Feature names of the model, in training order
+
+        Raises:
+            ValueError: If columns are missing or the feature names do not match the model.
+        """
+        # Imported here: dash_support loads the artifact through this module
+        from utils import dash_support
+
+        missing_cols = [col for col in SOURCE_COLUMNS if col not in charts_df.columns]
+        if missing_cols:
+            raise ValueError(f"Missing columns: {missing_cols}")
+
+        feature_importance = None
+        if model is not None:
+            if len(feature_columns) != len(model.feature_importances_):
+                raise ValueError(
+                    f"Got {len(feature_columns)} features but the model has {len(model.feature_importances_)}"
+                )
+            feature_importance = dash_support.compute_feature_importance(model, feature_columns)
+
+        performance_df = dash_support.create_performance_df(charts_df)
+        performance_df = dash_support.calculate_efficiency_metrics(performance_df)
+        underperformers_table, underperformer_count = dash_support.generate_underperformers_table(performance_df)
+        return cls(
+            traffic_by_hour=dash_support.compute_traffic_by_hour(charts_df),
+            feature_importance=feature_importance,
+            underperformers_table=underperformers_table,
+            underperformer_count=underperformer_count,
+            driver_count=len(performance_df),
+            key_metrics=dash_support.generate_key_metrics(performance_df),
+            source_rows=len(charts_df),
+            built_at=time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        )
+
+    def with_driver_aggregates(self, store):
+        """
+        Copy with the driver sections taken from a `DriverAggregateStore`.
+
+        The underperformers table, the driver counts and the key metrics then
+        cover every delivery appended to the store, including the ones that
+        arrived after these aggregates were built.
+        """
+        # Imported here: dash_support loads the artifact through this module
+        from utils import dash_support
+
+        performance_df = store.efficiency_df()
+        underperformers_table, underperformer_count = dash_support.generate_underperformers_table(performance_df)
+        return DashboardAggregates(
+            traffic_by_hour=self.traffic_by_hour,
+            feature_importance=self.feature_importance,
+            underperformers_table=underperformers_table,
+            underperformer_count=underperformer_count,
+            driver_count=len(performance_df),
+            key_metrics=dash_support.generate_key_metrics(performance_df),
+            source_rows=self.source_rows,
+            built_at=self.built_at
+        )
+
+    @classmethod
+    def from_file(cls, path=DASHBOARD_ARTIFACT_PATH):
+        """
+        Load aggregates written by `save`.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file was written by another format version.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No dashboard aggregates found at {path}")
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != DASHBOARD_ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported dashboard aggregates version {data.get('version')} in {path}")
+
+        traffic = data['traffic_by_hour']
+        counts = pd.DataFrame(traffic['counts'], index=traffic['hours'], columns=data['traffic_levels'])
+        traffic_by_hour = counts.rename_axis('Hour_picked').reset_index().melt(
+            id_vars='Hour_picked', var_name='Road_traffic_density', value_name='Count'
+        )
+        traffic_by_hour['Road_traffic_density'] = pd.Categorical(
+            traffic_by_hour['Road_traffic_density'], categories=data['traffic_levels'], ordered=True
+        )
+
+        importance = data['feature_importance']
+        table = data['underperformers_table']
+        return cls(
+            traffic_by_hour=traffic_by_hour.sort_values('Hour_picked', kind='stable').reset_index(drop=True),
+            feature_importance=None if importance is None else pd.DataFrame(importance),
+            underperformers_table=pd.DataFrame(table['data'], index=table['index'], columns=table['columns']),
+            underperformer_count=data['underperformer_count'],
+            driver_count=data['driver_count'],
+            key_metrics=data['key_metrics'],
+            source_rows=data.get('source_rows'),
+            built_at=data.get('built_at')
+        )
+
+    def save(self, path=DASHBOARD_ARTIFACT_PATH):
+        """Write the aggregates to a JSON file"""
+        counts = self.traffic_by_hour.pivot_table(
+            index='Hour_picked', columns='Road_traffic_density', values='Count', aggfunc='sum', observed=False
+        ).reindex(columns=TRAFFIC_ORDER, fill_value=0).fillna(0)
+        with open(path, 'w') as f:
+            json.dump({
+                'version': DASHBOARD_ARTIFACT_VERSION,
+                'built_at': self.built_at,
+                'source_rows': self.source_rows,
+                'traffic_levels': TRAFFIC_ORDER,
+                'traffic_by_hour': {
+                    'hours': [int(hour) for hour in counts.index],
+                    'counts': counts.astype(int).to_numpy().tolist()
+                },
+                'feature_importance': None if self.feature_importance is None else {
+                    'Feature': self.feature_importance['Feature'].tolist(),
+                    'Importance': [float(value) for value in self.feature_importance['Importance']]
+                },
+                'underperformers_table': json.loads(self.underperformers_table.to_json(orient='split')),
+                'underperformer_count': self.underperformer_count,
+                'driver_count': self.driver_count,
+                'key_metrics': self.key_metrics
+            }, f)
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.dashboard_artifact saved_csv/charts.csv [output.json]
+    # Imported here so loading saved aggregates never needs the model's libraries
+    import joblib
+    from utils.prep_support import MODEL_FILENAME
+
+    source = sys.argv[1] if len(sys.argv) > 1 else CHARTS_CSV_PATH
+    output = sys.argv[2] if len(sys.argv) > 2 else DASHBOARD_ARTIFACT_PATH
+
+    start = time.perf_counter()
+    charts_df = pd.read_csv(source, usecols=SOURCE_COLUMNS)
+    model = joblib.load(os.path.join('saved_models', MODEL_FILENAME))
+    feature_columns = pd.read_csv('saved_csv/feature_columns.csv', header=None)[0].tolist()
+    aggregates = DashboardAggregates.build(charts_df, model, feature_columns)
+    aggregates.save(output)
+    print(f"Aggregated {len(charts_df)} deliveries of {aggregates.driver_count} drivers "
+          f"in {time.perf_counter() - start:.1f} s")
+    print(f"Wrote {output}")
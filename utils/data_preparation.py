@@ -1,10 +1,27 @@
-import pandas as pd
 import streamlit as st
-from utils import prep_support
+from utils import feature_schema, latency_metrics, prep_support
 
 def data_prep():
-    tab1, tab2 = st.columns(2) 
+    """
+    Render the order form and prepare the model input when it is submitted.
 
+    Widgets live in a form, so editing them does not rerun the script; the
+    route lookup and feature encoding only happen on submit.
+
+    Returns:
+        dict: Prepared order data, or None if the form was not submitted on this run
+    """
+    with st.form("delivery_inputs", border=False):
+        tab1, tab2 = st.columns(2)
+        inputs = order_inputs(tab1, tab2)
+        submitted = st.form_submit_button("🛵 Predict Delivery Time", help="Click to estimate delivery duration")
+
+    if not submitted:
+        return None
+    return prepare_order(**inputs)
+
+def order_inputs(tab1, tab2):
+    """Render the order widgets in two columns and return their values"""
     with tab1:
         delivery_person_age = st.number_input("Driver's Age (Years)", min_value=15, max_value=50, value=39)
         delivery_person_ratings = st.number_input("Driver's Rating", min_value=1.0, max_value=6.0, value=4.9, step=0.1, format="%0.1f")
@@ -27,67 +44,96 @@ def data_prep():
         time_ordered_hour = st.number_input("Order Time (Hour)", min_value=0, max_value=23, value=21, step=1)
         time_picked_hour = st.number_input("Pick-Up Time (Hour)", min_value=0, max_value=23, value=21, step=1)
         time_picked_mins = st.number_input("Pick-Up Time (Minutes)", min_value=0, max_value=59, value=25, step=1)
-        
+
+    return {
+        'delivery_person_age': delivery_person_age,
+        'delivery_person_ratings': delivery_person_ratings,
+        'restaurant_location_latitude': restaurant_location_latitude,
+        'restaurant_location_longitude': restaurant_location_longitude,
+        'delivery_location_latitude': delivery_location_latitude,
+        'delivery_location_longitude': delivery_location_longitude,
+        'vehicle_condition': vehicle_condition,
+        'multiple_deliveries': multiple_deliveries,
+        'weather_conditions': weather_conditions,
+        'road_traffic_density': road_traffic_density,
+        'type_of_order': type_of_order,
+        'type_of_vehicle': type_of_vehicle,
+        'festival': festival,
+        'city': city,
+        'order_day_of_week': order_day_of_week,
+        'order_month': order_month,
+        'time_ordered_hour': time_ordered_hour,
+        'time_picked_hour': time_picked_hour,
+        'time_picked_mins': time_picked_mins
+    }
+
+def prepare_order(delivery_person_age, delivery_person_ratings, restaurant_location_latitude,
+                  restaurant_location_longitude, delivery_location_latitude, delivery_location_longitude,
+                  vehicle_condition, multiple_deliveries, weather_conditions, road_traffic_density,
+                  type_of_order, type_of_vehicle, festival, city, order_day_of_week, order_month,
+                  time_ordered_hour, time_picked_hour, time_picked_mins):
+    """Look up the route and encode the model input for the submitted order"""
     # Combine time_picked_hour and time_picked_mins into a single time variable
     time_picked = f"{int(time_picked_hour):02d}:{int(time_picked_mins):02d}"
 
     route_data = prep_support.get_osrm_route_data(
         restaurant_location_longitude, restaurant_location_latitude,
-        delivery_location_longitude, delivery_location_latitude
+        delivery_location_longitude, delivery_location_latitude,
+        city=city, road_traffic_density=road_traffic_density
     )
-    
-    if route_data:
-        # Convert coordinates to [lat,lon] for Folium
-        route_coords = [[lat, lon] for [lon, lat] in route_data['coordinates']]
-        
-        # Create and display map
-        restaurant_loc = [restaurant_location_latitude, restaurant_location_longitude]
-        delivery_loc = [delivery_location_latitude, delivery_location_longitude]
-                
-        duration_osrm = route_data['duration']/60 # in minutes
-        speed_osrm = (route_data['distance']/1000)/(route_data['duration']/3600) # in km/h
-        distance_osrm = route_data['distance']/1000 # in km
-
-    else:
-        st.error("Failed to get route data. Please check your locations.")
-
-    # Create a DataFrame for numerical features
-    df = pd.DataFrame({
-        'Delivery_person_Age': [float(delivery_person_age)],
-        'Delivery_person_Ratings': [delivery_person_ratings],
-        'Delivery_location_latitude': [delivery_location_latitude],
-        'Delivery_location_longitude': [delivery_location_longitude],
-        'Vehicle_condition': [vehicle_condition],
-        'multiple_deliveries': [float(multiple_deliveries)],
-        'duration_osrm': [duration_osrm],
-        'speed_osrm': [speed_osrm]
-    })
-
-    # Apply one-hot encoding to categorical variables
-    df = prep_support.one_hot_encode(df, 'Weather_conditions', ["Cloudy", "Fog", "Sandstorms", "Stormy", "Sunny", "Windy"], weather_conditions)
-    df = prep_support.one_hot_encode(df, 'Road_traffic_density', ["High", "Jam", "Low", "Medium"], road_traffic_density)
-    df = prep_support.one_hot_encode(df, 'Type_of_order', ["Buffet", "Drinks", "Meal", "Snack"], type_of_order)
-    df = prep_support.one_hot_encode(df, 'Type_of_vehicle', ["bicycle", "electric_scooter", "motorcycle", "scooter"], type_of_vehicle)
-    df = prep_support.one_hot_encode(df, 'Festival', ["No", "Unknown", "Yes"], festival)
-    df = prep_support.one_hot_encode(df, 'City', ["Metropolitian", "Semi-Urban", "Urban"], city)
-
-    # Transform categorical variables to numerical for Cylical Encoding
-    df = prep_support.transform_datetime_features(df, order_day_of_week, order_month, time_ordered_hour, time_picked_hour)
-
-    # Apply cyclical encoding to datetime features
-    df = prep_support.cyclical_encode(df, 'Order_DayOfWeek', 7)
-    df = prep_support.cyclical_encode(df, 'Order_Month', 12)
-    df = prep_support.cyclical_encode(df, 'Time_Orderd_Hour', 24)
-    df = prep_support.cyclical_encode(df, 'Time_Order_picked_Hour', 24)
-
-    # Drop unnecessary columns to avoid multicollinearity and original numerical columns used for encoding
-    df = prep_support.drop_unnecessary_columns(df)
-
-    # Validates and reorders DataFrame columns based on a saved feature columns list
-    df = prep_support.validate_and_reorder_columns(df)
+    if route_data is None:
+        # No road route between the locations; estimate one from the straight-line distance
+        route_data = prep_support.get_route_estimator().route(
+            restaurant_location_longitude, restaurant_location_latitude,
+            delivery_location_longitude, delivery_location_latitude,
+            city, road_traffic_density
+        )
+
+    route_estimated = bool(route_data.get('estimated'))
+    if route_estimated:
+        st.warning("Routing is unavailable, so the route distance and duration are estimated "
+                   "from the straight-line distance. The prediction is less accurate.")
+
+    # Convert coordinates to [lat,lon] for Folium
+    route_coords = [[lat, lon] for [lon, lat] in route_data['coordinates']]
+
+    # Create and display map
+    restaurant_loc = [restaurant_location_latitude, restaurant_location_longitude]
+    delivery_loc = [delivery_location_latitude, delivery_location_longitude]
+
+    duration_osrm = route_data['duration']/60 # in minutes
+    speed_osrm = (route_data['distance']/1000)/(route_data['duration']/3600) # in km/h
+    distance_osrm = route_data['distance']/1000 # in km
+
+    # Raw inputs, keyed like the model's source columns
+    order = {
+        'Delivery_person_Age': float(delivery_person_age),
+        'Delivery_person_Ratings': delivery_person_ratings,
+        'Delivery_location_latitude': delivery_location_latitude,
+        'Delivery_location_longitude': delivery_location_longitude,
+        'Vehicle_condition': vehicle_condition,
+        'multiple_deliveries': float(multiple_deliveries),
+        'duration_osrm': duration_osrm,
+        'speed_osrm': speed_osrm,
+        'Weather_conditions': weather_conditions,
+        'Road_traffic_density': road_traffic_density,
+        'Type_of_order': type_of_order,
+        'Type_of_vehicle': type_of_vehicle,
+        'Festival': festival,
+        'City': city,
+        'Order_DayOfWeek': order_day_of_week,
+        'Order_Month': order_month,
+        'Time_Orderd_Hour': time_ordered_hour,
+        'Time_Order_picked_Hour': time_picked_hour
+    }
+
+    # One-hot, cyclical encoding and column ordering in one pass over the compiled schema
+    with latency_metrics.timer('encode_order'):
+        features = feature_schema.get_feature_schema().encode(order).copy()
 
     return {
-        'dataframe': df,
+        'order': order,
+        'features': features,
         'time_picked': time_picked,
         'route_coords': route_coords,
         'type_of_vehicle': type_of_vehicle,
@@ -95,5 +141,6 @@ def data_prep():
         'delivery_loc': delivery_loc,
         'duration_osrm': duration_osrm,
         'speed_osrm': speed_osrm,
-        'distance_osrm': distance_osrm
+        'distance_osrm': distance_osrm,
+        'route_estimated': route_estimated
     }
\ No newline at end of file
@@ -0,0 +1,282 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+DRIVER_AGGREGATES_VERSION = 1
+
+# Store updated by `python -m utils.driver_aggregates deliveries.csv`, read by the dashboard
+DRIVER_AGGREGATES_PATH = 'saved_models/driver_aggregates.npz'
+
+# Delivery columns averaged per driver, and their names in `create_performance_df`
+MEAN_COLUMNS = {
+    'Delivery_person_Ratings': 'Delivery_person_Ratings',
+    'Time_taken (min)': 'Time_taken (min)',
+    'Vehicle_condition': 'Vehicle_condition',
+    'speed_actual': 'speed_actual',
+    'speed_osrm': 'speed_osrm',
+    'duration_osrm': 'Avg_OSRM_Duration',
+    'distance_osrm_km': 'Avg_OSRM_Distance',
+    'multiple_deliveries': 'multiple_deliveries'
+}
+
+REQUIRED_COLUMNS = ['ID', 'Delivery_person_ID', *MEAN_COLUMNS]
+
+# Index of the column whose driver means are z-scored
+TIME_INDEX = list(MEAN_COLUMNS).index('Time_taken (min)')
+
+# Drivers allocated at a time when the store grows
+INITIAL_CAPACITY = 1024
+
+
+class DriverAggregateStore:
+    """
+    Running per-driver aggregates of a delivery log that only grows.
+
+    Per driver and column the store holds the count of non-missing values,
+    their sum and their sum of squared deviations from the mean (Welford's
+    M2), so means and variances are exact at any time. Appending a batch
+    reduces it per driver and merges it into the touched drivers only
+    (Chan et al.'s parallel update), in time proportional to the batch.
+
+    Over the drivers' mean times it keeps shifted first and second moments,
+    updated when a driver's mean changes, for the population z-score used
+    to flag slow drivers. The efficiency table is then one vectorized pass
+    over drivers, never over deliveries, and matches
+    `calculate_efficiency_metrics(create_performance_df(log))` for the whole log.
+    """
+
+    def __init__(self):
+        self.driver_ids = []
+        self._slots = {}
+        self._deliveries = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros((0, len(MEAN_COLUMNS)), dtype=np.int64)
+        self._sums = np.zeros((0, len(MEAN_COLUMNS)))
+        self._m2 = np.zeros((0, len(MEAN_COLUMNS)))
+        self._sorted = None
+
+        # Moments of (driver mean time - shift) over drivers with a mean time
+        self._time_shift = None
+        self._time_n = 0
+        self._time_s1 = 0.0
+        self._time_s2 = 0.0
+
+    def __len__(self):
+        return len(self.driver_ids)
+
+    def _driver_slots(self, driver_ids):
+        """Slots of the given drivers, adding the new ones"""
+        slots = np.empty(len(driver_ids), dtype=np.int64)
+        for i, driver_id in enumerate(driver_ids):
+            slot = self._slots.get(driver_id)
+            if slot is None:
+                slot = self._slots[driver_id] = len(self.driver_ids)
+                self.driver_ids.append(driver_id)
+                self._sorted = None
+            slots[i] = slot
+
+        if len(self.driver_ids) > len(self._deliveries):
+            capacity = max(INITIAL_CAPACITY, 2 * len(self._deliveries), len(self.driver_ids))
+            grow = capacity - len(self._deliveries)
+            self._deliveries = np.concatenate([self._deliveries, np.zeros(grow, dtype=np.int64)])
+            self._counts = np.concatenate([self._counts, np.zeros((grow, len(MEAN_COLUMNS)), dtype=np.int64)])
+            self._sums = np.concatenate([self._sums, np.zeros((grow, len(MEAN_COLUMNS)))])
+            self._m2 = np.concatenate([self._m2, np.zeros((grow, len(MEAN_COLUMNS)))])
+        return slots
+
+    def _update_time_moments(self, old_means, new_means):
+        """Replace the drivers' `old_means` (NaN for none) by `new_means` in the time moments"""
+        if self._time_shift is None:
+            defined = new_means[~np.isnan(new_means)]
+            if len(defined) == 0:
+                return
+            self._time_shift = float(defined.mean())
+        for means, sign in ((old_means, -1), (new_means, 1)):
+            centered = means[~np.isnan(means)] - self._time_shift
+            self._time_n += sign * len(centered)
+            self._time_s1 += sign * centered.sum()
+            self._time_s2 += sign * (centered ** 2).sum()
+
+    def append(self, deliveries):
+        """
+        Add a batch of deliveries, in time proportional to the batch.
+
+        Rows without a 'Delivery_person_ID' are ignored and missing values
+        are skipped per column, like `create_performance_df`'s groupby.
+
+        Args:
+            deliveries: DataFrame or list of dicts with the REQUIRED_COLUMNS
+
+        Returns:
+            pd.DataFrame: Efficiency rows of the drivers in the batch, as in `efficiency_df`
+
+        Raises:
+            ValueError: If required columns are missing.
+        """
+        deliveries = pd.DataFrame(deliveries) if not isinstance(deliveries, pd.DataFrame) else deliveries
+        missing_cols = [col for col in REQUIRED_COLUMNS if col not in deliveries.columns]
+        if missing_cols:
+            raise ValueError(f"Missing columns: {missing_cols}")
+
+        deliveries = deliveries[deliveries['Delivery_person_ID'].notna()]
+        codes, batch_ids = pd.factorize(deliveries['Delivery_person_ID'])
+        slots = self._driver_slots(batch_ids.tolist())
+        n_batch = len(batch_ids)
+
+        # Per driver count, sum and M2 of the batch
+        values = deliveries[list(MEAN_COLUMNS)].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        counts_b = np.empty((n_batch, len(MEAN_COLUMNS)), dtype=np.int64)
+        sums_b = np.empty((n_batch, len(MEAN_COLUMNS)))
+        m2_b = np.empty((n_batch, len(MEAN_COLUMNS)))
+        for j in range(len(MEAN_COLUMNS)):
+            column = np.where(valid[:, j], values[:, j], 0.0)
+            counts_b[:, j] = np.bincount(codes, weights=valid[:, j], minlength=n_batch)
+            sums_b[:, j] = np.bincount(codes, weights=column, minlength=n_batch)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                deviation = np.where(valid[:, j], column - (sums_b[:, j] / counts_b[:, j])[codes], 0.0)
+            m2_b[:, j] = np.bincount(codes, weights=deviation ** 2, minlength=n_batch)
+
+        # Merge into the drivers' running aggregates
+        counts_a, sums_a, m2_a = self._counts[slots], self._sums[slots], self._m2[slots]
+        counts = counts_a + counts_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = sums_b / counts_b - sums_a / counts_a
+            correction = np.where((counts_a > 0) & (counts_b > 0), delta ** 2 * counts_a * counts_b / counts, 0.0)
+            old_times = sums_a[:, TIME_INDEX] / counts_a[:, TIME_INDEX]
+            new_times = (sums_a[:, TIME_INDEX] + sums_b[:, TIME_INDEX]) / counts[:, TIME_INDEX]
+
+        self._counts[slots] = counts
+        self._sums[slots] = sums_a + sums_b
+        self._m2[slots] = m2_a + m2_b + correction
+        self._deliveries[slots] += np.bincount(
+            codes, weights=deliveries['ID'].notna().to_numpy(), minlength=n_batch
+        ).astype(np.int64)
+        self._update_time_moments(old_times, new_times)
+
+        return self.efficiency_df(slots)
+
+    def _means(self, slots):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self._sums[slots] / self._counts[slots]
+
+    def _time_zscores(self, mean_times):
+        """Absolute population z-scores of mean times, NaN like scipy when any driver lacks one"""
+        if self._time_n == 0 or self._time_n < len(self.driver_ids):
+            return np.full(len(mean_times), np.nan)
+        mean = self._time_s1 / self._time_n
+        variance = self._time_s2 / self._time_n - mean ** 2
+        if variance <= 0:
+            return np.full(len(mean_times), np.nan)
+        return np.abs(mean_times - self._time_shift - mean) / np.sqrt(variance)
+
+    def time_zscore(self, driver_ids):
+        """Absolute z-score of the given drivers' mean time taken, O(len(driver_ids))"""
+        slots = np.array([self._slots[driver_id] for driver_id in driver_ids], dtype=np.int64)
+        return self._time_zscores(self._means(slots)[:, TIME_INDEX])
+
+    def variance(self, column):
+        """Population variance of one MEAN_COLUMNS column per driver, in driver ID order"""
+        slots = self._sorted_slots()
+        j = list(MEAN_COLUMNS).index(column)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = self._m2[slots, j] / self._counts[slots, j]
+        return pd.Series(values, index=pd.Index(np.array(self.driver_ids, dtype=object)[slots], name='Delivery_person_ID'))
+
+    def _sorted_slots(self):
+        """Slots in driver ID order, like a groupby; sorted again only after new drivers arrive"""
+        if self._sorted is None:
+            self._sorted = np.argsort(np.array(self.driver_ids, dtype=object), kind='stable')
+        return self._sorted
+
+    def performance_df(self, slots=None):
+        """
+        Per-driver averages, matching `dash_support.create_performance_df` over every appended delivery.
+
+        Args:
+            slots: Internal driver slots to return; None returns all drivers in ID order
+        """
+        slots = self._sorted_slots() if slots is None else slots
+        means = self._means(slots)
+        return pd.DataFrame({
+            'Delivery_person_ID': np.array(self.driver_ids, dtype=object)[slots],
+            **{name: means[:, j] for j, name in enumerate(MEAN_COLUMNS.values())},
+            'Total_Deliveries': self._deliveries[slots]
+        })
+
+    def efficiency_df(self, slots=None):
+        """
+        Per-driver averages, z-scores and flags, matching
+        `calculate_efficiency_metrics(create_performance_df(log))`.
+
+        One vectorized pass over the selected drivers; the z-scores use the
+        running moments instead of re-reading every driver's mean.
+        """
+        # Imported here: dash_support loads the store through this module
+        from utils import dash_support
+
+        performance_df = self.performance_df(slots)
+        time_zscore = self._time_zscores(performance_df['Time_taken (min)'].to_numpy())
+        return dash_support.calculate_efficiency_metrics(performance_df, time_zscore=time_zscore)
+
+    def _recompute_time_moments(self):
+        """Exact time moments from the drivers' current means, removing accumulated rounding"""
+        self._time_shift, self._time_n, self._time_s1, self._time_s2 = None, 0, 0.0, 0.0
+        mean_times = self._means(np.arange(len(self.driver_ids)))[:, TIME_INDEX]
+        self._update_time_moments(np.full(len(mean_times), np.nan), mean_times)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Load a store written by `save`.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file was written by another format version.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No driver aggregates found at {path}")
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != DRIVER_AGGREGATES_VERSION:
+                raise ValueError(f"Unsupported driver aggregates version {int(data['version'])} in {path}")
+            store = cls()
+            store.driver_ids = data['driver_ids'].tolist()
+            store._slots = {driver_id: slot for slot, driver_id in enumerate(store.driver_ids)}
+            store._deliveries = data['deliveries']
+            store._counts = data['counts']
+            store._sums = data['sums']
+            store._m2 = data['m2']
+        store._recompute_time_moments()
+        return store
+
+    def save(self, path):
+        """Write the aggregates to a compressed .npz file; driver IDs are stored as strings"""
+        n = len(self.driver_ids)
+        np.savez_compressed(
+            path,
+            version=DRIVER_AGGREGATES_VERSION,
+            driver_ids=np.array([str(driver_id) for driver_id in self.driver_ids]),
+            deliveries=self._deliveries[:n],
+            counts=self._counts[:n],
+            sums=self._sums[:n],
+            m2=self._m2[:n]
+        )
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.driver_aggregates deliveries.csv [more.csv ...] [--store saved_models/driver_aggregates.npz]
+    parser = argparse.ArgumentParser(description="Append delivery logs to the per-driver aggregate store")
+    parser.add_argument('sources', nargs='+', help='delivery CSV files to append')
+    parser.add_argument('--store', default=DRIVER_AGGREGATES_PATH, help='store to update, created if missing')
+    parser.add_argument('--chunk-rows', type=int, default=500_000)
+    args = parser.parse_args()
+
+    store = DriverAggregateStore.from_file(args.store) if os.path.exists(args.store) else DriverAggregateStore()
+    for source in args.sources:
+        for chunk in pd.read_csv(source, usecols=REQUIRED_COLUMNS, chunksize=args.chunk_rows):
+            store.append(chunk)
+    store.save(args.store)
+
+    efficiency_df = store.efficiency_df()
+    print(f"{len(store)} drivers, {int((efficiency_df['Underperformer'] == 'Yes').sum())} underperformers")
+    print(f"Wrote {args.store}")
@@ -1,15 +1,28 @@
-import folium
+import requests
 import pandas as pd
 import streamlit as st
-from streamlit_folium import st_folium
 from datetime import datetime, timedelta
-from utils import data_preparation, prep_support
+from utils import data_preparation, latency_metrics, prep_support, route_simplify
+
+# folium and streamlit_folium are imported when the first map is drawn, so the form renders without them
+
+# Extra zoom levels of detail kept beyond the initial view, so zooming in still looks sharp
+MAP_ZOOM_HEADROOM = 2
 
 def initialize_data():
-    """Fetch and return prepared data from data preparation module"""
+    """
+    Render the order form and return the data of the last submitted order.
+
+    Returns:
+        tuple: (data dict or None before the first submit, True if submitted on this run)
+    """
     result = data_preparation.data_prep()
-    return {
-        'processed_input': result['dataframe'],
+    if result is None:
+        return st.session_state.get('delivery_data'), False
+
+    st.session_state.delivery_data = {
+        'order': result['order'],
+        'processed_input': result['features'],
         'time_picked': result['time_picked'],
         'route_coords': result['route_coords'],
         'type_of_vehicle': result['type_of_vehicle'],
@@ -18,19 +31,19 @@ def initialize_data():
         'osrm_data': {
             'duration': result['duration_osrm'],
             'distance': result['distance_osrm'],
-            'speed': result['speed_osrm']
+            'speed': result['speed_osrm'],
+            'estimated': result['route_estimated']
         }
     }
+    return st.session_state.delivery_data, True
 
 def generate_input_key(data):
     """Create unique key based on current inputs"""
     try:
-        # Convert all components to strings before concatenation
-        input_hash = str(hash(str(data['processed_input'].iloc[0].to_dict())))
-        time_hash = str(hash(data['time_picked']))
-        vehicle_hash = str(hash(data['type_of_vehicle']))
+        # Stable across reruns, sessions and processes, unlike the built-in hash()
+        input_key = prep_support.prediction_cache_key(data['processed_input'])
         
-        return f"{input_hash}_{time_hash}_{vehicle_hash}"
+        return f"{input_key}_{data['time_picked']}_{data['type_of_vehicle']}"
     except Exception as e:
         st.error(f"Error generating input key: {str(e)}")
         # Return a fallback key if something fails
@@ -53,9 +66,19 @@ def handle_session_state(current_input_key):
             'delivery_map': None
         })
 
+@latency_metrics.timed('create_delivery_map')
 def create_delivery_map(route_coords, restaurant_loc, delivery_loc):
     """Create a Folium map with route and markers"""
+    import folium
+
     m = folium.Map(location=restaurant_loc, zoom_start=13)
+
+    # Drop vertices that are invisible at the zoom fit_bounds will pick
+    zoom = route_simplify.zoom_for_bounds(
+        [min(restaurant_loc[0], delivery_loc[0]), min(restaurant_loc[1], delivery_loc[1])],
+        [max(restaurant_loc[0], delivery_loc[0]), max(restaurant_loc[1], delivery_loc[1])]
+    )
+    route_coords = route_simplify.simplify_route(route_coords, zoom + MAP_ZOOM_HEADROOM).tolist()
     
     folium.PolyLine(
         route_coords,
@@ -89,27 +112,37 @@ def initialize_map(data, current_input_key):
             data['delivery_loc']
         )
 
+def predict_order(data):
+    """Predict through the prediction service when one is configured, in-process otherwise"""
+    if prep_support.PREDICTION_SERVICE_URL:
+        try:
+            return prep_support.request_prediction(data['order'])
+        except requests.RequestException:
+            st.warning("Prediction service unavailable, predicting locally")
+    return prep_support.make_prediction(data['processed_input'])
+
 def handle_prediction(data):
-    """Handle prediction button click and calculations"""
-    if st.button("🛵 Predict Delivery Time", help="Click to estimate delivery duration"):
-        with st.spinner("🔮 Crystal ball gazing... Calculating your delivery ETA"):
-            prediction = prep_support.make_prediction(data['processed_input'])
-        
-        deviation = 4.29  # Could be moved to config
-        time_picked_dt = datetime.strptime(data['time_picked'], '%H:%M')
-        predicted_minutes = float(prediction[0])
-        
-        st.session_state.prediction_results = {
-            'predicted_minutes': predicted_minutes,
-            'delivery_time': time_picked_dt + timedelta(minutes=predicted_minutes),
-            'lower_bound': time_picked_dt + timedelta(minutes=predicted_minutes - deviation),
-            'upper_bound': time_picked_dt + timedelta(minutes=predicted_minutes + deviation),
-            'vehicle_type': data['type_of_vehicle']
-        }
+    """Predict the submitted order and store the results"""
+    with st.spinner("🔮 Crystal ball gazing... Calculating your delivery ETA"):
+        prediction = predict_order(data)
+    
+    deviation = 4.29  # Could be moved to config
+    time_picked_dt = datetime.strptime(data['time_picked'], '%H:%M')
+    predicted_minutes = float(prediction[0])
+    
+    st.session_state.prediction_results = {
+        'predicted_minutes': predicted_minutes,
+        'delivery_time': time_picked_dt + timedelta(minutes=predicted_minutes),
+        'lower_bound': time_picked_dt + timedelta(minutes=predicted_minutes - deviation),
+        'upper_bound': time_picked_dt + timedelta(minutes=predicted_minutes + deviation),
+        'vehicle_type': data['type_of_vehicle'],
+        'route_estimated': data['osrm_data']['estimated']
+    }
 
+@st.fragment
 def display_prediction_results():
     """Display prediction results if available"""
-    if st.session_state.prediction_results:
+    if st.session_state.get('prediction_results'):
         results = st.session_state.prediction_results
         st.subheader("🚀 Delivery ETA")
         st.success(f"""
@@ -118,26 +151,39 @@ def display_prediction_results():
             ✨ Arriving by **{results['delivery_time'].strftime('%H:%M')}** 
             (between {results['lower_bound'].strftime('%H:%M')} - {results['upper_bound'].strftime('%H:%M')})
         """)
+        if results.get('route_estimated'):
+            st.caption("⚠️ Based on an estimated route: routing was unavailable for this order")
+
+def set_map_visibility(show_map):
+    """Show or hide the route map (button callback)"""
+    st.session_state.show_map = show_map
 
+@st.fragment
 def handle_map_buttons(data):
-    """Handle map visibility toggle and display"""
+    """Handle map visibility toggle and display, rerunning only this section"""
     col1, col2 = st.columns([2, 2])
     with col1:
+        # Callbacks update the state before the fragment reruns, so no extra st.rerun is needed
         if st.session_state.show_map:
-            if st.button("❌ Hide Map"):
-                st.session_state.show_map = False
-                st.rerun()
+            st.button("❌ Hide Map", on_click=set_map_visibility, args=(False,))
         else:
-            if st.button("🗺️ Show Map"):
-                st.session_state.show_map = True
-                st.rerun()
+            st.button("🗺️ Show Map", on_click=set_map_visibility, args=(True,))
     
     if st.session_state.show_map:
         display_map_data(data)
 
 def display_map_data(data):
     """Display map and related OSRM data"""
-    st.info(f"""
+    from streamlit_folium import st_folium
+
+    if data['osrm_data'].get('estimated'):
+        st.info(f"""
+        🕒 Estimated time from the straight-line distance (by car): {data['osrm_data']['duration']:.1f} minutes  
+        📏 Estimated distance from the straight-line distance (by car): {data['osrm_data']['distance']:.1f} km  
+        ⚡ Typical speed for this city type and traffic level (by car): {data['osrm_data']['speed']:.1f} km/h
+    """)
+    else:
+        st.info(f"""
         🕒 Estimated time from OpenStreetMap APIs (by car): {data['osrm_data']['duration']:.1f} minutes  
         📏 Estimated distance from OpenStreetMap APIs (by car): {data['osrm_data']['distance']:.1f} km  
         ⚡ Estimated speed from OpenStreetMap APIs (by car): {data['osrm_data']['speed']:.1f} km/h
@@ -150,6 +196,7 @@ def display_map_data(data):
         returned_objects=[]
     )
 
+@st.fragment
 def display_sample_data_table():
     """Display sample driver data in formatted table"""
     try:
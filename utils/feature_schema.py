@@ -0,0 +1,157 @@
+import functools
+import threading
+import numpy as np
+import pandas as pd
+from utils import prep_support
+from utils.batch_preparation import batch_data_prep
+
+FEATURE_COLUMNS_PATH = 'saved_csv/feature_columns.csv'
+
+# Raw inputs written to the feature vector as they are
+NUMERIC_INPUTS = [
+    'Delivery_person_Age',
+    'Delivery_person_Ratings',
+    'Delivery_location_latitude',
+    'Delivery_location_longitude',
+    'Vehicle_condition',
+    'multiple_deliveries',
+    'duration_osrm',
+    'speed_osrm'
+]
+
+
+class FeatureSchema:
+    """
+    Feature layout of the model, compiled once from feature_columns.csv.
+
+    Every raw input is resolved to its column index up front: numeric inputs to
+    one column, each categorical value to its one-hot column (or none for the
+    dropped baseline category) and each datetime input to its sine/cosine
+    columns. Sine/cosine values of the integer days, months and hours are
+    precomputed with NumPy, so encoding a single order is a handful of
+    dictionary lookups and buffer writes, with no DataFrame involved.
+
+    Raw orders use the same keys as `batch_preparation.REQUIRED_COLUMNS`.
+    """
+
+    def __init__(self, feature_columns):
+        """
+        Args:
+            feature_columns: Model feature names in model order
+
+        Raises:
+            ValueError: If a feature cannot be produced from the raw inputs.
+        """
+        self.columns = tuple(feature_columns)
+        index = {column: i for i, column in enumerate(self.columns)}
+
+        self.numeric_index = [(name, index[name]) for name in NUMERIC_INPUTS if name in index]
+
+        # Selected value -> column to set to 1, per categorical input
+        self.one_hot_index = {
+            column_base: {
+                category: index[f"{column_base}_{category}"]
+                for category in categories if f"{column_base}_{category}" in index
+            }
+            for column_base, categories in prep_support.ONE_HOT_CATEGORIES.items()
+        }
+        self.one_hot_columns = np.array(sorted(
+            i for mapping in self.one_hot_index.values() for i in mapping.values()
+        ), dtype=np.intp)
+
+        # Datetime input -> (name to number mapping or None, sin column, cos column, period)
+        name_maps = {'Order_DayOfWeek': prep_support.DAY_OF_WEEK_MAP, 'Order_Month': prep_support.MONTH_MAP}
+        self.cyclical_index = [
+            (name, name_maps.get(name), index[f'{name}_sin'], index[f'{name}_cos'], period)
+            for name, period in prep_support.CYCLICAL_PERIODS.items()
+        ]
+
+        # Same expression as prep_support.cyclical_encode, evaluated once per integer value
+        self.cyclical_tables = {}
+        for name, _, _, _, period in self.cyclical_index:
+            values = np.arange(0, period + 1, dtype=float)
+            self.cyclical_tables[name] = (
+                np.sin(2 * np.pi * values / period).tolist(),
+                np.cos(2 * np.pi * values / period).tolist()
+            )
+
+        covered = (
+            [i for _, i in self.numeric_index]
+            + self.one_hot_columns.tolist()
+            + [i for entry in self.cyclical_index for i in entry[2:4]]
+        )
+        uncovered = set(range(len(self.columns))) - set(covered)
+        if uncovered:
+            raise ValueError(f"Features without a raw input: {[self.columns[i] for i in sorted(uncovered)]}")
+
+        self._local = threading.local()
+
+    @classmethod
+    def from_csv(cls, feature_columns_path=FEATURE_COLUMNS_PATH):
+        """Compile the schema from a saved feature columns list"""
+        return cls(pd.read_csv(feature_columns_path, header=None)[0].tolist())
+
+    @property
+    def n_features(self):
+        return len(self.columns)
+
+    def buffer(self):
+        """The calling thread's reusable (1, n_features) float32 buffer"""
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = np.zeros((1, self.n_features), dtype=np.float32)
+        return buffer
+
+    def cyclical_values(self, name, value, period):
+        """Sine and cosine of a datetime value, from the lookup table for integers"""
+        if float(value).is_integer() and 0 <= value <= period:
+            sines, cosines = self.cyclical_tables[name]
+            return sines[int(value)], cosines[int(value)]
+        value = float(value)
+        return np.sin(2 * np.pi * value / period), np.cos(2 * np.pi * value / period)
+
+    def encode(self, order, out=None):
+        """
+        Encode one raw order into a (1, n_features) float32 model input.
+
+        Args:
+            order (dict): Raw inputs keyed like `batch_preparation.REQUIRED_COLUMNS`
+            out (np.ndarray): Buffer to write into; defaults to the calling thread's
+                reused buffer, which the next `encode` call in the thread overwrites
+
+        Returns:
+            np.ndarray: The filled buffer
+
+        Raises:
+            KeyError: If an input is missing or a day/month name is unknown.
+        """
+        row = (self.buffer() if out is None else out).reshape(-1)
+
+        for name, i in self.numeric_index:
+            row[i] = order[name]
+
+        row[self.one_hot_columns] = 0
+        for column_base, mapping in self.one_hot_index.items():
+            i = mapping.get(order[column_base])
+            if i is not None:
+                row[i] = 1
+
+        for name, name_map, sin_i, cos_i, period in self.cyclical_index:
+            value = order[name] if name_map is None else name_map[order[name]]
+            row[sin_i], row[cos_i] = self.cyclical_values(name, value, period)
+
+        return row.reshape(1, -1)
+
+    def encode_batch(self, orders):
+        """
+        Encode many raw orders into an (N, n_features) float32 array.
+
+        Vectorized equivalent of calling `encode` on every row.
+        """
+        return batch_data_prep(orders)[list(self.columns)].to_numpy(dtype=np.float32)
+
+
+@functools.lru_cache(maxsize=None)
+def get_feature_schema(feature_columns_path=FEATURE_COLUMNS_PATH):
+    """Load the feature schema once per process"""
+    return FeatureSchema.from_csv(feature_columns_path)
@@ -0,0 +1,220 @@
+"""
+Per-stage latency histograms for the prediction and map hot paths.
+
+Stages are timed with `timer('stage')` blocks or the `@timed('stage')`
+decorator and recorded in fixed-bucket histograms, exported in the
+Prometheus text format by `export_prometheus`. Recording is off unless
+SMARTDELIVERY_METRICS=1: `timer` then returns a shared no-op context
+manager and `timed` leaves functions undecorated, so instrumented code
+costs nothing measurable. Histograms are per process; with several
+service workers every worker reports its own.
+"""
+import os
+import time
+import bisect
+import threading
+import functools
+import contextlib
+
+# Record stage latencies (SMARTDELIVERY_METRICS=1); read once at import
+METRICS_ENABLED = os.environ.get('SMARTDELIVERY_METRICS', '0') == '1'
+
+# Show the stage latency panel in the app's sidebar (SMARTDELIVERY_METRICS_PANEL=1)
+METRICS_PANEL = os.environ.get('SMARTDELIVERY_METRICS_PANEL', '0') == '1'
+
+METRIC_NAME = 'smartdelivery_stage_latency_seconds'
+
+# Upper bounds of the histogram buckets in seconds, from a cached encoding to an OSRM timeout
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+class LatencyHistogram:
+    """Cumulative-bucket latency histogram, safe to update from several threads"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # the last bucket is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += seconds
+
+    def clear(self):
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._sum = 0.0
+
+    def snapshot(self):
+        """Return (cumulative bucket counts including +Inf, sum, count)"""
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total, running
+
+    def quantile(self, q):
+        """
+        Estimate a quantile by linear interpolation inside its bucket, like
+        Prometheus' histogram_quantile. Returns None without observations.
+        """
+        cumulative, _, count = self.snapshot()
+        if count == 0:
+            return None
+        rank = q * count
+        index = bisect.bisect_left(cumulative, rank)
+        if index >= len(self.buckets):
+            return self.buckets[-1]
+        lower = self.buckets[index - 1] if index > 0 else 0.0
+        below = cumulative[index - 1] if index > 0 else 0
+        in_bucket = cumulative[index] - below
+        return lower + (self.buckets[index] - lower) * ((rank - below) / in_bucket if in_bucket else 1.0)
+
+
+class _Timer:
+    """Context manager adding the time spent in its block to a histogram"""
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class LatencyRegistry:
+    """Named stage histograms, created on first use"""
+
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, LatencyHistogram())
+        return histogram
+
+    def timer(self, stage):
+        """Context manager timing one run of `stage`; a shared no-op while disabled"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(stage))
+
+    def timed(self, stage):
+        """
+        Decorator timing every call of a function as `stage`.
+
+        Decided when the function is decorated: while disabled the function
+        is returned unchanged.
+        """
+        def decorator(function):
+            if not self.enabled:
+                return function
+
+            histogram = self.histogram(stage)
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with _Timer(histogram):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def summary(self):
+        """
+        Per-stage statistics, slowest total time first.
+
+        Returns:
+            list: Dicts with 'stage', 'count', 'total_s', 'mean_ms', 'p50_ms', 'p95_ms' and 'p99_ms'
+        """
+        rows = []
+        for stage, histogram in list(self._histograms.items()):
+            _, total, count = histogram.snapshot()
+            if not count:
+                continue
+            rows.append({
+                'stage': stage,
+                'count': count,
+                'total_s': total,
+                'mean_ms': total / count * 1e3,
+                **{f'p{int(q * 100)}_ms': histogram.quantile(q) * 1e3 for q in (0.5, 0.95, 0.99)}
+            })
+        return sorted(rows, key=lambda row: row['total_s'], reverse=True)
+
+    def export_prometheus(self):
+        """All histograms in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent in each stage of the SmartDelivery hot paths.",
+            f"# TYPE {METRIC_NAME} histogram"
+        ]
+        for stage, histogram in sorted(self._histograms.items()):
+            cumulative, total, count = histogram.snapshot()
+            bounds = [repr(float(bound)) for bound in histogram.buckets] + ['+Inf']
+            lines += [
+                f'{METRIC_NAME}_bucket{{stage="{stage}",le="{bound}"}} {value}'
+                for bound, value in zip(bounds, cumulative)
+            ]
+            lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"}} {total!r}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """
+        Zero every histogram in place.
+
+        Functions decorated with `timed` hold on to their histogram, so the
+        histograms are cleared rather than replaced.
+        """
+        with self._lock:
+            histograms = list(self._histograms.values())
+        for histogram in histograms:
+            histogram.clear()
+
+
+# Process-wide registry used by the app and the prediction service
+REGISTRY = LatencyRegistry()
+timer = REGISTRY.timer
+timed = REGISTRY.timed
+export_prometheus = REGISTRY.export_prometheus
+
+
+def render_metrics_panel():
+    """Sidebar panel with the stage latencies of this process, for admins (needs Streamlit)"""
+    import pandas as pd
+    import streamlit as st
+
+    with st.sidebar.expander("⏱️ Stage latencies"):
+        if not REGISTRY.enabled:
+            st.caption("Set SMARTDELIVERY_METRICS=1 to record stage latencies.")
+            return
+        summary = REGISTRY.summary()
+        if not summary:
+            st.caption("No stage has run yet.")
+        else:
+            st.dataframe(
+                pd.DataFrame(summary).drop(columns='total_s').round(2),
+                hide_index=True
+            )
+        st.download_button(
+            "Prometheus metrics", export_prometheus(), file_name='smartdelivery_metrics.prom', mime='text/plain'
+        )
+        if st.button("Reset", key='reset_latency_metrics'):
+            REGISTRY.reset()
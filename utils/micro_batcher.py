@@ -0,0 +1,173 @@
+import time
+import queue
+import threading
+import collections
+from concurrent.futures import Future
+import numpy as np
+
+# Longest time the first request of a batch waits for others to join it
+MAX_WAIT_MS = 2.0
+MAX_BATCH_SIZE = 64
+
+# Recent wait times kept for percentiles
+WAIT_SAMPLES = 10_000
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Dynamic batching in front of a vectorized predict function.
+
+    Callers submit single feature rows and get a Future back. A background
+    thread takes the first pending row, keeps collecting rows until
+    `max_wait_ms` have passed since that row arrived or `max_batch_size` rows
+    are waiting, predicts them with one call and resolves every Future with
+    its own result. Under load, many single-row requests share the fixed
+    per-call cost of the model; when idle, a request waits at most
+    `max_wait_ms`.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        """
+        Args:
+            predict_fn: Function mapping an (n, n_features) float32 array to n predictions
+            max_batch_size (int): Most rows predicted in one call
+            max_wait_ms (float): Batching window, measured from the first row of a batch
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        # Held while checking `_closed` and queueing, so no row lands behind the stop marker
+        self._submit_lock = threading.Lock()
+
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._errors = 0
+        self._batch_sizes = np.zeros(max_batch_size + 1, dtype=np.int64)
+        self._max_queue_depth = 0
+        self._queue_depth_sum = 0
+        self._waits = collections.deque(maxlen=WAIT_SAMPLES)
+
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """
+        Queue one feature row for prediction.
+
+        The row is read when its batch runs, so pass an array the caller no
+        longer writes to (not a reused `FeatureSchema` buffer).
+
+        Returns:
+            concurrent.futures.Future: Resolves to the row's prediction
+
+        Raises:
+            RuntimeError: If the batcher has been closed.
+        """
+        row = np.asarray(row, dtype=np.float32).reshape(-1)
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._queue.put((row, future, time.perf_counter()))
+        return future
+
+    def predict(self, row):
+        """Predict one row, blocking until its batch has run"""
+        return self.submit(row).result()
+
+    def _collect(self, first):
+        """Gather rows for the batch started by `first`, returning (batch, stop)"""
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect(first)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        started = time.perf_counter()
+        queue_depth = self._queue.qsize()
+
+        # Skip rows whose caller gave up (e.g. a cancelled request) before the batch ran
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        futures = [future for _, future, _ in batch]
+        try:
+            predictions = np.asarray(self.predict_fn(np.stack([row for row, _, _ in batch])))
+            if len(predictions) != len(batch):
+                raise ValueError(f"predict_fn returned {len(predictions)} results for {len(batch)} rows")
+        except Exception as e:
+            with self._lock:
+                self._errors += 1
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self._batches += 1
+            self._rows += len(batch)
+            self._batch_sizes[len(batch)] += 1
+            self._queue_depth_sum += queue_depth
+            self._max_queue_depth = max(self._max_queue_depth, queue_depth)
+            self._waits.extend(started - enqueued for _, _, enqueued in batch)
+
+        for future, prediction in zip(futures, predictions.tolist()):
+            future.set_result(prediction)
+
+    def metrics(self):
+        """
+        Batching statistics since start.
+
+        Returns:
+            dict: 'batches', 'rows', 'errors', 'mean_batch_size', 'batch_sizes'
+                (size -> count), 'queue_depth' (rows waiting now),
+                'mean_queue_depth'/'max_queue_depth' (rows left waiting when a
+                batch started) and 'wait_p50_ms'/'wait_p99_ms'/'wait_max_ms'
+                over the last WAIT_SAMPLES rows
+        """
+        with self._lock:
+            waits = np.array(self._waits) * 1e3
+            batches = self._batches
+            return {
+                'batches': batches,
+                'rows': self._rows,
+                'errors': self._errors,
+                'mean_batch_size': self._rows / batches if batches else 0.0,
+                'batch_sizes': {int(size): int(count) for size, count in enumerate(self._batch_sizes) if count},
+                'queue_depth': self._queue.qsize(),
+                'mean_queue_depth': self._queue_depth_sum / batches if batches else 0.0,
+                'max_queue_depth': self._max_queue_depth,
+                'wait_p50_ms': float(np.percentile(waits, 50)) if len(waits) else 0.0,
+                'wait_p99_ms': float(np.percentile(waits, 99)) if len(waits) else 0.0,
+                'wait_max_ms': float(waits.max()) if len(waits) else 0.0
+            }
+
+    def close(self):
+        """Stop the batching thread after the rows already queued have run"""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
@@ -0,0 +1,58 @@
+import os
+import sys
+
+MODEL_DIR = 'saved_models'
+
+# Threads per prediction; single rows are too small to gain from more and pay for thread start-up
+PREDICT_NTHREAD = 1
+
+
+def native_model_path(model_filename, model_dir=MODEL_DIR):
+    """Path of the native (.ubj) export of a pickled model"""
+    return os.path.join(model_dir, os.path.splitext(model_filename)[0] + '.ubj')
+
+
+def export_native_model(model_filename, model_dir=MODEL_DIR):
+    """
+    Export a joblib-pickled XGBoost model to XGBoost's native UBJSON format.
+
+    The native file holds only the booster (trees, base score, objective), is
+    portable across XGBoost versions and loads without scikit-learn.
+
+    Returns:
+        str: Path of the written .ubj file
+    """
+    # Only exporting needs the pickle (and scikit-learn behind it)
+    import joblib
+    model = joblib.load(os.path.join(model_dir, model_filename))
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    path = native_model_path(model_filename, model_dir)
+    booster.save_model(path)
+    return path
+
+
+def load_booster(path, nthread=PREDICT_NTHREAD):
+    """
+    Load a bare `xgboost.Booster` from a native model file.
+
+    Raises:
+        FileNotFoundError: If the model file does not exist.
+        ValueError: If the file cannot be loaded as an XGBoost model.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No model found at {path}")
+
+    # Imported here so processes predicting with the compiled trees never load xgboost
+    import xgboost as xgb
+    booster = xgb.Booster()
+    try:
+        booster.load_model(path)
+    except xgb.core.XGBoostError as e:
+        raise ValueError(f"Error loading model from {path}: {e}")
+    booster.set_param({'nthread': nthread})
+    return booster
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.model_artifact [model.pkl]
+    print(f"Wrote {export_native_model(sys.argv[1] if len(sys.argv) > 1 else 'XGBoost_20250508_151557.pkl')}")
@@ -0,0 +1,258 @@
+import sys
+import math
+import heapq
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters, element-wise over scalars or arrays (degrees)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def build_graph(node_lat, node_lon, edge_from, edge_to, edge_duration, edge_distance):
+    """
+    Build compact CSR arrays for a directed road graph.
+
+    Args:
+        node_lat, node_lon: Node coordinates in degrees, indexed by node id (0..n-1)
+        edge_from, edge_to: Node ids of each directed edge (add both directions for two-way roads)
+        edge_duration: Travel time of each edge in seconds
+        edge_distance: Length of each edge in meters
+
+    Returns:
+        dict: Arrays 'node_lat', 'node_lon', 'indptr', 'indices', 'duration', 'distance'
+    """
+    edge_from = np.asarray(edge_from, dtype=np.int64)
+    order = np.argsort(edge_from, kind='stable')
+    n_nodes = len(node_lat)
+
+    return {
+        'node_lat': np.asarray(node_lat, dtype=np.float32),
+        'node_lon': np.asarray(node_lon, dtype=np.float32),
+        'indptr': np.concatenate([[0], np.cumsum(np.bincount(edge_from, minlength=n_nodes))]).astype(np.int64),
+        'indices': np.asarray(edge_to, dtype=np.int32)[order],
+        'duration': np.asarray(edge_duration, dtype=np.float32)[order],
+        'distance': np.asarray(edge_distance, dtype=np.float32)[order]
+    }
+
+
+def save_graph(path, graph):
+    """Save graph arrays to an uncompressed .npz file"""
+    np.savez(path, **graph)
+
+
+def graph_from_csv(nodes_csv, edges_csv):
+    """
+    Build a graph from node and edge CSV files, e.g. exported from an OSM extract.
+
+    nodes_csv needs 'id', 'lat', 'lon'. edges_csv needs 'from', 'to', 'distance'
+    (meters) and either 'duration' (seconds) or 'speed_kmh'; an optional 'oneway'
+    column (0/1) adds the reverse edge for two-way roads.
+
+    Returns:
+        dict: Graph arrays, see `build_graph`
+    """
+    nodes = pd.read_csv(nodes_csv)
+    edges = pd.read_csv(edges_csv)
+
+    # Map OSM node ids to contiguous indices
+    node_index = pd.Series(np.arange(len(nodes)), index=nodes['id'])
+    edge_from = node_index.loc[edges['from']].to_numpy()
+    edge_to = node_index.loc[edges['to']].to_numpy()
+    distance = edges['distance'].to_numpy(dtype=float)
+    if 'duration' in edges:
+        duration = edges['duration'].to_numpy(dtype=float)
+    else:
+        duration = distance / (edges['speed_kmh'].to_numpy(dtype=float) / 3.6)
+
+    if 'oneway' in edges:
+        two_way = edges['oneway'].to_numpy() == 0
+        edge_from, edge_to = (
+            np.concatenate([edge_from, edge_to[two_way]]),
+            np.concatenate([edge_to, edge_from[two_way]])
+        )
+        duration = np.concatenate([duration, duration[two_way]])
+        distance = np.concatenate([distance, distance[two_way]])
+
+    return build_graph(nodes['lat'], nodes['lon'], edge_from, edge_to, duration, distance)
+
+
+class OfflineRouter:
+    """
+    In-process shortest-path router over a preprocessed road graph.
+
+    Queries run a bidirectional A* search on travel time, using the great-circle
+    distance at the graph's top speed as the heuristic, and return the same
+    dictionary as `prep_support.get_osrm_route_data`.
+    """
+
+    def __init__(self, graph):
+        """
+        Args:
+            graph (dict): Arrays as produced by `build_graph`
+        """
+        self.node_lat = np.asarray(graph['node_lat'], dtype=float)
+        self.node_lon = np.asarray(graph['node_lon'], dtype=float)
+        self.indptr = np.asarray(graph['indptr'])
+        self.indices = np.asarray(graph['indices'])
+        self.duration = np.asarray(graph['duration'], dtype=float)
+        self.distance = np.asarray(graph['distance'], dtype=float)
+
+        # Reverse graph for the backward search, keeping the forward edge id of each entry
+        edge_from = np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+        self.reverse_edge = np.argsort(self.indices, kind='stable')
+        self.reverse_indices = edge_from[self.reverse_edge]
+        self.reverse_indptr = np.concatenate(
+            [[0], np.cumsum(np.bincount(self.indices, minlength=len(self.node_lat)))]
+        )
+
+        # Highest speed (m/s) on any edge keeps the heuristic admissible and consistent
+        edge_crow = haversine_m(
+            self.node_lat[edge_from], self.node_lon[edge_from],
+            self.node_lat[self.indices], self.node_lon[self.indices]
+        )
+        speeds = edge_crow / np.maximum(self.duration, 1e-9)
+        self.max_speed = float(speeds.max()) * 1.0001 if len(speeds) else 1.0
+
+        # Python lists are faster than NumPy scalars inside the search loop
+        self._lat_rad = np.radians(self.node_lat).tolist()
+        self._lon_rad = np.radians(self.node_lon).tolist()
+        self._cos_lat = np.cos(np.radians(self.node_lat)).tolist()
+        self._indptr = self.indptr.tolist()
+        self._indices = self.indices.tolist()
+        self._duration = self.duration.tolist()
+        self._reverse_indptr = self.reverse_indptr.tolist()
+        self._reverse_indices = self.reverse_indices.tolist()
+        self._reverse_duration = self.duration[self.reverse_edge].tolist()
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a router from a .npz file written by `save_graph`"""
+        with np.load(path) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def nearest_node(self, lat, lon):
+        """Return the id of the graph node closest to (lat, lon)"""
+        # Equirectangular approximation is enough to rank nearby candidates
+        dx = np.radians(self.node_lon - lon) * math.cos(math.radians(lat))
+        dy = np.radians(self.node_lat - lat)
+        return int(np.argmin(dx * dx + dy * dy))
+
+    def _heuristic(self, u, v):
+        """Lower bound on travel time (seconds) between nodes u and v"""
+        lat1, lat2 = self._lat_rad[u], self._lat_rad[v]
+        a = (math.sin((lat2 - lat1) / 2) ** 2
+             + self._cos_lat[u] * self._cos_lat[v] * math.sin((self._lon_rad[v] - self._lon_rad[u]) / 2) ** 2)
+        return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0))) / self.max_speed
+
+    def shortest_path(self, source, target):
+        """
+        Bidirectional A* between two node ids.
+
+        Both searches use the average potential p(v) = (h(v, target) - h(v, source)) / 2,
+        so they run on the same reduced graph and can stop as soon as the two
+        queue heads together reach the best meeting cost.
+
+        Returns:
+            tuple: (duration in seconds, list of node ids), or (None, None) if unreachable
+        """
+        if source == target:
+            return 0.0, [source]
+
+        potentials = {}
+
+        def potential(v):
+            if v not in potentials:
+                potentials[v] = (self._heuristic(v, target) - self._heuristic(v, source)) / 2
+            return potentials[v]
+
+        dist = ({source: 0.0}, {target: 0.0})
+        parent = ({source: None}, {target: None})
+        heaps = ([(potential(source), source)], [(-potential(target), target)])
+        graphs = (
+            (self._indptr, self._indices, self._duration, 1),
+            (self._reverse_indptr, self._reverse_indices, self._reverse_duration, -1)
+        )
+        best, meeting = math.inf, None
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+
+            # Expand the side with the smaller queue head
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            key, u = heapq.heappop(heaps[side])
+            d_u = dist[side][u]
+            sign = graphs[side][3]
+            if key > d_u + sign * potential(u) + 1e-9:
+                continue  # stale queue entry
+
+            indptr, indices, durations, _ = graphs[side]
+            other = dist[1 - side]
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                d_v = d_u + durations[k]
+                if d_v < dist[side].get(v, math.inf):
+                    dist[side][v] = d_v
+                    parent[side][v] = u
+                    heapq.heappush(heaps[side], (d_v + sign * potential(v), v))
+                    if v in other and d_v + other[v] < best:
+                        best, meeting = d_v + other[v], v
+
+        if meeting is None:
+            return None, None
+
+        # Stitch source -> meeting and meeting -> target
+        path, node = [], meeting
+        while node is not None:
+            path.append(node)
+            node = parent[0][node]
+        path.reverse()
+        node = parent[1][meeting]
+        while node is not None:
+            path.append(node)
+            node = parent[1][node]
+        return best, path
+
+    def path_distance(self, path):
+        """Total length in meters of the shortest edges along a node path"""
+        total = 0.0
+        for u, v in zip(path[:-1], path[1:]):
+            start, end = self.indptr[u], self.indptr[u + 1]
+            candidates = np.flatnonzero(self.indices[start:end] == v) + start
+            total += float(self.distance[candidates[np.argmin(self.duration[candidates])]])
+        return total
+
+    def route(self, start_lon, start_lat, end_lon, end_lat):
+        """
+        Route between two points snapped to their nearest graph nodes.
+
+        Returns: {
+            'duration': seconds (minimum 1 second to prevent division by zero),
+            'distance': meters,
+            'coordinates': [[lon,lat], ...]
+        } or None if no path exists
+        """
+        source = self.nearest_node(start_lat, start_lon)
+        target = self.nearest_node(end_lat, end_lon)
+        duration, path = self.shortest_path(source, target)
+        if path is None:
+            return None
+        return {
+            'duration': max(1, duration),  # Minimum 1 second
+            'distance': self.path_distance(path),
+            'coordinates': [[float(self.node_lon[n]), float(self.node_lat[n])] for n in path]
+        }
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.offline_router nodes.csv edges.csv saved_graph/road_graph.npz
+    if len(sys.argv) != 4:
+        print("Usage: python -m utils.offline_router <nodes.csv> <edges.csv> <output.npz>")
+        sys.exit(1)
+    save_graph(sys.argv[3], graph_from_csv(sys.argv[1], sys.argv[2]))
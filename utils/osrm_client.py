@@ -0,0 +1,301 @@
+import time
+import random
+import asyncio
+import requests
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+# Public OSRM demo server, point base_url at a local instance for bulk work
+OSRM_BASE_URL = 'http://router.project-osrm.org'
+
+# Default `--max-table-size` of osrm-routed, also enforced by the public demo server
+OSRM_MAX_TABLE_SIZE = 100
+
+# HTTP statuses worth retrying (rate limiting and server-side failures)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class OSRMError(Exception):
+    """Raised when an OSRM request still fails after all retries"""
+
+    def __init__(self, message, retryable=True):
+        """
+        Args:
+            message (str): What went wrong
+            retryable (bool): False if repeating the request cannot help, e.g. a malformed answer
+        """
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class OSRMClient:
+    """
+    OSRM HTTP client with a pooled keep-alive session, timeouts and retries.
+
+    `route` fetches a single route; `route_many` fetches thousands of
+    origin/destination pairs concurrently and returns them in input order;
+    `table` builds many-to-many duration/distance matrices.
+    """
+
+    def __init__(self, base_url=OSRM_BASE_URL, profile='driving', max_concurrency=16,
+                 timeout=10.0, max_retries=3, backoff_seconds=0.5):
+        """
+        Args:
+            base_url (str): OSRM server root, e.g. 'http://localhost:5000'
+            profile (str): Routing profile in the URL path
+            max_concurrency (int): Maximum number of requests in flight
+            timeout (float): Per-request timeout in seconds (connect and read)
+            max_retries (int): Retries after the first attempt for retryable failures
+            backoff_seconds (float): Base delay, doubled after every retry
+        """
+        self.base_url = base_url.rstrip('/')
+        self.profile = profile
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+        # One pooled session so connections are reused across requests and threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='osrm')
+
+    def route_url(self, start_lon, start_lat, end_lon, end_lat):
+        """Build the `route` service URL for one pair of [lon, lat] points"""
+        return (
+            f"{self.base_url}/route/v1/{self.profile}/"
+            f"{start_lon},{start_lat};{end_lon},{end_lat}?overview=full&geometries=geojson"
+        )
+
+    def _backoff(self, attempt):
+        """Exponential backoff with jitter for the given retry attempt"""
+        return self.backoff_seconds * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    def _request_once(self, url, timeout=None):
+        """
+        Send one request.
+
+        Args:
+            url (str): OSRM URL
+            timeout (float): Timeout in seconds, defaults to the client's
+
+        Returns:
+            tuple: (payload dict or None, OSRMError or None); the error's
+                `retryable` tells whether another attempt could succeed
+        """
+        try:
+            response = self.session.get(url, timeout=self.timeout if timeout is None else timeout)
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            return None, OSRMError(f"{type(e).__name__} from {url}: {e}")
+        except requests.RequestException as e:
+            return None, OSRMError(f"{type(e).__name__} from {url}: {e}", retryable=False)
+
+        if response.status_code in RETRY_STATUSES:
+            return None, OSRMError(f"HTTP {response.status_code} from {url}")
+        try:
+            return response.json(), None
+        except ValueError:
+            return None, OSRMError(f"Invalid JSON from {url}", retryable=False)
+
+    @staticmethod
+    def parse_route(data):
+        """
+        Convert an OSRM `route` response into the app's route dictionary.
+
+        Returns: {
+            'duration': seconds (minimum 1 second to prevent division by zero),
+            'distance': meters,
+            'coordinates': [[lon,lat], ...]
+        } or None if OSRM found no route
+        """
+        if not data or data.get('code') != 'Ok' or not data.get('routes'):
+            return None
+        route = data['routes'][0]
+        return {
+            'duration': max(1, route['duration']),  # Minimum 1 second
+            'distance': route['distance'],
+            'coordinates': route['geometry']['coordinates']
+        }
+
+    def get_json(self, url):
+        """
+        GET an OSRM URL with retries and backoff.
+
+        Raises:
+            OSRMError: If every attempt failed with a retryable error, or on the
+                first error that is not retryable.
+        """
+        for attempt in range(self.max_retries + 1):
+            data, error = self._request_once(url)
+            if error is None:
+                return data
+            if not error.retryable:
+                raise error
+            if attempt < self.max_retries:
+                time.sleep(self._backoff(attempt))
+        raise OSRMError(f"OSRM request failed after {self.max_retries + 1} attempts: {error}")
+
+    async def get_json_async(self, url, semaphore):
+        """Async version of `get_json`; backoff sleeps do not hold a concurrency slot"""
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            async with semaphore:
+                data, error = await loop.run_in_executor(self._executor, self._request_once, url)
+            if error is None:
+                return data
+            if not error.retryable:
+                raise error
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt))
+        raise OSRMError(f"OSRM request failed after {self.max_retries + 1} attempts: {error}")
+
+    def route(self, start_lon, start_lat, end_lon, end_lat):
+        """
+        Fetch a single route.
+
+        Returns:
+            dict: Route dictionary (see `parse_route`), or None if OSRM found no route
+
+        Raises:
+            OSRMError: If the server could not be reached after all retries.
+        """
+        return self.parse_route(self.get_json(self.route_url(start_lon, start_lat, end_lon, end_lat)))
+
+    async def route_many_async(self, pairs):
+        """
+        Fetch routes for many (start_lon, start_lat, end_lon, end_lat) pairs concurrently.
+
+        Returns:
+            list: Route dictionaries in input order, None where a route failed
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(pair):
+            try:
+                return self.parse_route(await self.get_json_async(self.route_url(*pair), semaphore))
+            except OSRMError:
+                return None
+
+        return await asyncio.gather(*(fetch(pair) for pair in pairs))
+
+    def route_many(self, pairs):
+        """Blocking wrapper around `route_many_async` for scripts and Streamlit threads"""
+        return asyncio.run(self.route_many_async(list(pairs)))
+
+    def table_url(self, coordinates, n_sources):
+        """Build the `table` service URL; the first `n_sources` coordinates are the sources"""
+        points = ";".join(f"{lon},{lat}" for lon, lat in coordinates)
+        sources = ";".join(str(i) for i in range(n_sources))
+        destinations = ";".join(str(i) for i in range(n_sources, len(coordinates)))
+        return (
+            f"{self.base_url}/table/v1/{self.profile}/{points}"
+            f"?sources={sources}&destinations={destinations}&annotations=duration,distance"
+        )
+
+    @staticmethod
+    def tile_sizes(n_sources, n_destinations, max_locations):
+        """Split `max_locations` between sources and destinations for one tile"""
+        half = max_locations // 2
+        if n_sources <= half:
+            return n_sources, min(n_destinations, max_locations - n_sources)
+        if n_destinations <= half:
+            return min(n_sources, max_locations - n_destinations), n_destinations
+        return half, max_locations - half
+
+    async def table_async(self, sources, destinations, max_locations=OSRM_MAX_TABLE_SIZE):
+        """
+        Fetch many-to-many durations and distances from the OSRM `table` service.
+
+        The matrix is split into tiles of at most `max_locations` coordinates
+        (sources + destinations) that are fetched concurrently.
+
+        Args:
+            sources: Sequence of [lon, lat] origins
+            destinations: Sequence of [lon, lat] destinations
+            max_locations (int): Server limit on coordinates per request
+
+        Returns:
+            tuple: (durations in seconds, distances in meters), two float arrays of
+            shape (len(sources), len(destinations)) with NaN where no route exists
+
+        Raises:
+            OSRMError: If a tile could not be fetched after all retries.
+        """
+        sources = [tuple(point) for point in sources]
+        destinations = [tuple(point) for point in destinations]
+        durations = np.full((len(sources), len(destinations)), np.nan)
+        distances = np.full((len(sources), len(destinations)), np.nan)
+        if not sources or not destinations:
+            return durations, distances
+
+        src_step, dst_step = self.tile_sizes(len(sources), len(destinations), max_locations)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(i, j):
+            src_chunk = sources[i:i + src_step]
+            dst_chunk = destinations[j:j + dst_step]
+            data = await self.get_json_async(self.table_url(src_chunk + dst_chunk, len(src_chunk)), semaphore)
+            if not data or data.get('code') != 'Ok':
+                raise OSRMError(f"OSRM table error: {data.get('code') if data else 'empty response'}")
+            # Unreachable pairs come back as null, which becomes NaN
+            durations[i:i + src_step, j:j + dst_step] = np.array(data['durations'], dtype=float)
+            distances[i:i + src_step, j:j + dst_step] = np.array(data['distances'], dtype=float)
+
+        await asyncio.gather(*(
+            fetch(i, j)
+            for i in range(0, len(sources), src_step)
+            for j in range(0, len(destinations), dst_step)
+        ))
+        return durations, distances
+
+    def table(self, sources, destinations, max_locations=OSRM_MAX_TABLE_SIZE):
+        """Blocking wrapper around `table_async`"""
+        return asyncio.run(self.table_async(sources, destinations, max_locations))
+
+    def close(self):
+        """Release pooled connections and worker threads"""
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+def enrich_routes(df, client=None):
+    """
+    Add OSRM route columns to a delivery DataFrame.
+
+    Batch replacement for the notebook's `process_routes` loop. Adds
+    'distance_osrm' (meters), 'duration_osrm' (minutes, 2 decimals) and
+    'route_coordinates_osrm' ([(lat, lon), ...]) columns; rows without a
+    route get missing values.
+
+    Args:
+        df (pd.DataFrame): Rows with restaurant and delivery latitude/longitude columns
+        client (OSRMClient): Client to use, a default one is created if omitted
+
+    Returns:
+        pd.DataFrame: Copy of `df` with the OSRM columns added
+    """
+    owns_client = client is None
+    client = client or OSRMClient()
+    try:
+        pairs = zip(
+            df['Restaurant_longitude'], df['Restaurant_latitude'],
+            df['Delivery_location_longitude'], df['Delivery_location_latitude']
+        )
+        routes = client.route_many(pairs)
+    finally:
+        if owns_client:
+            client.close()
+
+    result = df.copy()
+    result['distance_osrm'] = [r['distance'] if r else None for r in routes]
+    result['duration_osrm'] = [round(r['duration'] / 60, 2) if r else None for r in routes]
+    result['route_coordinates_osrm'] = [
+        [(lat, lon) for lon, lat in r['coordinates']] if r else None for r in routes
+    ]
+    result['distance_osrm'] = pd.to_numeric(result['distance_osrm'])
+    result['duration_osrm'] = pd.to_numeric(result['duration_osrm'])
+    return result
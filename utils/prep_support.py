@@ -1,11 +1,86 @@
 import os
-import joblib
+import hashlib
+import functools
 import requests
 import numpy as np
 import pandas as pd
 import streamlit as st
+from utils.cache_support import TwoTierCache
+from utils.osrm_client import OSRMClient, OSRMError
+from utils.route_guard import RouteGuard
+from utils.route_estimator import ROUTE_ESTIMATOR_PATH, RouteEstimator
+from utils.offline_router import OfflineRouter
+from utils import latency_metrics, model_artifact
+from utils.tree_ensemble import TreeEnsemble, compiled_model_path
 
-@st.cache_resource
+# Filename of the trained model inside saved_models/
+MODEL_FILENAME = 'XGBoost_20250508_151557.pkl'
+
+# 'compiled' predicts with the NumPy tree evaluator (see `python -m utils.tree_ensemble`),
+# 'xgboost' with the native booster; 'compiled' falls back to the booster if not compiled yet
+PREDICTION_BACKEND = os.environ.get('SMARTDELIVERY_PREDICTION_BACKEND', 'compiled')
+
+# Base URL of a running prediction service (api/prediction_api.py); unset predicts in-process
+PREDICTION_SERVICE_URL = os.environ.get('SMARTDELIVERY_PREDICTION_URL')
+PREDICTION_SERVICE_TIMEOUT = 2.0  # seconds
+
+# Prediction result cache; set SMARTDELIVERY_PREDICTION_CACHE to a SQLite file to share it between processes
+PREDICTION_CACHE_PATH = os.environ.get('SMARTDELIVERY_PREDICTION_CACHE')
+PREDICTION_CACHE_TTL_SECONDS = 24 * 3600
+PREDICTION_CACHE_MEMORY_ENTRIES = 4096
+PREDICTION_CACHE_DISK_ENTRIES = 500_000
+
+# Threads used when predicting whole batches of orders
+BATCH_PREDICT_NTHREAD = os.cpu_count() or 1
+
+# Categories used for one-hot encoding, in the order the model was trained on
+ONE_HOT_CATEGORIES = {
+    'Weather_conditions': ["Cloudy", "Fog", "Sandstorms", "Stormy", "Sunny", "Windy"],
+    'Road_traffic_density': ["High", "Jam", "Low", "Medium"],
+    'Type_of_order': ["Buffet", "Drinks", "Meal", "Snack"],
+    'Type_of_vehicle': ["bicycle", "electric_scooter", "motorcycle", "scooter"],
+    'Festival': ["No", "Unknown", "Yes"],
+    'City': ["Metropolitian", "Semi-Urban", "Urban"]
+}
+
+# Mapping days of the week to numerical values
+DAY_OF_WEEK_MAP = {
+    "Monday": 0, "Tuesday": 1, "Wednesday": 2, 
+    "Thursday": 3, "Friday": 4, "Saturday": 5, "Sunday": 6
+}
+
+# Mapping months to numerical values
+MONTH_MAP = {
+    "January": 1, "February": 2, "March": 3, "April": 4, 
+    "May": 5, "June": 6, "July": 7, "August": 8, 
+    "September": 9, "October": 10, "November": 11, "December": 12
+}
+
+# Period of each cyclical datetime feature
+CYCLICAL_PERIODS = {
+    'Order_DayOfWeek': 7,
+    'Order_Month': 12,
+    'Time_Orderd_Hour': 24,
+    'Time_Order_picked_Hour': 24
+}
+
+# OSRM route cache settings
+ROUTE_CACHE_PATH = 'saved_cache/osrm_routes.sqlite'
+ROUTE_CACHE_PRECISION = 5  # decimal places kept from each coordinate (~1 m)
+ROUTE_CACHE_TTL_SECONDS = 7 * 24 * 3600
+ROUTE_CACHE_MEMORY_ENTRIES = 1024
+ROUTE_CACHE_DISK_ENTRIES = 200_000
+
+# Optional second OSRM endpoint; slow route requests are repeated there (hedged requests)
+OSRM_HEDGE_URL = os.environ.get('SMARTDELIVERY_OSRM_HEDGE_URL')
+
+# Optional local road graph built with `python -m utils.offline_router`
+OFFLINE_GRAPH_PATH = 'saved_graph/road_graph.npz'
+
+# 'osrm' asks the OSRM server and falls back to the local graph, 'offline' uses the local graph only
+ROUTING_BACKEND = os.environ.get('SMARTDELIVERY_ROUTING_BACKEND', 'osrm')
+
+@st.cache_resource(show_spinner=False)
 def load_model(model_filename: str):
     """
     Load a model from the specified filename.
@@ -24,6 +99,9 @@ def load_model(model_filename: str):
     
     if os.path.exists(model_path):
         try:
+            # Imported here so processes predicting with the compiled trees never load joblib/xgboost
+            import joblib
+
             # Assuming the model was saved directly, not as a dictionary
             return joblib.load(model_path)
         except Exception as e:
@@ -79,22 +157,9 @@ def transform_datetime_features(df, order_day_of_week, order_month, time_ordered
     Returns:
         pd.DataFrame: Transformed dataframe with numerical datetime features
     """
-    # Mapping days of the week to numerical values
-    day_of_week_map = {
-        "Monday": 0, "Tuesday": 1, "Wednesday": 2, 
-        "Thursday": 3, "Friday": 4, "Saturday": 5, "Sunday": 6
-    }
-
-    # Mapping months to numerical values
-    month_map = {
-        "January": 1, "February": 2, "March": 3, "April": 4, 
-        "May": 5, "June": 6, "July": 7, "August": 8, 
-        "September": 9, "October": 10, "November": 11, "December": 12
-    }
-    
     # Convert to numerical values
-    order_day_numeric = day_of_week_map[order_day_of_week]
-    order_month_numeric = month_map[order_month]
+    order_day_numeric = DAY_OF_WEEK_MAP[order_day_of_week]
+    order_month_numeric = MONTH_MAP[order_month]
 
     # Add numerical features to dataframe
     df['Order_DayOfWeek'] = [float(order_day_numeric)]
@@ -160,9 +225,63 @@ def validate_and_reorder_columns(df, feature_columns_path='saved_csv/feature_col
     common_cols = [col for col in feature_columns if col in df.columns]
     return df[common_cols]
 
-def get_osrm_route_data(start_lon, start_lat, end_lon, end_lat):
+@st.cache_resource
+def get_route_cache():
+    """Return the process-wide OSRM route cache shared by all sessions"""
+    return TwoTierCache(
+        db_path=ROUTE_CACHE_PATH,
+        max_memory_entries=ROUTE_CACHE_MEMORY_ENTRIES,
+        max_disk_entries=ROUTE_CACHE_DISK_ENTRIES,
+        ttl_seconds=ROUTE_CACHE_TTL_SECONDS,
+        table_name='osrm_routes'
+    )
+
+def route_cache_key(start_lon, start_lat, end_lon, end_lat, precision=ROUTE_CACHE_PRECISION):
+    """Build a cache key from coordinates rounded to `precision` decimal places"""
+    return ";".join(
+        f"{round(float(value), precision):.{precision}f}"
+        for value in (start_lon, start_lat, end_lon, end_lat)
+    )
+
+@st.cache_resource
+def get_osrm_client():
+    """Return the process-wide pooled OSRM client"""
+    return OSRMClient()
+
+@st.cache_resource
+def get_offline_router():
+    """Load the local road graph once per process, or return None if it is not installed"""
+    if not os.path.exists(OFFLINE_GRAPH_PATH):
+        return None
+    return OfflineRouter.from_file(OFFLINE_GRAPH_PATH)
+
+@st.cache_resource
+def get_route_estimator():
+    """Load the fitted straight-line route estimator once per process, or its uncalibrated defaults"""
+    return RouteEstimator.load(ROUTE_ESTIMATOR_PATH)
+
+def fallback_route_data(start_lon, start_lat, end_lon, end_lat, city=None, road_traffic_density=None):
+    """
+    Route used when OSRM cannot answer in time: the local road graph if one is
+    installed, otherwise the calibrated straight-line estimate for the city
+    type and traffic level (flagged 'estimated': True).
+    """
+    router = get_offline_router()
+    if router is not None:
+        route_data = router.route(start_lon, start_lat, end_lon, end_lat)
+        if route_data is not None:
+            return route_data
+    return get_route_estimator().route(start_lon, start_lat, end_lon, end_lat, city, road_traffic_density)
+
+@st.cache_resource
+def get_route_guard():
+    """Return the process-wide guarded route lookup (time budget, retries, circuit breaker, hedging)"""
+    hedge = OSRMClient(OSRM_HEDGE_URL) if OSRM_HEDGE_URL else None
+    return RouteGuard(get_osrm_client(), hedge=hedge, fallback=fallback_route_data)
+
+def fetch_osrm_route_data(start_lon, start_lat, end_lon, end_lat):
     """
-    Get complete route data from OSRM in one API call
+    Get complete route data from OSRM in one API call, within the route guard's time budget
     Returns: {
         'duration': seconds (minimum 1 second to prevent division by zero),
         'distance': meters,
@@ -170,34 +289,245 @@ def get_osrm_route_data(start_lon, start_lat, end_lon, end_lat):
     }
     """
     try:
-        url = f"http://router.project-osrm.org/route/v1/driving/{start_lon},{start_lat};{end_lon},{end_lat}?overview=full&geometries=geojson"
-        response = requests.get(url)
-        data = response.json()
-        
-        if response.status_code == 200 and data.get('code') == 'Ok':
-            route = data['routes'][0]
-            # Ensure duration is never zero by using max(1, duration)
-            return {
-                'duration': max(1, route['duration']),  # Minimum 1 second
-                'distance': route['distance'],
-                'coordinates': route['geometry']['coordinates']
-            }
-        return None
-    except Exception as e:
+        return get_route_guard().fetch(start_lon, start_lat, end_lon, end_lat)[0]
+    except OSRMError as e:
         st.error(f"OSRM API Error: {str(e)}")
         return None
 
-def make_prediction(processed_input):
-    # Model Path
-    model_filename = 'XGBoost_20250508_151557.pkl'
+@latency_metrics.timed('get_osrm_route_data')
+def get_osrm_route_data(start_lon, start_lat, end_lon, end_lat, city=None, road_traffic_density=None):
+    """
+    Get route data for a pair of locations, served from the route cache when possible.
+
+    Coordinates are rounded to ROUTE_CACHE_PRECISION decimal places to build the
+    cache key; only OSRM responses are cached. Lookups go through the route
+    guard, so they never take longer than its time budget; when OSRM fails or
+    its circuit breaker is open, the answer comes from `fallback_route_data`
+    for the given city type and traffic level and carries 'fallback': True.
+    With ROUTING_BACKEND 'offline' the local road graph answers directly.
+
+    Returns: Same dictionary as `fetch_osrm_route_data`, or None if no route exists
+    """
+    if ROUTING_BACKEND == 'offline' and get_offline_router() is not None:
+        return get_offline_router().route(start_lon, start_lat, end_lon, end_lat)
+
+    cache = get_route_cache()
+    key = route_cache_key(start_lon, start_lat, end_lon, end_lat)
 
-    # Loading the model using joblib
-    model = load_model(model_filename)
+    route_data = cache.get(key)
+    if route_data is not None:
+        return route_data
 
+    fallback = functools.partial(fallback_route_data, city=city, road_traffic_density=road_traffic_density)
+    route_data = get_route_guard().route(start_lon, start_lat, end_lon, end_lat, fallback=fallback)
+    if route_data is not None and not route_data.get('fallback'):
+        cache.set(key, route_data)
+    return route_data
+
+@latency_metrics.timed('get_route_data_many')
+def get_route_data_many(pairs, cities=None, road_traffic_densities=None):
+    """
+    Bulk version of `get_osrm_route_data` for many (start_lon, start_lat, end_lon, end_lat) pairs.
+
+    Cached routes are served from the route cache and the distinct misses are
+    fetched concurrently with `OSRMClient.route_many`, unless the route
+    guard's circuit breaker is open. Pairs OSRM does not answer come from
+    `fallback_route_data` for their city type and traffic level and carry
+    'fallback': True.
+
+    Returns:
+        list: Route dictionaries in input order, None where no route exists
+    """
+    pairs = [tuple(pair) for pair in pairs]
+    cities = cities if cities is not None else [None] * len(pairs)
+    road_traffic_densities = road_traffic_densities if road_traffic_densities is not None else [None] * len(pairs)
+
+    if ROUTING_BACKEND == 'offline' and get_offline_router() is not None:
+        return [get_offline_router().route(*pair) for pair in pairs]
+
+    cache = get_route_cache()
+    keys = [route_cache_key(*pair) for pair in pairs]
+    routes = [cache.get(key) for key in keys]
+
+    # One request per distinct pair
+    missing = {}
+    for i, key in enumerate(keys):
+        if routes[i] is None:
+            missing.setdefault(key, []).append(i)
+
+    breaker = get_route_guard().breaker
+    if missing and breaker.allow():
+        try:
+            fetched = get_osrm_client().route_many([pairs[indices[0]] for indices in missing.values()])
+        except Exception:
+            # Also report unexpected errors to the breaker, which may be waiting for this probe
+            fetched = [None] * len(missing)
+        if any(route_data is not None for route_data in fetched):
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        for (key, indices), route_data in zip(missing.items(), fetched):
+            if route_data is not None:
+                cache.set(key, route_data)
+                for i in indices:
+                    routes[i] = route_data
+
+    for indices in missing.values():
+        for i in indices:
+            if routes[i] is None:
+                route_data = fallback_route_data(*pairs[i], cities[i], road_traffic_densities[i])
+                routes[i] = None if route_data is None else {**route_data, 'fallback': True}
+    return routes
+
+@st.cache_resource(show_spinner=False)
+def load_booster(model_filename: str = MODEL_FILENAME, nthread: int = model_artifact.PREDICT_NTHREAD):
+    """
+    Load the native XGBoost booster exported from a pickled model.
+
+    Falls back to the booster inside the pickled model when no native export
+    exists yet (see `python -m utils.model_artifact`).
+
+    Args:
+        model_filename (str): Filename of the pickled model inside saved_models/
+        nthread (int): Threads used by each prediction
+
+    Returns:
+        xgboost.Booster: The loaded booster
+    """
+    path = model_artifact.native_model_path(model_filename)
+    if os.path.exists(path):
+        return model_artifact.load_booster(path, nthread)
+
+    booster = load_model(model_filename).get_booster().copy()
+    booster.set_param({'nthread': nthread})
+    return booster
+
+@st.cache_resource(show_spinner=False)
+def load_tree_ensemble(model_filename: str = MODEL_FILENAME):
+    """
+    Load the compiled tree arrays of a model, or None if it has not been compiled.
+
+    Args:
+        model_filename (str): Filename of the pickled model inside saved_models/
+
+    Returns:
+        TreeEnsemble or None: The NumPy evaluator
+    """
+    path = compiled_model_path(model_filename)
+    if not os.path.exists(path):
+        return None
+    return TreeEnsemble.from_file(path)
+
+def get_predictor(nthread: int = model_artifact.PREDICT_NTHREAD):
+    """
+    Return a function mapping a float32 feature matrix to predictions.
+
+    Uses the compiled NumPy evaluator unless PREDICTION_BACKEND is 'xgboost'
+    or the model has not been compiled, then the native booster.
+    """
+    if PREDICTION_BACKEND == 'compiled':
+        ensemble = load_tree_ensemble()
+        if ensemble is not None:
+            return ensemble.predict
+    return load_booster(nthread=nthread).inplace_predict
+
+def predictor_model_path(model_filename: str = MODEL_FILENAME):
+    """Path of the model file `get_predictor` predicts with: the compiled .npz, the native .ubj or the pickle"""
+    if PREDICTION_BACKEND == 'compiled' and os.path.exists(compiled_model_path(model_filename)):
+        return compiled_model_path(model_filename)
+    if os.path.exists(model_artifact.native_model_path(model_filename)):
+        return model_artifact.native_model_path(model_filename)
+    return f'saved_models/{model_filename}'
+
+@st.cache_resource(show_spinner=False)
+def get_model_version(model_filename: str = MODEL_FILENAME):
+    """
+    Short content digest of the model file predictions come from, so cached
+    predictions never outlive the model (or backend) that produced them.
+    """
+    path = predictor_model_path(model_filename)
+    digest = hashlib.sha256(os.path.basename(path).encode())
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+@st.cache_resource(show_spinner=False)
+def get_prediction_cache():
+    """Return the process-wide prediction result cache (memory only unless PREDICTION_CACHE_PATH is set)"""
+    return TwoTierCache(
+        db_path=PREDICTION_CACHE_PATH,
+        max_memory_entries=PREDICTION_CACHE_MEMORY_ENTRIES,
+        max_disk_entries=PREDICTION_CACHE_DISK_ENTRIES,
+        ttl_seconds=PREDICTION_CACHE_TTL_SECONDS,
+        table_name='predictions'
+    )
+
+def prediction_cache_key(processed_input):
+    """
+    Stable key of an encoded order: model version plus a digest of the float32 feature bytes.
+
+    Unlike the built-in `hash()`, the key is the same in every process and
+    after restarts, so it can address a shared cache.
+    """
+    row = np.ascontiguousarray(processed_input, dtype=np.float32).reshape(-1)
+    return f"{get_model_version()}:{hashlib.blake2b(row.tobytes(), digest_size=16).hexdigest()}"
+
+@latency_metrics.timed('make_prediction')
+def make_prediction(processed_input):
     # Reshape input for prediction
-    input_array = np.array(processed_input).reshape(1, -1)
+    input_array = np.asarray(processed_input, dtype=np.float32).reshape(1, -1)
 
-    # Make prediction
-    prediction = model.predict(input_array)
+    # Identical orders are answered from the result cache
+    cache = get_prediction_cache()
+    key = prediction_cache_key(input_array)
+    cached = cache.get(key)
+    if cached is not None:
+        return np.array([cached], dtype=np.float32)
+
+    # Predict straight from the NumPy buffer, without building a DMatrix
+    with latency_metrics.timer('model_inference'):
+        prediction = get_predictor()(input_array)
+    cache.set(key, float(prediction[0]))
     
-    return prediction
\ No newline at end of file
+    return prediction
+
+@latency_metrics.timed('make_batch_prediction')
+def make_batch_prediction(processed_input):
+    """
+    Predict delivery times for a batch of encoded orders.
+
+    Args:
+        processed_input: Feature matrix from `batch_preparation.batch_data_prep`
+
+    Returns:
+        np.ndarray: One predicted delivery time (minutes) per row
+    """
+    predict = get_predictor(nthread=BATCH_PREDICT_NTHREAD)
+
+    # Keep rows intact, one prediction per order
+    input_array = np.asarray(processed_input, dtype=np.float32).reshape(len(processed_input), -1)
+
+    return predict(input_array)
+
+def request_prediction(order, base_url=None):
+    """
+    Predict one raw order through the prediction service.
+
+    Args:
+        order (dict): Raw order, as accepted by `feature_schema.FeatureSchema.encode`
+        base_url (str): Service URL, defaults to PREDICTION_SERVICE_URL
+
+    Returns:
+        np.ndarray: The predicted delivery time (minutes), shaped like `make_prediction`'s output
+
+    Raises:
+        requests.RequestException: If the service is unreachable or rejects the order.
+    """
+    response = requests.post(
+        f"{(base_url or PREDICTION_SERVICE_URL).rstrip('/')}/predict",
+        json=order,
+        timeout=PREDICTION_SERVICE_TIMEOUT
+    )
+    response.raise_for_status()
+    return np.array([response.json()['prediction']], dtype=np.float32)
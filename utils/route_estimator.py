@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+from utils.offline_router import haversine_m
+
+ROUTE_ESTIMATOR_VERSION = 1
+
+# Fitted estimator written by `python -m utils.route_estimator saved_csv/charts.csv`
+ROUTE_ESTIMATOR_PATH = 'saved_models/route_estimator.json'
+
+# City types and traffic levels the estimator is calibrated for, as labelled in the training data
+CITY_TYPES = ["Metropolitian", "Semi-Urban", "Urban"]
+TRAFFIC_LEVELS = ["High", "Jam", "Low", "Medium"]
+
+# Spellings used by the app's inputs for the training data's labels
+CITY_ALIASES = {'Metropolitan': 'Metropolitian'}
+
+# Used until an estimator is fitted: median road/straight-line ratio of the
+# routes in saved_csv/route_prod.csv, and the ratio of the median OSRM
+# distance (12.1 km) to the median OSRM duration (14.5 min) of the training data
+DEFAULT_DETOUR_FACTOR = 1.36
+DEFAULT_SPEED_KMH = 50.0
+
+# Fewest usable rows for a city/traffic cell to get its own coefficients
+MIN_GROUP_ROWS = 30
+
+# Rows outside these bounds (bad geocodes, zero-length trips) are ignored when fitting
+MIN_STRAIGHT_LINE_KM = 0.2
+DETOUR_BOUNDS = (1.0, 4.0)
+SPEED_BOUNDS_KMH = (5.0, 120.0)
+
+# Columns read from the training data (charts.csv)
+FIT_COLUMNS = [
+    'Restaurant_latitude', 'Restaurant_longitude',
+    'Delivery_location_latitude', 'Delivery_location_longitude',
+    'City', 'Road_traffic_density', 'distance_osrm_km', 'duration_osrm'
+]
+
+
+def category_codes(values, categories, aliases=None):
+    """
+    Index of each value in `categories`, -1 for unknown values; scalars give a scalar.
+
+    Labels are matched with one vectorized comparison per category, which is
+    faster than hashing every string for the few categories used here.
+    `aliases` maps other spellings to a category.
+    """
+    aliases = aliases or {}
+    if isinstance(values, str) or values is None:
+        values = aliases.get(values, values)
+        return categories.index(values) if values in categories else -1
+    if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+        values = values.astype(object)
+    values = np.asarray(values, dtype=object)
+    codes = np.full(values.shape, -1, dtype=np.int8)
+    for code, category in enumerate(categories):
+        codes[values == category] = code
+    for alias, category in aliases.items():
+        codes[values == alias] = categories.index(category)
+    return codes
+
+
+class RouteEstimator:
+    """
+    Road distance and OSRM-like duration from the straight-line distance.
+
+    The estimate is `haversine * detour_factor` meters, driven at `speed_kmh`,
+    with both coefficients looked up per city type and traffic level. The
+    coefficient tables have one extra row and column holding the values
+    pooled over all city types or traffic levels, which are used for unknown
+    or missing labels (index -1). Every operation works on whole arrays, so
+    batches of pairs cost a handful of NumPy calls.
+    """
+
+    def __init__(self, detour_factor, speed_kmh, group_rows=None):
+        """
+        Args:
+            detour_factor: (len(CITY_TYPES) + 1, len(TRAFFIC_LEVELS) + 1) road/straight-line ratios
+            speed_kmh: Average OSRM speeds in the same layout
+            group_rows: Optional number of training rows behind each cell
+        """
+        self.detour_factor = np.asarray(detour_factor, dtype=float)
+        self.speed_kmh = np.asarray(speed_kmh, dtype=float)
+        shape = (len(CITY_TYPES) + 1, len(TRAFFIC_LEVELS) + 1)
+        if self.detour_factor.shape != shape or self.speed_kmh.shape != shape:
+            raise ValueError(f"Coefficient tables must have shape {shape}")
+        self.group_rows = None if group_rows is None else np.asarray(group_rows, dtype=np.int64)
+
+    @classmethod
+    def default(cls):
+        """Estimator with the same DEFAULT_DETOUR_FACTOR and DEFAULT_SPEED_KMH everywhere"""
+        shape = (len(CITY_TYPES) + 1, len(TRAFFIC_LEVELS) + 1)
+        return cls(np.full(shape, DEFAULT_DETOUR_FACTOR), np.full(shape, DEFAULT_SPEED_KMH))
+
+    @classmethod
+    def fit(cls, df, min_group_rows=MIN_GROUP_ROWS):
+        """
+        Fit detour factors and speeds from historical OSRM routes.
+
+        Each coefficient is the median over the usable rows of its cell. Cells
+        with fewer than `min_group_rows` rows take the value pooled over city
+        types for their traffic level, or the overall value.
+
+        Args:
+            df (pd.DataFrame): Deliveries with the FIT_COLUMNS, e.g. saved_csv/charts.csv
+
+        Raises:
+            ValueError: If columns are missing or no row is usable.
+        """
+        missing_cols = [col for col in FIT_COLUMNS if col not in df.columns]
+        if missing_cols:
+            raise ValueError(f"Missing columns: {missing_cols}")
+
+        straight_km = haversine_m(
+            df['Restaurant_latitude'], df['Restaurant_longitude'],
+            df['Delivery_location_latitude'], df['Delivery_location_longitude']
+        ) / 1000
+        road_km = df['distance_osrm_km'].to_numpy(dtype=float)
+        hours = df['duration_osrm'].to_numpy(dtype=float) / 60
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rows = pd.DataFrame({
+                'city': category_codes(df['City'], CITY_TYPES, CITY_ALIASES),
+                'traffic': category_codes(df['Road_traffic_density'], TRAFFIC_LEVELS),
+                'detour': road_km / straight_km,
+                'speed': road_km / hours
+            })
+        usable = (
+            (straight_km >= MIN_STRAIGHT_LINE_KM)
+            & rows['detour'].between(*DETOUR_BOUNDS)
+            & rows['speed'].between(*SPEED_BOUNDS_KMH)
+        )
+        rows = rows[usable.to_numpy()]
+        if rows.empty:
+            raise ValueError("No usable rows to fit the route estimator")
+
+        shape = (len(CITY_TYPES) + 1, len(TRAFFIC_LEVELS) + 1)
+        detour = np.full(shape, rows['detour'].median())
+        speed = np.full(shape, rows['speed'].median())
+        counts = np.zeros(shape, dtype=np.int64)
+        counts[-1, -1] = len(rows)
+
+        # Traffic levels pooled over city types first, so sparse cells can fall back to them
+        by_traffic = rows[rows['traffic'] >= 0].groupby('traffic')
+        by_cell = rows[(rows['city'] >= 0) & (rows['traffic'] >= 0)].groupby(['city', 'traffic'])
+        by_city = rows[rows['city'] >= 0].groupby('city')
+        for groups, index in ((by_traffic, lambda key: (-1, key)),
+                              (by_city, lambda key: (key, -1)),
+                              (by_cell, lambda key: key)):
+            stats = groups.agg(n=('detour', 'size'), detour=('detour', 'median'), speed=('speed', 'median'))
+            for key, group in stats.iterrows():
+                if group['n'] >= min_group_rows:
+                    cell = index(key)
+                    detour[cell], speed[cell], counts[cell] = group['detour'], group['speed'], group['n']
+
+        # Sparse cells: use the traffic level's pooled value
+        for city in range(len(CITY_TYPES)):
+            for traffic in range(len(TRAFFIC_LEVELS)):
+                if counts[city, traffic] == 0:
+                    detour[city, traffic], speed[city, traffic] = detour[-1, traffic], speed[-1, traffic]
+        return cls(detour, speed, counts)
+
+    @classmethod
+    def from_file(cls, path=ROUTE_ESTIMATOR_PATH):
+        """
+        Load an estimator written by `save`.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file was written by another format version.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No route estimator found at {path}")
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != ROUTE_ESTIMATOR_VERSION:
+            raise ValueError(f"Unsupported route estimator version {data.get('version')} in {path}")
+        return cls(data['detour_factor'], data['speed_kmh'], data.get('group_rows'))
+
+    @classmethod
+    def load(cls, path=ROUTE_ESTIMATOR_PATH):
+        """Fitted estimator saved at `path`, or the uncalibrated defaults if there is none"""
+        if os.path.exists(path):
+            return cls.from_file(path)
+        return cls.default()
+
+    def save(self, path=ROUTE_ESTIMATOR_PATH):
+        """Write the coefficient tables to a JSON file"""
+        with open(path, 'w') as f:
+            json.dump({
+                'version': ROUTE_ESTIMATOR_VERSION,
+                'city_types': CITY_TYPES,
+                'traffic_levels': TRAFFIC_LEVELS,
+                'detour_factor': np.round(self.detour_factor, 4).tolist(),
+                'speed_kmh': np.round(self.speed_kmh, 3).tolist(),
+                'group_rows': None if self.group_rows is None else self.group_rows.tolist()
+            }, f, indent=1)
+
+    def estimate(self, start_lon, start_lat, end_lon, end_lat, city=None, road_traffic_density=None):
+        """
+        Estimate OSRM distance and duration, element-wise over scalars or arrays.
+
+        Args:
+            start_lon, start_lat, end_lon, end_lat: Coordinates in degrees
+            city: City type label(s); unknown or None uses the pooled coefficients
+            road_traffic_density: Traffic level label(s), likewise
+
+        Returns:
+            dict: 'duration' in seconds (minimum 1 second, like OSRM routes) and
+                'distance' in meters, as floats for scalar input or arrays
+        """
+        cell = (category_codes(city, CITY_TYPES, CITY_ALIASES), category_codes(road_traffic_density, TRAFFIC_LEVELS))
+
+        distance = haversine_m(start_lat, start_lon, end_lat, end_lon) * self.detour_factor[cell]
+        duration = np.maximum(1, distance / (self.speed_kmh[cell] / 3.6))
+        if np.ndim(distance) == 0:
+            return {'duration': float(duration), 'distance': float(distance)}
+        return {'duration': duration, 'distance': distance}
+
+    def route(self, start_lon, start_lat, end_lon, end_lat, city=None, road_traffic_density=None):
+        """
+        Single estimated route, shaped like `OSRMClient.parse_route`.
+
+        Returns: Route dictionary with a straight two-point geometry and 'estimated': True
+        """
+        estimate = self.estimate(start_lon, start_lat, end_lon, end_lat, city, road_traffic_density)
+        return {
+            'duration': estimate['duration'],
+            'distance': estimate['distance'],
+            'coordinates': [[start_lon, start_lat], [end_lon, end_lat]],
+            'estimated': True
+        }
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.route_estimator saved_csv/charts.csv [output.json]
+    source = sys.argv[1] if len(sys.argv) > 1 else 'saved_csv/charts.csv'
+    output = sys.argv[2] if len(sys.argv) > 2 else ROUTE_ESTIMATOR_PATH
+
+    data = pd.read_csv(source, usecols=FIT_COLUMNS)
+    estimator = RouteEstimator.fit(data)
+    estimator.save(output)
+
+    # Median absolute error of the estimated durations against the stored OSRM durations
+    estimate = estimator.estimate(
+        data['Restaurant_longitude'], data['Restaurant_latitude'],
+        data['Delivery_location_longitude'], data['Delivery_location_latitude'],
+        data['City'], data['Road_traffic_density']
+    )
+    errors = np.abs(estimate['duration'] / 60 - data['duration_osrm'].to_numpy(dtype=float))
+    print(f"Fitted on {estimator.group_rows[-1, -1]} of {len(data)} rows, "
+          f"median duration error {np.nanmedian(errors):.2f} min")
+    print(f"Wrote {output}")
@@ -0,0 +1,251 @@
+import time
+import random
+import threading
+import collections
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import numpy as np
+from utils.osrm_client import OSRMError
+from utils.route_estimator import RouteEstimator
+
+# End-to-end time a route lookup may take, retries and hedging included
+ROUTE_BUDGET_SECONDS = 3.0
+
+# Attempts after the first one, while budget remains
+ROUTE_MAX_RETRIES = 2
+ROUTE_BACKOFF_SECONDS = 0.1
+
+# Send the same request to the hedge endpoint if the primary has not answered by then
+HEDGE_DELAY_SECONDS = 0.3
+
+# Circuit breaker: open after this many failed lookups in a row, probe again after the cooldown
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30.0
+
+# Recent lookups and state changes kept for statistics
+HISTORY_SIZE = 1000
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker over consecutive failures.
+
+    'closed' lets every call through. After `failure_threshold` failures in a
+    row it turns 'open' and rejects calls until `reset_seconds` have passed;
+    then it turns 'half_open' and lets a single probe through, which closes
+    the breaker on success or opens it again on failure.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.transitions = collections.deque(maxlen=HISTORY_SIZE)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.transitions.append({'time': time.time(), 'from': self.state, 'to': state})
+            self.state = state
+
+    def allow(self):
+        """Return True if a call may go through now"""
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self._set_state('half_open')
+            if self.state == 'closed':
+                return True
+            if self.state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._set_state('closed')
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state('open')
+
+
+class RouteGuard:
+    """
+    Route lookups with a latency budget, retries, a circuit breaker and hedging.
+
+    Every lookup must finish within `budget_seconds`: each attempt gets the
+    remaining budget as its timeout and retries back off with jitter only
+    while budget remains. If a `hedge` client is given and the primary has
+    not answered after `hedge_delay`, the same request goes to the hedge
+    endpoint too and the first good answer wins. Failed lookups feed the
+    circuit breaker; while it is open, lookups go straight to `fallback`.
+    Latencies, outcomes and breaker state changes are recorded for `stats`.
+    """
+
+    def __init__(self, primary, hedge=None, fallback=None, budget_seconds=ROUTE_BUDGET_SECONDS,
+                 max_retries=ROUTE_MAX_RETRIES, backoff_seconds=ROUTE_BACKOFF_SECONDS,
+                 hedge_delay=HEDGE_DELAY_SECONDS, breaker=None):
+        """
+        Args:
+            primary (OSRMClient): Client of the main OSRM endpoint
+            hedge (OSRMClient): Optional client of a second endpoint for hedged requests
+            fallback: Function (start_lon, start_lat, end_lon, end_lat) -> route dict or None,
+                used when the lookup fails or the breaker is open; defaults to the
+                saved `RouteEstimator`'s `route`
+            budget_seconds (float): End-to-end time limit of one lookup
+            max_retries (int): Attempts after the first one
+            backoff_seconds (float): Base retry delay, doubled after every retry
+            hedge_delay (float): Seconds to wait for the primary before hedging
+            breaker (CircuitBreaker): Breaker to use, a default one is created if omitted
+        """
+        self.primary = primary
+        self.hedge = hedge
+        self.fallback = fallback or RouteEstimator.load().route
+        self.budget_seconds = budget_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.hedge_delay = hedge_delay
+        self.breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='route-guard')
+
+        self._lock = threading.Lock()
+        self._counters = collections.Counter()
+        self._latencies = collections.deque(maxlen=HISTORY_SIZE)
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def _attempt(self, pair, timeout):
+        """
+        One attempt, hedged if configured.
+
+        Returns:
+            tuple: (OSRM payload, 'primary' or 'hedge') from the first good answer
+
+        Raises:
+            OSRMError: If no endpoint answered usefully within `timeout`.
+        """
+        deadline = time.monotonic() + timeout
+        futures = {self._executor.submit(self.primary._request_once, self.primary.route_url(*pair), timeout): 'primary'}
+
+        if self.hedge is not None:
+            done, _ = wait(futures, timeout=min(self.hedge_delay, timeout))
+            primary_ok = done and next(iter(done)).result()[1] is None
+            if not primary_ok:
+                self._count('hedged')
+                remaining = max(deadline - time.monotonic(), 0.001)
+                futures[self._executor.submit(self.hedge._request_once, self.hedge.route_url(*pair), remaining)] = 'hedge'
+
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                data, error = future.result()
+                if error is None:
+                    return data, futures[future]
+        raise OSRMError(
+            f"No OSRM answer within {timeout:.2f} s: {error or 'timed out'}",
+            retryable=error is None or error.retryable
+        )
+
+    def fetch(self, start_lon, start_lat, end_lon, end_lat):
+        """
+        Look the route up within the latency budget, without fallback or breaker.
+
+        Returns:
+            tuple: (route dict or None if OSRM found no route, 'primary' or 'hedge')
+
+        Raises:
+            OSRMError: If every attempt failed or the budget ran out.
+        """
+        pair = (start_lon, start_lat, end_lon, end_lat)
+        deadline = time.monotonic() + self.budget_seconds
+        error = None
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if attempt:
+                self._count('retries')
+            try:
+                data, source = self._attempt(pair, remaining)
+                return self.primary.parse_route(data), source
+            except OSRMError as e:
+                error = e
+                if not e.retryable:
+                    break
+            backoff = self.backoff_seconds * (2 ** attempt) * (0.5 + random.random() / 2)
+            if attempt < self.max_retries and deadline - time.monotonic() > backoff:
+                time.sleep(backoff)
+        raise OSRMError(f"Route lookup failed within {self.budget_seconds:.1f} s budget: {error}")
+
+    def route(self, start_lon, start_lat, end_lon, end_lat, fallback=None):
+        """
+        Route between two points, falling back when OSRM is slow or down.
+
+        Args:
+            fallback: Optional function replacing the guard's `fallback` for this lookup
+
+        Returns: Route dictionary (see `OSRMClient.parse_route`); answers from
+            the fallback carry 'fallback': True. None if neither OSRM nor the
+            fallback has a route.
+        """
+        start = time.perf_counter()
+        if not self.breaker.allow():
+            outcome, route_data = 'short_circuit', None
+        else:
+            try:
+                route_data, outcome = self.fetch(start_lon, start_lat, end_lon, end_lat)
+                self.breaker.record_success()
+            except Exception:
+                # Any error, e.g. a malformed answer, is a failed lookup; the breaker
+                # must hear about it or a half-open probe would never finish
+                outcome, route_data = 'failure', None
+                self.breaker.record_failure()
+
+        if outcome in ('short_circuit', 'failure'):
+            route_data = (fallback or self.fallback)(start_lon, start_lat, end_lon, end_lat)
+            if route_data is not None:
+                route_data = {**route_data, 'fallback': True}
+
+        latency = time.perf_counter() - start
+        with self._lock:
+            self._counters[outcome] += 1
+            self._latencies.append(latency)
+        return route_data
+
+    def stats(self):
+        """
+        Lookup statistics.
+
+        Returns:
+            dict: Outcome counts ('primary', 'hedge', 'failure', 'short_circuit'),
+                'retries', 'hedged', latency percentiles over the last HISTORY_SIZE
+                lookups, the breaker 'state' and its recent 'transitions'
+        """
+        with self._lock:
+            latencies = np.array(self._latencies) * 1e3
+            stats = {
+                name: self._counters[name]
+                for name in ('primary', 'hedge', 'failure', 'short_circuit', 'retries', 'hedged')
+            }
+        stats.update({
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            'latency_p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            'latency_max_ms': float(latencies.max()) if len(latencies) else 0.0,
+            'state': self.breaker.state,
+            'transitions': list(self.breaker.transitions)
+        })
+        return stats
@@ -0,0 +1,155 @@
+import numpy as np
+
+# Grid cell size in degrees (~11 km), a few typical delivery routes per cell
+CELL_SIZE = 0.1
+
+# Default cap on routes returned per map tile
+MAX_ROUTES_PER_TILE = 25
+
+
+def route_bounding_boxes(coords, offsets):
+    """
+    Bounding box of every route in a flat coordinates/offsets pair.
+
+    Returns:
+        np.ndarray: (n, 4) [min_lat, min_lon, max_lat, max_lon], NaN for empty routes
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    boxes = np.full((len(offsets) - 1, 4), np.nan)
+
+    # Empty routes have no vertices, so consecutive non-empty routes tile coords exactly
+    non_empty = np.flatnonzero(np.diff(offsets) > 0)
+    if len(non_empty):
+        boxes[non_empty, :2] = np.minimum.reduceat(coords, offsets[non_empty])
+        boxes[non_empty, 2:] = np.maximum.reduceat(coords, offsets[non_empty])
+    return boxes
+
+
+def tile_xy(lat, lon, zoom):
+    """Web Mercator (slippy map) tile coordinates of points at a zoom level"""
+    n = 2 ** int(zoom)
+    lat = np.radians(np.clip(lat, -85.05112878, 85.05112878))
+    x = np.floor((np.asarray(lon) + 180.0) / 360.0 * n).astype(np.int64)
+    y = np.floor((1.0 - np.arcsinh(np.tan(lat)) / np.pi) / 2.0 * n).astype(np.int64)
+    return np.clip(x, 0, n - 1), np.clip(y, 0, n - 1)
+
+
+class RouteIndex:
+    """
+    Uniform grid index over route bounding boxes.
+
+    Every route is registered in each grid cell its bounding box touches, and
+    the cell -> routes lists are stored as sorted CSR arrays. A viewport query
+    only touches the cells inside the view, then keeps routes whose box really
+    intersects it, capped per map tile so dense areas cannot flood the map.
+    """
+
+    def __init__(self, coords, offsets, cell_size=CELL_SIZE):
+        """
+        Args:
+            coords: (N, 2) [lat, lon] vertices of all routes
+            offsets: Route i spans coords[offsets[i]:offsets[i + 1]]
+            cell_size (float): Grid cell size in degrees
+        """
+        self.cell_size = cell_size
+        self.boxes = route_bounding_boxes(coords, offsets)
+        valid = np.flatnonzero(~np.isnan(self.boxes[:, 0]))
+        self.centers = np.column_stack([
+            (self.boxes[:, 0] + self.boxes[:, 2]) / 2,
+            (self.boxes[:, 1] + self.boxes[:, 3]) / 2
+        ])
+
+        if len(valid) == 0:
+            self.origin = np.zeros(2)
+            self.shape = (0, 0)
+            self.cell_keys = np.empty(0, dtype=np.int64)
+            self.cell_ptr = np.zeros(1, dtype=np.int64)
+            self.cell_routes = np.empty(0, dtype=np.int64)
+            return
+
+        # Grid covering the extent of all routes
+        self.origin = np.array([self.boxes[valid, 0].min(), self.boxes[valid, 1].min()])
+        lat0, lon0, lat1, lon1 = self._cells(self.boxes[valid])
+        self.shape = (int(lat1.max()) + 1, int(lon1.max()) + 1)
+
+        # One (cell, route) pair for every cell a route's box covers
+        rows = lat1 - lat0 + 1
+        cols = lon1 - lon0 + 1
+        counts = rows * cols
+        route = np.repeat(valid, counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cell_lat = np.repeat(lat0, counts) + k // np.repeat(cols, counts)
+        cell_lon = np.repeat(lon0, counts) + k % np.repeat(cols, counts)
+        keys = cell_lat * self.shape[1] + cell_lon
+
+        order = np.lexsort((route, keys))
+        keys, self.cell_routes = keys[order], route[order]
+        self.cell_keys, first = np.unique(keys, return_index=True)
+        self.cell_ptr = np.append(first, len(keys)).astype(np.int64)
+
+    @classmethod
+    def from_store(cls, store, cell_size=CELL_SIZE):
+        """Build an index over a `route_store.RouteStore`"""
+        return cls(store.coords, store.offsets, cell_size)
+
+    def _cells(self, boxes):
+        """Grid cell ranges (lat0, lon0, lat1, lon1) covered by [min_lat, min_lon, max_lat, max_lon] boxes"""
+        lat0 = np.floor((boxes[:, 0] - self.origin[0]) / self.cell_size).astype(np.int64)
+        lon0 = np.floor((boxes[:, 1] - self.origin[1]) / self.cell_size).astype(np.int64)
+        lat1 = np.floor((boxes[:, 2] - self.origin[0]) / self.cell_size).astype(np.int64)
+        lon1 = np.floor((boxes[:, 3] - self.origin[1]) / self.cell_size).astype(np.int64)
+        return lat0, lon0, lat1, lon1
+
+    def candidates(self, south, west, north, east):
+        """Ids of routes registered in any grid cell overlapping the view"""
+        if self.shape == (0, 0):
+            return np.empty(0, dtype=np.int64)
+        lat0, lon0, lat1, lon1 = (value[0] for value in self._cells(np.array([[south, west, north, east]])))
+        lat0, lon0 = max(lat0, 0), max(lon0, 0)
+        lat1, lon1 = min(lat1, self.shape[0] - 1), min(lon1, self.shape[1] - 1)
+        if lat0 > lat1 or lon0 > lon1:
+            return np.empty(0, dtype=np.int64)
+
+        # Each grid row is a contiguous key range, so one searchsorted per row
+        row_start = np.arange(lat0, lat1 + 1) * self.shape[1]
+        first = np.searchsorted(self.cell_keys, row_start + lon0, side='left')
+        last = np.searchsorted(self.cell_keys, row_start + lon1, side='right')
+        # Wide views touch more cell entries than there are routes; a full scan is cheaper then
+        if (self.cell_ptr[last] - self.cell_ptr[first]).sum() > len(self.boxes):
+            return np.flatnonzero(~np.isnan(self.boxes[:, 0]))
+
+        pieces = [self.cell_routes[self.cell_ptr[a]:self.cell_ptr[b]] for a, b in zip(first, last) if b > a]
+        if not pieces:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(pieces))
+
+    def query(self, south, west, north, east, zoom, max_per_tile=MAX_ROUTES_PER_TILE):
+        """
+        Routes intersecting the map view, at most `max_per_tile` per map tile.
+
+        Args:
+            south, west, north, east (float): View bounds in degrees
+            zoom (int): Current map zoom, which sets the tile size for the cap
+            max_per_tile (int): Routes kept per tile (by route id), None for no cap
+
+        Returns:
+            np.ndarray: Sorted route ids
+        """
+        ids = self.candidates(south, west, north, east)
+        boxes = self.boxes[ids]
+        hits = ids[
+            (boxes[:, 0] <= north) & (boxes[:, 2] >= south) &
+            (boxes[:, 1] <= east) & (boxes[:, 3] >= west)
+        ]
+        if max_per_tile is None or len(hits) == 0:
+            return hits
+
+        # Rank routes inside each tile of their box center and keep the first ones
+        tx, ty = tile_xy(self.centers[hits, 0], self.centers[hits, 1], zoom)
+        tile = ty * (2 ** int(zoom)) + tx
+        order = np.lexsort((hits, tile))
+        tile_sorted = tile[order]
+        group_start = np.flatnonzero(np.r_[True, tile_sorted[1:] != tile_sorted[:-1]])
+        rank = np.arange(len(order)) - np.repeat(group_start, np.diff(np.r_[group_start, len(order)]))
+        return np.sort(hits[order][rank < max_per_tile])
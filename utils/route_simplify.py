@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import numpy as np
+
+# Zoom levels with precomputed simplified geometries
+LOD_ZOOMS = (5, 9, 12, 15)
+
+# Allowed deviation from the original line, in screen pixels
+PIXEL_TOLERANCE = 0.5
+
+# Web Mercator ground resolution at zoom 0 on the equator (meters per pixel)
+METERS_PER_PIXEL_Z0 = 156543.03392
+METERS_PER_DEGREE = 111320.0
+
+
+def zoom_tolerance(zoom, lat=20.0, pixels=PIXEL_TOLERANCE):
+    """Simplification tolerance in degrees of latitude for a map zoom level"""
+    meters_per_pixel = METERS_PER_PIXEL_Z0 * np.cos(np.radians(lat)) / 2 ** zoom
+    return pixels * meters_per_pixel / METERS_PER_DEGREE
+
+
+def zoom_for_bounds(south_west, north_east, width_px=800, height_px=700):
+    """Approximate zoom level at which folium's fit_bounds shows the given [lat, lon] box"""
+    lat_span = max(abs(north_east[0] - south_west[0]), 1e-6)
+    lon_span = max(abs(north_east[1] - south_west[1]), 1e-6)
+    mid_lat = np.radians((north_east[0] + south_west[0]) / 2)
+    zoom_lon = np.log2(width_px * 360 / (256 * lon_span))
+    zoom_lat = np.log2(height_px * 360 * np.cos(mid_lat) / (256 * lat_span))
+    return int(max(0, min(zoom_lon, zoom_lat, 18)))
+
+
+def simplify_mask(coords, offsets, tolerance):
+    """
+    Douglas-Peucker simplification of many routes at once.
+
+    All routes are processed together, one level of the recursion per
+    iteration: every pending segment finds its farthest vertex in a single
+    vectorized pass and is split there if that vertex is farther than
+    `tolerance`. Longitudes are scaled by cos(latitude) so the tolerance
+    is uniform on the ground.
+
+    Args:
+        coords (np.ndarray): (N, 2) [lat, lon] vertices of all routes
+        offsets (np.ndarray): Route i spans coords[offsets[i]:offsets[i + 1]]
+        tolerance (float): Maximum deviation in degrees of latitude
+
+    Returns:
+        np.ndarray: Boolean mask of the vertices to keep
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    y = coords[:, 0]
+    x = coords[:, 1] * np.cos(np.radians(y))
+
+    keep = np.zeros(len(coords), dtype=bool)
+    starts, ends = offsets[:-1], offsets[1:] - 1
+    non_empty = ends >= starts
+    keep[starts[non_empty]] = True
+    keep[ends[non_empty]] = True
+
+    pending = ends - starts > 1
+    starts, ends = starts[pending], ends[pending]
+    while len(starts):
+        # Interior vertex indices of every pending segment, laid out segment by segment
+        counts = ends - starts - 1
+        segment = np.repeat(np.arange(len(starts)), counts)
+        first = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        index = starts[segment] + 1 + np.arange(counts.sum()) - first[segment]
+
+        # Distance from each interior vertex to its segment's chord
+        x0, y0 = x[starts][segment], y[starts][segment]
+        dx, dy = x[ends][segment] - x0, y[ends][segment] - y0
+        length2 = dx * dx + dy * dy
+        t = np.clip(((x[index] - x0) * dx + (y[index] - y0) * dy) / np.where(length2 > 0, length2, 1), 0, 1)
+        distance = np.hypot(x[index] - (x0 + t * dx), y[index] - (y0 + t * dy))
+
+        # Farthest vertex of each segment
+        order = np.lexsort((-distance, segment))
+        farthest = order[first]
+        split = distance[farthest] > tolerance
+        middle = index[farthest][split]
+        keep[middle] = True
+
+        starts, ends = (
+            np.concatenate([starts[split], middle]),
+            np.concatenate([middle, ends[split]])
+        )
+        pending = ends - starts > 1
+        starts, ends = starts[pending], ends[pending]
+
+    return keep
+
+
+def simplify_route(route, zoom):
+    """Simplify a single [[lat, lon], ...] route for display at `zoom`"""
+    route = np.asarray(route, dtype=np.float64).reshape(-1, 2)
+    if len(route) < 3:
+        return route
+    tolerance = zoom_tolerance(zoom, lat=float(route[:, 0].mean()))
+    return route[simplify_mask(route, [0, len(route)], tolerance)]
+
+
+def simplify_routes(coords, offsets, zoom):
+    """
+    Simplify every route of a flat coordinates/offsets pair for display at `zoom`.
+
+    Returns:
+        tuple: (coords, offsets) of the simplified routes
+    """
+    coords = np.asarray(coords)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lat = float(coords[:, 0].mean()) if len(coords) else 20.0
+    keep = simplify_mask(coords, offsets, zoom_tolerance(zoom, lat=lat))
+    kept_before = np.concatenate([[0], np.cumsum(keep)])
+    return coords[keep], kept_before[offsets]
+
+
+def build_lod(store_dir, zooms=LOD_ZOOMS):
+    """
+    Precompute simplified geometries of a route store for each zoom tier.
+
+    Writes lod_<zoom>_coords.npy / lod_<zoom>_offsets.npy next to the full
+    geometry and records the tiers in meta.json.
+    """
+    coords = np.load(os.path.join(store_dir, 'coords.npy'), mmap_mode='r')
+    offsets = np.load(os.path.join(store_dir, 'offsets.npy'))
+    for zoom in zooms:
+        lod_coords, lod_offsets = simplify_routes(coords, offsets, zoom)
+        np.save(os.path.join(store_dir, f'lod_{zoom}_coords.npy'), lod_coords.astype(coords.dtype))
+        np.save(os.path.join(store_dir, f'lod_{zoom}_offsets.npy'), lod_offsets)
+
+    meta_path = os.path.join(store_dir, 'meta.json')
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta['lod_zooms'] = sorted(int(zoom) for zoom in zooms)
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.route_simplify [store_dir]
+    build_lod(sys.argv[1] if len(sys.argv) > 1 else 'saved_routes/route_prod')
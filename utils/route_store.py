@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+
+ROUTE_STORE_VERSION = 1
+
+# OSRM geometries carry 5 decimal places (~1 m), which float32 holds for Indian latitudes/longitudes
+ROUTE_DECIMALS = 5
+
+# Strips brackets and parentheses so "[(12.3, 76.6), (12.4, 76.7)]" becomes "12.3, 76.6, 12.4, 76.7"
+_STRIP_BRACKETS = str.maketrans('', '', '[]()')
+
+
+def parse_coordinates(coordinates_str):
+    """
+    Parse a stringified list of (lat, lon) tuples into an (n, 2) float array.
+
+    Much faster than `ast.literal_eval` because it only splits on commas.
+
+    Raises:
+        ValueError: If the string does not hold an even number of numbers.
+    """
+    text = coordinates_str.translate(_STRIP_BRACKETS).strip()
+    if not text:
+        return np.empty((0, 2))
+    return np.array(text.split(','), dtype=float).reshape(-1, 2)
+
+
+def save_route_store(store_dir, restaurant_locs, delivery_locs, routes):
+    """
+    Write routes as flat columnar arrays.
+
+    All route vertices are concatenated into one float32 (N, 2) array and
+    route i spans coords[offsets[i]:offsets[i + 1]]. Restaurant and delivery
+    locations are few and keep full float64 precision.
+
+    Args:
+        store_dir (str): Output directory
+        restaurant_locs: (n, 2) restaurant [lat, lon]
+        delivery_locs: (n, 2) delivery [lat, lon]
+        routes: Sequence of n (k_i, 2) [lat, lon] arrays
+    """
+    lengths = np.array([len(route) for route in routes], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    coords = (
+        np.concatenate([np.asarray(route, dtype=np.float32).reshape(-1, 2) for route in routes])
+        if len(routes) else np.empty((0, 2), dtype=np.float32)
+    )
+    save_route_arrays(store_dir, restaurant_locs, delivery_locs, coords, offsets)
+
+
+def save_route_arrays(store_dir, restaurant_locs, delivery_locs, coords, offsets):
+    """
+    Write routes that are already flat: route i spans coords[offsets[i]:offsets[i + 1]].
+
+    Same layout as `save_route_store`, without building one array per route.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    np.save(os.path.join(store_dir, 'coords.npy'), np.asarray(coords, dtype=np.float32).reshape(-1, 2))
+    np.save(os.path.join(store_dir, 'offsets.npy'), offsets)
+    np.save(os.path.join(store_dir, 'restaurant_locs.npy'), np.asarray(restaurant_locs, dtype=np.float64).reshape(-1, 2))
+    np.save(os.path.join(store_dir, 'delivery_locs.npy'), np.asarray(delivery_locs, dtype=np.float64).reshape(-1, 2))
+    with open(os.path.join(store_dir, 'meta.json'), 'w') as f:
+        json.dump({'version': ROUTE_STORE_VERSION, 'routes': len(offsets) - 1, 'vertices': int(offsets[-1])}, f)
+
+
+def convert_route_csv(csv_path='saved_csv/route_prod.csv', store_dir='saved_routes/route_prod'):
+    """
+    Convert a route CSV (stringified tuples, as in route_prod.csv) into a route store.
+
+    Returns:
+        RouteStore: The converted store, memory-mapped from `store_dir`
+    """
+    route_df = pd.read_csv(csv_path)
+    save_route_store(
+        store_dir,
+        [parse_coordinates(loc) for loc in route_df['restaurant_locs']],
+        [parse_coordinates(loc) for loc in route_df['delivery_locs']],
+        [parse_coordinates(route) for route in route_df['routes']]
+    )
+    return RouteStore(store_dir)
+
+
+class RouteStore:
+    """Read-only, memory-mapped view of a route store written by `save_route_store`"""
+
+    def __init__(self, store_dir, zoom=None):
+        """
+        Args:
+            store_dir (str): Directory written by `save_route_store`
+            zoom (int): Map zoom the routes will be shown at. Loads the coarsest
+                precomputed level of detail (see `route_simplify.build_lod`) that
+                is still exact at this zoom; None loads the full geometry.
+        """
+        with open(os.path.join(store_dir, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != ROUTE_STORE_VERSION:
+            raise ValueError(f"Unsupported route store version {self.meta.get('version')} in {store_dir}")
+
+        self.store_dir = store_dir
+        self.lod_zoom = None
+        if zoom is not None:
+            tiers = [tier for tier in self.meta.get('lod_zooms', []) if tier >= zoom]
+            self.lod_zoom = min(tiers) if tiers else None
+
+        prefix = '' if self.lod_zoom is None else f'lod_{self.lod_zoom}_'
+        self.coords = np.load(os.path.join(store_dir, f'{prefix}coords.npy'), mmap_mode='r')
+        self.offsets = np.load(os.path.join(store_dir, f'{prefix}offsets.npy'), mmap_mode='r')
+        self.restaurant_locs = np.load(os.path.join(store_dir, 'restaurant_locs.npy'), mmap_mode='r')
+        self.delivery_locs = np.load(os.path.join(store_dir, 'delivery_locs.npy'), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def route(self, i):
+        """Return route i as an (k, 2) [lat, lon] view, without copying"""
+        return self.coords[self.offsets[i]:self.offsets[i + 1]]
+
+    def routes(self):
+        """Return every route as a list of array views"""
+        return [self.route(i) for i in range(len(self))]
+
+
+def route_to_list(route):
+    """Convert a float32 route array to [[lat, lon], ...] rounded to ROUTE_DECIMALS"""
+    return np.round(np.asarray(route, dtype=np.float64), ROUTE_DECIMALS).tolist()
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.route_store [routes.csv] [output_dir]
+    store = convert_route_csv(*sys.argv[1:3])
+    print(f"Wrote {len(store)} routes ({store.meta['vertices']} vertices) to {store.store_dir}")
@@ -0,0 +1,294 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from utils import route_store
+from utils.offline_router import haversine_m
+from utils.route_estimator import CITY_TYPES, TRAFFIC_LEVELS
+
+# Rows generated and written at once
+CHUNK_ROWS = 500_000
+
+# Average deliveries per driver; the training data has ~35 (45,584 orders, 1,320 drivers)
+DELIVERIES_PER_DRIVER = 35
+DRIVERS_PER_RESTAURANT = 3
+
+# City code used in driver IDs (e.g. 'PUNERES13DEL03') and city centre [lat, lon]
+CITIES = {
+    'AGR': (27.1767, 78.0081), 'ALH': (25.4358, 81.8463), 'AURG': (19.8762, 75.3433),
+    'BANG': (12.9716, 77.5946), 'BHP': (23.2599, 77.4126), 'CHEN': (13.0827, 80.2707),
+    'COIMB': (11.0168, 76.9558), 'DEH': (30.3165, 78.0322), 'GOA': (15.4909, 73.8278),
+    'HYD': (17.3850, 78.4867), 'INDO': (22.7196, 75.8577), 'JAP': (26.9124, 75.7873),
+    'KNP': (26.4499, 80.3319), 'KOC': (9.9312, 76.2673), 'KOL': (22.5726, 88.3639),
+    'LUDH': (30.9010, 75.8573), 'MUM': (19.0760, 72.8777), 'MYS': (12.2958, 76.6394),
+    'PUNE': (18.5204, 73.8567), 'RANCHI': (23.3441, 85.3096), 'SUR': (21.1702, 72.8311),
+    'VAD': (22.3072, 73.1812)
+}
+
+# Restaurants lie within this many degrees of their city centre (~15 km)
+CITY_RADIUS_DEG = 0.14
+
+# Drop-off offset from the restaurant per axis, in degrees, as in the training data
+DELIVERY_OFFSET_DEG = (0.01, 0.1)
+
+# Order dates of the training data
+FIRST_ORDER_DATE = '2022-02-11'
+LAST_ORDER_DATE = '2022-04-06'
+
+# Share of orders per hour of the day (the training data has none between 01:00 and 08:00)
+ORDER_HOUR_WEIGHTS = {0: 430, **{hour: 1800 for hour in range(8, 12)},
+                      **{hour: 700 for hour in range(12, 17)}, **{hour: 4100 for hour in range(17, 24)}}
+
+# Traffic level probabilities in TRAFFIC_LEVELS order ('High', 'Jam', 'Low', 'Medium') by hour
+TRAFFIC_BY_HOUR = {
+    'morning': ((8, 9, 10, 11), (0.05, 0.05, 0.85, 0.05)),
+    'midday': ((12, 13, 14, 15, 16), (0.35, 0.05, 0.10, 0.50)),
+    'evening': ((0, 1, 17, 18, 19, 20, 21, 22, 23), (0.10, 0.50, 0.15, 0.25))
+}
+
+# Label frequencies of the training data
+CATEGORY_WEIGHTS = {
+    'City': (CITY_TYPES, (0.75, 0.01, 0.24)),
+    'Weather_conditions': (["Cloudy", "Fog", "Sandstorms", "Stormy", "Sunny", "Windy"], None),
+    'Type_of_order': (["Buffet", "Drinks", "Meal", "Snack"], None),
+    'Type_of_vehicle': (["bicycle", "electric_scooter", "motorcycle", "scooter"], (0.0015, 0.0835, 0.58, 0.335)),
+    'Festival': (["No", "Yes"], (0.98, 0.02)),
+    'multiple_deliveries': ([0.0, 1.0, 2.0, 3.0], (0.31, 0.62, 0.06, 0.01)),
+    'Vehicle_condition': ([0, 1, 2, 3], (0.33, 0.33, 0.32, 0.02))
+}
+
+# Minutes added to the trip time per traffic level and in bad weather
+TRAFFIC_DELAY_MIN = {'High': 4.0, 'Jam': 7.0, 'Low': 0.0, 'Medium': 2.0}
+SLOW_WEATHER = ("Fog", "Sandstorms", "Stormy")
+WEATHER_DELAY_MIN = 3.0
+
+# 'Time_taken (min)' is clipped to the range of the training data
+TIME_TAKEN_BOUNDS = (10, 54)
+
+
+def create_drivers(n_drivers, seed=0):
+    """
+    Fixed population of restaurants and their drivers.
+
+    Returns:
+        dict: Arrays indexed by driver: 'id', 'restaurant' [lat, lon], 'age',
+            'rating' (mean rating) and 'pace' (minutes added to every trip)
+    """
+    rng = np.random.default_rng([seed, 0])
+    codes = list(CITIES)
+    centres = np.array(list(CITIES.values()))
+
+    n_restaurants = -(-n_drivers // DRIVERS_PER_RESTAURANT)
+    restaurant_city = np.arange(n_restaurants) % len(codes)
+    restaurant_number = np.arange(n_restaurants) // len(codes) + 1
+    restaurant_locs = centres[restaurant_city] + rng.uniform(-CITY_RADIUS_DEG, CITY_RADIUS_DEG, (n_restaurants, 2))
+
+    restaurant = np.arange(n_drivers) // DRIVERS_PER_RESTAURANT
+    driver_number = np.arange(n_drivers) % DRIVERS_PER_RESTAURANT + 1
+    ids = [
+        f"{codes[restaurant_city[r]]}RES{restaurant_number[r]:02d}DEL{d:02d}"
+        for r, d in zip(restaurant, driver_number)
+    ]
+    return {
+        'id': np.array(ids, dtype=object),
+        'restaurant': np.round(restaurant_locs[restaurant], 6),
+        'age': rng.integers(20, 40, n_drivers).astype(float),
+        'rating': np.clip(rng.normal(4.63, 0.3, n_drivers), 2.5, 5.0),
+        'pace': rng.normal(0, 3, n_drivers)
+    }
+
+
+def choose(rng, n, column):
+    """Draw n labels of a CATEGORY_WEIGHTS column"""
+    labels, weights = CATEGORY_WEIGHTS[column]
+    return np.asarray(labels, dtype=object)[rng.choice(len(labels), n, p=weights)]
+
+
+def generate_chunk(drivers, n_rows, rng, first_id=0):
+    """
+    One chunk of deliveries.
+
+    Args:
+        drivers (dict): Population from `create_drivers`
+        n_rows (int): Rows in the chunk
+        rng (np.random.Generator): Source of randomness for this chunk
+        first_id (int): Row number of the first delivery, used for the 'ID' column
+
+    Returns:
+        pd.DataFrame: Deliveries with the charts.csv and model columns
+    """
+    driver = rng.integers(0, len(drivers['id']), n_rows)
+    restaurant = drivers['restaurant'][driver]
+    offset = rng.uniform(*DELIVERY_OFFSET_DEG, (n_rows, 2)) * rng.choice([-1, 1], (n_rows, 2))
+    delivery = np.round(restaurant + offset, 6)
+
+    # Order date and time; pick-up 5-15 minutes after the order
+    dates = pd.date_range(FIRST_ORDER_DATE, LAST_ORDER_DATE, freq='D')
+    date = rng.integers(0, len(dates), n_rows)
+    hours = np.array(list(ORDER_HOUR_WEIGHTS))
+    hour_weights = np.array(list(ORDER_HOUR_WEIGHTS.values()), dtype=float)
+    ordered = rng.choice(hours, n_rows, p=hour_weights / hour_weights.sum()) * 60 + rng.integers(2, 12, n_rows) * 5
+    picked = (ordered + rng.choice([5, 10, 15], n_rows)) % (24 * 60)
+    ordered %= 24 * 60
+    clock = np.array([f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(24 * 60)], dtype=object)
+
+    traffic = np.empty(n_rows, dtype=object)
+    for band_hours, weights in TRAFFIC_BY_HOUR.values():
+        in_band = np.isin(picked // 60, band_hours)
+        traffic[in_band] = np.asarray(TRAFFIC_LEVELS, dtype=object)[rng.choice(len(TRAFFIC_LEVELS), in_band.sum(), p=weights)]
+
+    # Road distance from the straight line and OSRM duration at a distance-dependent speed
+    straight_km = haversine_m(restaurant[:, 0], restaurant[:, 1], delivery[:, 0], delivery[:, 1]) / 1000
+    distance_km = straight_km * np.maximum(1.02, rng.lognormal(np.log(1.36), 0.12, n_rows))
+    speed_osrm = np.clip(rng.normal(30 + 6 * np.log1p(distance_km), 5), 15, 80)
+    duration_osrm = np.round(distance_km / speed_osrm * 60, 2)
+
+    weather = choose(rng, n_rows, 'Weather_conditions')
+    multiple_deliveries = choose(rng, n_rows, 'multiple_deliveries').astype(float)
+    vehicle_condition = choose(rng, n_rows, 'Vehicle_condition').astype(np.int64)
+    rating = np.clip(np.round(drivers['rating'][driver] + rng.normal(0, 0.1, n_rows), 1), 1.0, 6.0)
+    time_taken = np.clip(np.round(
+        4 + 0.8 * duration_osrm
+        + pd.Series(traffic).map(TRAFFIC_DELAY_MIN).to_numpy()
+        + np.isin(weather, SLOW_WEATHER) * WEATHER_DELAY_MIN
+        + 3 * multiple_deliveries + 1.5 * vehicle_condition
+        - 4 * (rating - 4.6) + drivers['pace'][driver]
+        + rng.normal(0, 5, n_rows)
+    ), *TIME_TAKEN_BOUNDS).astype(np.int64)
+
+    return pd.DataFrame({
+        'ID': [hex(i) for i in range(first_id, first_id + n_rows)],
+        'Delivery_person_ID': drivers['id'][driver],
+        'Delivery_person_Age': drivers['age'][driver],
+        'Delivery_person_Ratings': rating,
+        'Restaurant_latitude': restaurant[:, 0],
+        'Restaurant_longitude': restaurant[:, 1],
+        'Delivery_location_latitude': delivery[:, 0],
+        'Delivery_location_longitude': delivery[:, 1],
+        'Order_Date': dates.strftime('%Y-%m-%d').to_numpy(dtype=object)[date],
+        'Time_Orderd': clock[ordered],
+        'Time_Order_picked': clock[picked],
+        'Weather_conditions': weather,
+        'Road_traffic_density': traffic,
+        'Vehicle_condition': vehicle_condition,
+        'Type_of_order': choose(rng, n_rows, 'Type_of_order'),
+        'Type_of_vehicle': choose(rng, n_rows, 'Type_of_vehicle'),
+        'multiple_deliveries': multiple_deliveries,
+        'Festival': choose(rng, n_rows, 'Festival'),
+        'City': choose(rng, n_rows, 'City'),
+        'duration_osrm': duration_osrm,
+        'distance_osrm_km': np.round(distance_km, 4),
+        'Time_taken (min)': time_taken,
+        'speed_actual': distance_km / (time_taken / 60),
+        'speed_osrm': distance_km / (duration_osrm / 60),
+        'Order_DayOfWeek': dates.day_name().to_numpy(dtype=object)[date],
+        'Order_Month': dates.month_name().to_numpy(dtype=object)[date],
+        'Time_Orderd_Hour': ordered // 60,
+        'Time_Order_picked_Hour': picked // 60
+    })
+
+
+def generate_deliveries(n_rows, seed=0, chunk_rows=CHUNK_ROWS, deliveries_per_driver=DELIVERIES_PER_DRIVER):
+    """
+    Yield a seeded synthetic delivery log in chunks of at most `chunk_rows` rows.
+
+    Chunks have the columns of saved_csv/charts.csv (raw order fields, OSRM
+    route features, 'Time_taken (min)', 'speed_actual', 'speed_osrm') plus
+    the day/month/hour columns the model encodes. Drivers belong to
+    restaurants in Indian cities and keep a stable age, rating and pace, so
+    the dashboard's driver aggregates behave like on real data.
+
+    Drivers are shared by all chunks; every chunk has its own random stream
+    derived from `seed`, so chunks can be generated independently and the
+    same seed and chunk size always give the same log.
+    """
+    drivers = create_drivers(max(1, n_rows // deliveries_per_driver), seed)
+    for chunk, first_id in enumerate(range(0, n_rows, chunk_rows)):
+        rng = np.random.default_rng([seed, 1, chunk])
+        yield generate_chunk(drivers, min(chunk_rows, n_rows - first_id), rng, first_id)
+
+
+def synthetic_deliveries(n_rows, seed=0, chunk_rows=CHUNK_ROWS):
+    """Whole delivery log as one DataFrame, for sizes that fit in memory"""
+    return pd.concat(list(generate_deliveries(n_rows, seed, chunk_rows)), ignore_index=True)
+
+
+def write_deliveries(path, n_rows, seed=0, chunk_rows=CHUNK_ROWS, keep_rows=0):
+    """
+    Write the delivery log to a CSV file chunk by chunk, so logs of tens of
+    millions of rows never have to fit in memory.
+
+    Returns:
+        pd.DataFrame: The first `keep_rows` rows written
+    """
+    kept = []
+    for i, chunk in enumerate(generate_deliveries(n_rows, seed, chunk_rows)):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        if keep_rows > i * chunk_rows:
+            kept.append(chunk.head(keep_rows - i * chunk_rows))
+    return pd.concat(kept, ignore_index=True) if kept else None
+
+
+def route_geometries(restaurant_locs, delivery_locs, seed=0, vertices_per_km=8):
+    """
+    Street-like polylines from each restaurant to its drop-off.
+
+    Routes run as a staircase of blocks of random size, turning between
+    north-south and east-west at every vertex like on a street grid, for a
+    road/straight-line ratio of 1.0-1.4.
+
+    Returns:
+        tuple: (coords, offsets) in the route store layout, [lat, lon] rounded to 5 decimals
+    """
+    rng = np.random.default_rng([seed, 2])
+    restaurant_locs = np.asarray(restaurant_locs, dtype=float)
+    delivery_locs = np.asarray(delivery_locs, dtype=float)
+    straight_km = haversine_m(restaurant_locs[:, 0], restaurant_locs[:, 1],
+                              delivery_locs[:, 0], delivery_locs[:, 1]) / 1000
+    lengths = np.clip(np.round(straight_km * vertices_per_km), 2, 400).astype(np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    route = np.repeat(np.arange(len(lengths)), lengths)
+    position = np.arange(offsets[-1]) - offsets[route]
+
+    # Progress along each axis: sorted uniforms per route, pinned to 0 and 1 at the ends
+    progress = np.empty((offsets[-1], 2))
+    for axis in range(2):
+        steps = np.sort(route + rng.uniform(0, 1, offsets[-1]))
+        progress[:, axis] = steps - route
+    progress[position == 0] = 0
+    progress[position == lengths[route] - 1] = 1
+
+    # Every other vertex only moves north-south: keep the previous vertex's longitude progress
+    turns = np.flatnonzero((position % 2 == 1) & (position < lengths[route] - 1))
+    progress[turns, 1] = progress[turns - 1, 1]
+
+    coords = restaurant_locs[route] + (delivery_locs - restaurant_locs)[route] * progress
+    return np.round(coords, route_store.ROUTE_DECIMALS), offsets
+
+
+def write_route_store(store_dir, deliveries, seed=0):
+    """Write the routes of a delivery log as a route store (see `route_store.save_route_arrays`)"""
+    restaurant_locs = deliveries[['Restaurant_latitude', 'Restaurant_longitude']].to_numpy()
+    delivery_locs = deliveries[['Delivery_location_latitude', 'Delivery_location_longitude']].to_numpy()
+    coords, offsets = route_geometries(restaurant_locs, delivery_locs, seed)
+    route_store.save_route_arrays(store_dir, restaurant_locs, delivery_locs, coords, offsets)
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.synthetic_deliveries --rows 1000000 [--output saved_csv/charts.csv] [--routes 5000]
+    parser = argparse.ArgumentParser(description="Write a seeded synthetic delivery log")
+    parser.add_argument('--rows', type=int, required=True, help='deliveries to generate')
+    parser.add_argument('--output', default='saved_csv/charts.csv')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--routes', type=int, default=0, help='also write geometries of the first N deliveries')
+    parser.add_argument('--routes-dir', default='saved_routes/synthetic')
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    first_rows = write_deliveries(args.output, args.rows, args.seed, args.chunk_rows, keep_rows=args.routes)
+    print(f"Wrote {args.rows} deliveries to {args.output}")
+
+    if args.routes:
+        write_route_store(args.routes_dir, first_rows, args.seed)
+        print(f"Wrote {len(first_rows)} routes to {args.routes_dir}")
@@ -0,0 +1,207 @@
+import os
+import sys
+import json
+import numpy as np
+
+TREE_ENSEMBLE_VERSION = 1
+
+# Objectives whose prediction is the raw margin (base score + sum of leaves)
+SUPPORTED_OBJECTIVES = ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror')
+
+# Rows walked together; bounds the (rows, trees) node arrays for large batches
+PREDICT_CHUNK_ROWS = 1024
+
+
+def compiled_model_path(model_filename, model_dir='saved_models'):
+    """Path of the compiled (.npz) tree arrays of a model"""
+    return os.path.join(model_dir, os.path.splitext(model_filename)[0] + '.npz')
+
+
+def parse_base_score(value):
+    """Base score as stored by XGBoost, either '2.6E1' or '[2.6E1]'"""
+    return float(str(value).strip('[]'))
+
+
+def compile_model_json(model):
+    """
+    Flatten the trees of an XGBoost JSON model dump into contiguous arrays.
+
+    Nodes of all trees are concatenated and child pointers made global, so
+    node k of the ensemble is described by feature[k], threshold[k],
+    left[k], right[k], default_left[k] and value[k]. Leaves point to
+    themselves, which lets every tree be walked for the same number of steps.
+
+    Args:
+        model (dict): Parsed JSON of `Booster.save_raw('json')` or a .json model file
+
+    Returns:
+        dict: Arrays 'feature', 'threshold', 'left', 'right', 'default_left',
+            'value', 'roots', plus 'base_score', 'depth' and 'num_feature'
+
+    Raises:
+        ValueError: If the model is not a regression tree ensemble with numeric splits.
+    """
+    learner = model['learner']
+    objective = learner['objective']['name']
+    if objective not in SUPPORTED_OBJECTIVES:
+        raise ValueError(f"Unsupported objective {objective}")
+    booster = learner['gradient_booster']
+    if booster['name'] != 'gbtree':
+        raise ValueError(f"Unsupported booster {booster['name']}")
+    trees = booster['model']['trees']
+
+    feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+    offset, depth = 0, 0
+    for tree in trees:
+        if any(tree['split_type']):
+            raise ValueError(f"Tree {tree['id']} has categorical splits, which are not supported")
+        tree_left = np.asarray(tree['left_children'], dtype=np.int64)
+        tree_right = np.asarray(tree['right_children'], dtype=np.int64)
+        node = np.arange(len(tree_left))
+        is_leaf = tree_left == -1
+
+        roots.append(offset)
+        feature.append(np.where(is_leaf, 0, tree['split_indices']))
+        threshold.append(np.asarray(tree['split_conditions']))
+        left.append(np.where(is_leaf, node, tree_left) + offset)
+        right.append(np.where(is_leaf, node, tree_right) + offset)
+        default_left.append(np.asarray(tree['default_left'], dtype=bool))
+        value.append(np.where(is_leaf, tree['split_conditions'], 0.0))
+
+        # Depth of every node, parents always come before their children
+        node_depth = np.zeros(len(node), dtype=np.int64)
+        for k in node[~is_leaf]:
+            node_depth[tree_left[k]] = node_depth[tree_right[k]] = node_depth[k] + 1
+        depth = max(depth, int(node_depth.max()))
+        offset += len(node)
+
+    return {
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(np.float32),
+        'left': np.concatenate(left).astype(np.int32),
+        'right': np.concatenate(right).astype(np.int32),
+        'default_left': np.concatenate(default_left),
+        'value': np.concatenate(value).astype(np.float32),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'base_score': np.float64(parse_base_score(learner['learner_model_param']['base_score'])),
+        'depth': np.int64(depth),
+        'num_feature': np.int64(learner['learner_model_param']['num_feature'])
+    }
+
+
+def compile_model_file(path):
+    """
+    Compile a saved XGBoost model into tree arrays.
+
+    JSON models are read directly; any other format (.ubj, .pkl) is loaded
+    once with xgboost to dump its JSON, so only compiling needs the library.
+    """
+    if path.endswith('.json'):
+        with open(path) as f:
+            return compile_model_json(json.load(f))
+
+    import xgboost as xgb
+    if path.endswith('.pkl'):
+        import joblib
+        booster = joblib.load(path).get_booster()
+    else:
+        booster = xgb.Booster()
+        booster.load_model(path)
+    return compile_model_json(json.loads(booster.save_raw('json')))
+
+
+def save_ensemble(path, arrays):
+    """Save compiled tree arrays to an uncompressed .npz file"""
+    np.savez(path, version=np.int64(TREE_ENSEMBLE_VERSION), **arrays)
+
+
+class TreeEnsemble:
+    """
+    Vectorized evaluator of a compiled XGBoost regression ensemble.
+
+    All trees are walked for a whole batch at once: each step looks up the
+    current node of every (row, tree) pair and moves it to its left or right
+    child, so a prediction costs `depth` array operations regardless of the
+    number of rows and trees. Needs only NumPy.
+    """
+
+    def __init__(self, arrays):
+        """
+        Args:
+            arrays (dict): Arrays as produced by `compile_model_json`
+        """
+        self.feature = np.asarray(arrays['feature'], dtype=np.int32)
+        self.threshold = np.asarray(arrays['threshold'], dtype=np.float32)
+        self.default_left = np.asarray(arrays['default_left'], dtype=bool)
+        self.value = np.asarray(arrays['value'], dtype=np.float32)
+        self.roots = np.asarray(arrays['roots'], dtype=np.int32)
+        self.base_score = np.float32(arrays['base_score'])
+        self.depth = int(arrays['depth'])
+        self.num_feature = int(arrays['num_feature'])
+
+        # Right children then left children, so the next node is children[node + n_nodes * go_left]
+        self.n_nodes = len(self.feature)
+        self.children = np.concatenate([arrays['right'], arrays['left']]).astype(np.int32)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Load an ensemble written by `save_ensemble`.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file was written by another format version.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No compiled model found at {path}")
+        with np.load(path) as data:
+            if int(data['version']) != TREE_ENSEMBLE_VERSION:
+                raise ValueError(f"Unsupported compiled model version {int(data['version'])} in {path}")
+            return cls({key: data[key] for key in data.files})
+
+    def leaves(self, X):
+        """Leaf node reached by every row in every tree, as an (n_rows, n_trees) array"""
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.num_feature)
+        flat = X.ravel()
+        has_missing = bool(np.isnan(flat).any())
+        row_start = (np.arange(len(X), dtype=np.int32) * self.num_feature)[:, None]
+
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.depth):
+            x = flat[row_start + self.feature[node]]
+            go_left = x < self.threshold[node]
+            if has_missing:
+                go_left |= np.isnan(x) & self.default_left[node]
+            node = self.children[node + self.n_nodes * go_left]
+        return node
+
+    def predict(self, X):
+        """
+        Predict a batch of rows.
+
+        Leaf values are added to the base score tree by tree in float32, the
+        same order XGBoost uses, so results match `model.predict` exactly.
+
+        Args:
+            X: (n_rows, num_feature) feature matrix, NaN for missing values
+
+        Returns:
+            np.ndarray: (n_rows,) float32 predictions
+        """
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.num_feature)
+        predictions = np.empty(len(X), dtype=np.float32)
+        for start in range(0, len(X), PREDICT_CHUNK_ROWS):
+            leaf_values = self.value[self.leaves(X[start:start + PREDICT_CHUNK_ROWS])]
+            terms = np.concatenate(
+                [np.full((len(leaf_values), 1), self.base_score, dtype=np.float32), leaf_values], axis=1
+            )
+            predictions[start:start + len(terms)] = np.cumsum(terms, axis=1, dtype=np.float32)[:, -1]
+        return predictions
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.tree_ensemble [saved_models/model.ubj] [output.npz]
+    source = sys.argv[1] if len(sys.argv) > 1 else 'saved_models/XGBoost_20250508_151557.ubj'
+    output = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(source)[0] + '.npz'
+    save_ensemble(output, compile_model_file(source))
+    print(f"Wrote {output}")